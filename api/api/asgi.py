@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+# Под ASGI действия чтения выполняются асинхронно (artist_catalog.asynchronous).
+os.environ.setdefault('CATALOG_ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
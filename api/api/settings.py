@@ -44,11 +44,13 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_swagger',
     'drf_yasg',
+    'django_filters',
 
     'artist_catalog.apps.ArtistCatalogConfig',
 ]
 
 MIDDLEWARE = [
+    'artist_catalog.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'artist_catalog.instrumentation.ServerTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'api.urls'
@@ -102,6 +105,23 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: list/retrieve вьюсетов каталога читают из них
+# (artist_catalog.replicas), запись и остальные запросы идут в default.
+# Хосты реплик перечисляются через запятую в POSTGRES_REPLICA_HOSTS.
+for index, host in enumerate(filter(None, os.getenv('POSTGRES_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['artist_catalog.replicas.ReplicaRouter']
+CATALOG_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# round_robin или least_loaded
+CATALOG_REPLICA_STRATEGY = os.getenv('CATALOG_REPLICA_STRATEGY', 'round_robin')
+# Сколько секунд после записи клиент читает из default.
+CATALOG_REPLICA_STICKY_SECONDS = int(os.getenv('CATALOG_REPLICA_STICKY_SECONDS', '5'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,12 +172,16 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.SessionAuthentication",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_RENDERER_CLASSES": [
+        "artist_catalog.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PAGINATION_CLASS": "artist_catalog.pagination.CatalogLimitOffsetPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.coreapi.AutoSchema",
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
-        "rest_framework.filters.SearchFilter",
+        "artist_catalog.search.CatalogSearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
 }
@@ -184,8 +208,55 @@ SWAGGER_SETTINGS = {
     'DEEP_LINKING': True,
     'SHOW_EXTENSIONS': True,
     'SHOW_COMMON_EXTENSIONS': True,
+    # Интерфейс загружает заранее собранную схему (artist_catalog.schema).
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+
+# Асинхронные list/retrieve вьюсетов каталога (artist_catalog.asynchronous).
+# Включается в asgi.py; под WSGI оставьте выключенным.
+CATALOG_ASYNC_VIEWS = os.getenv('CATALOG_ASYNC_VIEWS', 'false').lower() == 'true'
+
+# Списки плоских сериализаторов собираются из values_list() без создания
+# объектов моделей (artist_catalog.lean).
+CATALOG_LEAN_SERIALIZATION = True
+
+# Ответы list отдаются потоком, страница кодируется пачками
+# (artist_catalog.renderers.StreamingListMixin).
+CATALOG_STREAMING_LISTS = os.getenv('CATALOG_STREAMING_LISTS', 'false').lower() == 'true'
+
+# Число строк в ответах списков без фильтров (artist_catalog.counting): начиная
+# с этого размера таблицы в PostgreSQL берётся оценка планировщика
+# (count_approximate: true), для меньших — точное число из кэша ответов.
+CATALOG_COUNT_ESTIMATE_THRESHOLD = int(os.getenv('CATALOG_COUNT_ESTIMATE_THRESHOLD', '100000'))
+
+# Замеры запросов (artist_catalog.instrumentation): заголовок Server-Timing
+# и размер скользящего окна статистики по действиям (GET /api/v1/timings/).
+CATALOG_SERVER_TIMING = os.getenv('CATALOG_SERVER_TIMING', 'true').lower() == 'true'
+CATALOG_TIMING_WINDOW = 1000
+
+# Метрики Prometheus (GET /metrics). При нескольких процессах сервера укажите
+# общий для них каталог: процессы сохраняют туда снимки своих метрик.
+CATALOG_METRICS_DIR = os.getenv('CATALOG_METRICS_DIR') or None
+CATALOG_METRICS_FLUSH_INTERVAL = 1.0
+
+# Кэш ответов каталога на чтение (artist_catalog.cache).
+# LocMemResponseCache хранит ответы в памяти процесса; при нескольких процессах
+# используйте 'artist_catalog.cache.DjangoResponseCache' с OPTIONS {'alias': ...}
+# и файловым или Redis-кэшем из CACHES. None отключает кэш.
+CATALOG_RESPONSE_CACHE = {
+    'BACKEND': 'artist_catalog.cache.LocMemResponseCache',
+    'TIMEOUT': int(os.getenv('CATALOG_CACHE_TIMEOUT', '300')),
+    'OPTIONS': {
+        'max_entries': 1000,
+    },
 }
 
 REDOC_SETTINGS = {
     'LAZY_RENDERING': False,
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
+
+# Собранная схема OpenAPI (manage.py build_schema). CATALOG_CODE_VERSION —
+# версия кода, например SHA коммита; без неё версия вычисляется по исходникам.
+CATALOG_SCHEMA_DIR = os.getenv('CATALOG_SCHEMA_DIR', str(BASE_DIR / 'openapi'))
+CATALOG_CODE_VERSION = os.getenv('CATALOG_CODE_VERSION') or None
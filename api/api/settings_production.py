@@ -0,0 +1,90 @@
+"""
+Настройки для production: ``DJANGO_SETTINGS_MODULE=api.settings_production``.
+
+Отличаются от ``api.settings`` выключенным DEBUG, хостами и ключом из
+окружения и повторным использованием подключений к PostgreSQL: пул
+psycopg (если установлен ``psycopg[pool]``) или постоянные подключения.
+Сервер запускается через gunicorn с конфигурацией ``gunicorn.conf.py``.
+"""
+import importlib.util
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, CATALOG_ASYNC_VIEWS, DATABASES, SECRET_KEY
+
+
+DEBUG = False
+
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', SECRET_KEY)
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.getenv('DJANGO_ALLOWED_HOSTS', '127.0.0.1,localhost').split(',')
+    if host.strip()
+]
+
+# Статика админки и Swagger UI собирается командой collectstatic
+# и отдаётся обратным прокси.
+STATIC_ROOT = os.getenv('DJANGO_STATIC_ROOT', str(BASE_DIR / 'static'))
+
+
+# Подключения к базам данных (default и реплики).
+#
+# Пул psycopg держит в каждом процессе от DB_POOL_MIN_SIZE до DB_POOL_MAX_SIZE
+# открытых подключений и выдаёт их запросам; DB_POOL_TIMEOUT — сколько секунд
+# запрос ждёт свободного подключения. Перед выдачей подключение проверяется
+# (CONN_HEALTH_CHECKS), разорванные подключения заменяются новыми.
+# Без psycopg 3 подключения остаются открытыми DB_CONN_MAX_AGE секунд;
+# под ASGI такие подключения не переиспользуются, поэтому там нужен пул.
+DB_POOL_ENABLED = (
+    os.getenv('DB_POOL', 'true').lower() == 'true'
+    and importlib.util.find_spec('psycopg') is not None
+    and importlib.util.find_spec('psycopg_pool') is not None
+)
+
+for database in DATABASES.values():
+    database['CONN_HEALTH_CHECKS'] = True
+    if DB_POOL_ENABLED:
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {
+            **database.get('OPTIONS', {}),
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+                'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '3600')),
+            },
+        }
+    else:
+        database['CONN_MAX_AGE'] = (
+            0 if CATALOG_ASYNC_VIEWS else int(os.getenv('DB_CONN_MAX_AGE', '60'))
+        )
+
+
+# Кэш ответов каталога (artist_catalog.cache). gunicorn запускает несколько
+# процессов, а LocMemResponseCache из api.settings у каждого свой: запись в
+# одном процессе не сбрасывала бы ответы, закэшированные другими. Поэтому
+# здесь кэш общий — Redis из CATALOG_REDIS_URL (нужен пакет redis), где
+# поколения моделей увеличиваются атомарно; без Redis кэш ответов выключен.
+CATALOG_REDIS_URL = os.getenv('CATALOG_REDIS_URL') or None
+
+if CATALOG_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'catalog': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CATALOG_REDIS_URL,
+        },
+    }
+    CATALOG_RESPONSE_CACHE = {
+        'BACKEND': 'artist_catalog.cache.DjangoResponseCache',
+        'TIMEOUT': int(os.getenv('CATALOG_CACHE_TIMEOUT', '300')),
+        'OPTIONS': {
+            'alias': 'catalog',
+        },
+    }
+else:
+    CATALOG_RESPONSE_CACHE = None
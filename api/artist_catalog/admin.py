@@ -1,9 +1,16 @@
+from collections import Counter
+
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import OuterRef
 from django.utils.html import format_html
 from django.urls import reverse
 from django.contrib import messages
 
+from .counters import SubqueryCount, adjust_track_counters
+from .counting import CatalogAdminPaginator
 from .models import Artist, Album, Music, AlbumTrack
+from .services import renumber_album_tracks
 
 
 class AlbumTrackInline(admin.TabularInline):
@@ -20,22 +27,24 @@ class ArtistAdmin(admin.ModelAdmin):
     search_fields = ('artist_name',)
     ordering = ('artist_name',)
     actions = ['duplicate_artist']
-    
+
     def albums_count(self, obj):
-        count = obj.album_set.count()
+        count = obj.albums_count
         if count > 0:
             url = reverse('admin:artist_catalog_album_changelist') + f'?artist__id__exact={obj.id}'
             return format_html('<a href="{}">{} альбомов</a>', url, count)
         return '0 альбомов'
     
     def tracks_count(self, obj):
-        count = AlbumTrack.objects.filter(album__artist=obj).count()
+        count = obj.tracks_count
         if count > 0:
             return f'{count} треков'
         return '0 треков'
 
     albums_count.short_description = 'Количество альбомов'
+    albums_count.admin_order_field = 'albums_count'
     tracks_count.short_description = 'Общее количество треков'
+    tracks_count.admin_order_field = 'tracks_count'
 
 
 @admin.register(Album)
@@ -47,9 +56,20 @@ class AlbumAdmin(admin.ModelAdmin):
     inlines = [AlbumTrackInline]
     actions = ['duplicate_album']
     date_hierarchy = 'release_date'
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('artist')
+
+    def save_formset(self, request, form, formset, change):
+        super().save_formset(request, form, formset, change)
+        if formset.model is AlbumTrack:
+            adjust_track_counters(
+                {form.instance.pk: len(formset.new_objects) - len(formset.deleted_objects)},
+                artist_by_album={form.instance.pk: form.instance.artist_id},
+            )
     
     def tracks_count(self, obj):
-        count = obj.album_tracks.count()
+        count = obj.tracks_count
         if count > 0:
             url = reverse('admin:artist_catalog_albumtrack_changelist') + f'?album__id__exact={obj.id}'
             return format_html('<a href="{}">{} треков</a>', url, count)
@@ -60,6 +80,7 @@ class AlbumAdmin(admin.ModelAdmin):
         return format_html('<a href="{}">Редактировать альбом</a>', url)
 
     tracks_count.short_description = 'Количество треков'
+    tracks_count.admin_order_field = 'tracks_count'
     album_link.short_description = 'Действия'
 
 
@@ -70,9 +91,19 @@ class MusicAdmin(admin.ModelAdmin):
     search_fields = ('title',)
     ordering = ('title',)
     actions = ['duplicate_music']
+    # Без COUNT(*) по всей таблице на каждой странице списка.
+    paginator = CatalogAdminPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _albums_count=SubqueryCount(
+                AlbumTrack.objects.filter(track=OuterRef('pk')).order_by().values('pk')
+            ),
+        )
     
     def albums_count(self, obj):
-        count = obj.album_tracks.count()
+        count = obj._albums_count
         if count > 0:
             url = reverse('admin:artist_catalog_albumtrack_changelist') + f'?track__id__exact={obj.id}'
             return format_html('<a href="{}">В {} альбомах</a>', url, count)
@@ -84,6 +115,7 @@ class MusicAdmin(admin.ModelAdmin):
         return format_html('<a href="{}">Редактировать</a>', url)
 
     albums_count.short_description = 'Использование в альбомах'
+    albums_count.admin_order_field = '_albums_count'
     music_link.short_description = 'Действия'
 
 
@@ -94,6 +126,8 @@ class AlbumTrackAdmin(admin.ModelAdmin):
     search_fields = ('track__title', 'album__artist__artist_name')
     ordering = ('album', 'track_number')
     actions = ['reorder_tracks']
+    paginator = CatalogAdminPaginator
+    show_full_result_count = False
     
     def artist_name(self, obj):
         return obj.album.artist.artist_name
@@ -103,23 +137,33 @@ class AlbumTrackAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('album__artist', 'track')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        album_deltas = Counter({obj.album_id: 1})
+        if change:
+            album_deltas[form.initial['album']] -= 1
+        adjust_track_counters(album_deltas)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        adjust_track_counters({obj.album_id: -1})
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        album_ids = list(queryset.order_by().values_list('album_id', flat=True))
+        super().delete_queryset(request, queryset)
+        adjust_track_counters({
+            album_id: -count for album_id, count in Counter(album_ids).items()
+        })
     
     def reorder_tracks(self, request, queryset):
-        albums_updated = 0
-
-        for album_track in queryset:
-            album = album_track.album
-            tracks = album.album_tracks.all().order_by('track_number')
-            for i, track in enumerate(tracks, 1):
-                if track.track_number != i:
-                    track.track_number = i
-                    track.save()
-
-            albums_updated += 1
-        
+        album_ids = set(queryset.order_by().values_list('album_id', flat=True))
+        renumber_album_tracks(album_ids)
+
         self.message_user(
             request,
-            f'Перенумерованы треки в {albums_updated} альбомах.',
+            f'Перенумерованы треки в {len(album_ids)} альбомах.',
             messages.SUCCESS
         )
 
@@ -6,4 +6,6 @@ class ArtistCatalogConfig(AppConfig):
     name = 'artist_catalog'
 
     def ready(self):
-        from . import signals   # noqa
\ No newline at end of file
+        from . import signals   # noqa
+        from . import counters  # noqa
+        from . import instrumentation  # noqa
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Асинхронные действия чтения для работы под ASGI.
+
+``AsyncReadMixin`` подменяет представление вьюсета, которое строит роутер,
+на асинхронное: запросы ``GET``/``HEAD`` к действиям ``async_actions``
+выполняются методами ``alist``/``aretrieve`` на асинхронном ORM
+(``acount``, ``aiterator``, ``aget``) и не занимают поток на время ожидания
+базы данных и медленного клиента. Остальные действия вызываются как
+обычно — синхронным представлением в потоке (``sync_to_async``).
+
+Маршруты и схема OpenAPI не меняются: документация по-прежнему берётся
+с методов ``list``/``retrieve``. Режим включается настройкой
+``CATALOG_ASYNC_VIEWS`` (по умолчанию — при запуске через ``asgi.py``);
+под WSGI асинхронное представление выполнялось бы через ``async_to_sync``
+и только замедляло бы ответы.
+"""
+
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404
+from rest_framework.response import Response
+
+
+async def aiterate(iterator):
+    """
+    Асинхронный итератор по синхронному ``iterator``.
+
+    Каждый элемент вычисляется через ``sync_to_async`` в потоке запроса,
+    где открыты его подключения к базе данных и транзакции.
+    """
+    iterator = iter(iterator)
+    done = object()
+    try:
+        while True:
+            item = await sync_to_async(next)(iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_content(request, iterator):
+    """
+    Содержимое ``StreamingHttpResponse`` для ``request``.
+
+    Под ASGI Django собирает синхронный итератор потокового ответа в список
+    целиком и только потом отправляет, поэтому там итератор оборачивается
+    в асинхронный ``aiterate``.
+    """
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        return aiterate(iterator)
+    return iterator
+
+
+class AsyncReadMixin:
+    """
+    Асинхронные ``list`` и ``retrieve`` для ``GenericViewSet``.
+
+    Миксины, оборачивающие действия (кэш, условные запросы), реализуют
+    ``alist``/``aretrieve`` так же, как ``list``/``retrieve``, поэтому
+    ``AsyncReadMixin`` должен стоять после них, перед базовым вьюсетом.
+    """
+    async_actions = ("list", "retrieve")
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+        if not getattr(settings, "CATALOG_ASYNC_VIEWS", False):
+            return sync_view
+
+        async_methods = {
+            method: action
+            for method, action in actions.items()
+            if method in ("get", "head") and action in cls.async_actions
+        }
+        if not async_methods:
+            return sync_view
+        async_methods.setdefault("head", async_methods.get("get"))
+        run_sync_view = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if async_methods.get(request.method.lower()) is None:
+                return await run_sync_view(request, *args, **kwargs)
+
+            self = cls(**initkwargs)
+            self.action_map = {**actions, **async_methods}
+            for method, action in self.action_map.items():
+                setattr(self, method, getattr(self, action))
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.adispatch(request, *args, **kwargs)
+
+        # cls, initkwargs, actions и csrf_exempt нужны роутеру и drf_yasg.
+        update_wrapper(view, sync_view)
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        Асинхронный аналог ``APIView.dispatch`` для действий чтения.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        # Пользователь из сессии загружается заранее: синхронная
+        # аутентификация DRF обратилась бы к базе данных из цикла событий.
+        auser = getattr(request, "auser", None)
+        if auser is not None:
+            request.user = await auser()
+
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            handler = getattr(self, f"a{self.action}")
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if hasattr(paginator, "apaginate_queryset"):
+            return await paginator.apaginate_queryset(queryset, self.request, view=self)
+        return await sync_to_async(paginator.paginate_queryset)(queryset, self.request, view=self)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([obj async for obj in queryset.aiterator()], many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
@@ -0,0 +1,306 @@
+"""
+Замер производительности API каталога через тестовый клиент Django.
+
+Каждое действие вьюсетов вызывается ``requests`` раз после ``warmup``
+прогревочных запросов. Для каждого действия считаются перцентили времени
+ответа, среднее число SQL-запросов и пиковая память одного запроса
+(по ``tracemalloc``). Изменяющие запросы выполняются в транзакции, которая
+откатывается, поэтому каталог после замера не меняется.
+
+``run_renderer_benchmark`` отдельно сравнивает время рендеринга ответов
+на чтение стандартным ``JSONRenderer`` и ``FastJSONRenderer``.
+"""
+
+import json
+import platform
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from artist_catalog.instrumentation import percentile
+from artist_catalog.models import Album, AlbumTrack, Artist, Music
+from artist_catalog.renderers import JSON_BACKEND, FastJSONRenderer
+
+
+Scenario = namedtuple("Scenario", ["name", "method", "path", "payload", "write"])
+
+
+class QueryCounter:
+    """
+    Обёртка ``connection.execute_wrapper``, считающая SQL-запросы.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def _json(data):
+    return {"data": json.dumps(data), "content_type": "application/json"}
+
+
+def build_scenarios():
+    """
+    Возвращает сценарии для всех действий вьюсетов на данных текущего каталога.
+    """
+    artist_id = Artist.objects.order_by("id").values_list("id", flat=True).first()
+    music_id = Music.objects.order_by("id").values_list("id", flat=True).first()
+    album = (
+        Album.objects.order_by("-tracks_count", "id").values("id", "artist_id", "release_date").first()
+    )
+    if artist_id is None or music_id is None or album is None:
+        raise ValueError("Каталог пуст: сначала заполните его командой seed_catalog.")
+
+    titles = list(
+        AlbumTrack.objects
+        .filter(album_id=album["id"])
+        .order_by("track_number")
+        .values_list("track__title", flat=True)
+    )
+    # Обновление альбома переставляет треки в обратном порядке
+    # и добавляет новый, чтобы затронуть все ветви синхронизации.
+    updated_tracks = [
+        {"title": title, "number": number}
+        for number, title in enumerate([*reversed(titles), "Bench new track"], 1)
+    ]
+    new_album = {
+        "artist": artist_id,
+        "release_date": "2000-01-01",
+        "tracks": [
+            {"title": title, "number": number}
+            for number, title in enumerate([*titles[:5], "Bench track 1", "Bench track 2"], 1)
+        ],
+    }
+    import_lines = "\n".join(
+        json.dumps({**new_album, "release_date": f"2000-01-{day:02d}"}) for day in range(1, 11)
+    )
+
+    def import_file():
+        return {
+            "data": {
+                "file": SimpleUploadedFile(
+                    "albums.ndjson", import_lines.encode("utf-8"), "application/x-ndjson"
+                ),
+            },
+        }
+
+    album_update = {
+        "artist": album["artist_id"],
+        "release_date": album["release_date"].isoformat(),
+        "tracks": updated_tracks,
+    }
+
+    scenarios = []
+    for basename, pk, create, update in (
+        ("artist", artist_id, {"artist_name": "Bench artist"}, {"artist_name": "Bench renamed"}),
+        ("music", music_id, {"title": "Bench song"}, {"title": "Bench renamed song"}),
+        ("album", album["id"], new_album, album_update),
+    ):
+        list_path = reverse(f"{basename}-list")
+        detail_path = reverse(f"{basename}-detail", args=[pk])
+        scenarios += [
+            Scenario(f"{basename}-list", "get", list_path, None, False),
+            Scenario(f"{basename}-retrieve", "get", detail_path, None, False),
+            Scenario(f"{basename}-create", "post", list_path, lambda data=create: _json(data), True),
+            Scenario(f"{basename}-update", "put", detail_path, lambda data=update: _json(data), True),
+            Scenario(
+                f"{basename}-partial-update", "patch", detail_path,
+                lambda data=update: _json({key: data[key] for key in list(data)[:1]}), True,
+            ),
+            Scenario(f"{basename}-destroy", "delete", detail_path, None, True),
+        ]
+
+    scenarios += [
+        Scenario("album-import", "post", reverse("album-import-albums"), import_file, True),
+        Scenario("tracks-in-albums-list", "get", reverse("tracks-in-albums-list"), None, False),
+        Scenario(
+            "catalog-export", "get", reverse("catalog-export") + "?entities=albums", None, False,
+        ),
+    ]
+    return scenarios
+
+
+def _send(client, scenario):
+    kwargs = scenario.payload() if scenario.payload else {}
+    response = getattr(client, scenario.method)(scenario.path, **kwargs)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def _measure(client, scenario):
+    counter = QueryCounter()
+    with rolled_back() if scenario.write else nullcontext():
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = _send(client, scenario)
+            elapsed = time.perf_counter() - started
+    return response.status_code, elapsed, counter.count
+
+
+def _peak_memory(client, scenario):
+    tracemalloc.start()
+    try:
+        with rolled_back() if scenario.write else nullcontext():
+            _send(client, scenario)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _benchmark_environment():
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+    }
+
+
+def _catalog_size():
+    return {
+        "artists": Artist.objects.count(),
+        "albums": Album.objects.count(),
+        "music": Music.objects.count(),
+        "album_tracks": AlbumTrack.objects.count(),
+    }
+
+
+def run_benchmark(requests=50, warmup=5, names=None, use_cache=False, memory=True):
+    """
+    Выполняет сценарии и возвращает отчёт, пригодный для сравнения между коммитами.
+
+    ``names`` — подмножество имён сценариев, ``use_cache`` — не отключать
+    кэш ответов на чтение.
+    """
+    overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+    if not use_cache:
+        overrides["CATALOG_RESPONSE_CACHE"] = None
+
+    with override_settings(**overrides):
+        scenarios = build_scenarios()
+        if names:
+            unknown = set(names) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise ValueError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+            scenarios = [scenario for scenario in scenarios if scenario.name in names]
+
+        client = Client()
+        results = {}
+        for scenario in scenarios:
+            timings = []
+            queries = []
+            statuses = set()
+            for iteration in range(warmup + requests):
+                status, elapsed, query_count = _measure(client, scenario)
+                if iteration >= warmup:
+                    timings.append(elapsed * 1000)
+                    queries.append(query_count)
+                    statuses.add(status)
+
+            results[scenario.name] = {
+                "method": scenario.method.upper(),
+                "path": scenario.path,
+                "status": sorted(statuses),
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p95_ms": round(percentile(timings, 95), 3),
+                "p99_ms": round(percentile(timings, 99), 3),
+                "queries": round(sum(queries) / len(queries), 2),
+                "peak_memory_kb": (
+                    round(_peak_memory(client, scenario) / 1024, 1) if memory else None
+                ),
+            }
+
+    return {
+        "environment": {
+            **_benchmark_environment(),
+            "response_cache": use_cache,
+            "requests": requests,
+            "warmup": warmup,
+        },
+        "catalog": _catalog_size(),
+        "results": results,
+    }
+
+
+def _time_render(renderer, data, requests, warmup):
+    timings = []
+    for iteration in range(warmup + requests):
+        started = time.perf_counter()
+        content = renderer.render(data, "application/json", {})
+        if iteration >= warmup:
+            timings.append((time.perf_counter() - started) * 1000)
+    return content, timings
+
+
+def run_renderer_benchmark(requests=50, warmup=5, limit=1000):
+    """
+    Сравнивает ``JSONRenderer`` и ``FastJSONRenderer`` на данных ответов
+    list-действий (страница из ``limit`` записей) и retrieve альбома.
+    """
+    album_id = Album.objects.order_by("-tracks_count", "id").values_list("id", flat=True).first()
+    if album_id is None:
+        raise ValueError("Каталог пуст: сначала заполните его командой seed_catalog.")
+
+    paths = {
+        "artist-list": reverse("artist-list") + f"?limit={limit}",
+        "music-list": reverse("music-list") + f"?limit={limit}",
+        "album-list": reverse("album-list") + f"?limit={limit}",
+        "album-retrieve": reverse("album-detail", args=[album_id]),
+        "tracks-in-albums-list": reverse("tracks-in-albums-list") + f"?limit={limit}",
+    }
+    overrides = {
+        "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        "CATALOG_RESPONSE_CACHE": None,
+    }
+
+    results = {}
+    with override_settings(**overrides):
+        client = Client()
+        for name, path in paths.items():
+            # Данные берутся из Response до рендеринга: даты, ленивые строки
+            # и прочие объекты остаются такими, какими их получает рендерер.
+            data = client.get(path, HTTP_ACCEPT="application/json").data
+            baseline, baseline_timings = _time_render(JSONRenderer(), data, requests, warmup)
+            fast, fast_timings = _time_render(FastJSONRenderer(), data, requests, warmup)
+            baseline_ms = percentile(baseline_timings, 50)
+            fast_ms = percentile(fast_timings, 50)
+            results[name] = {
+                "path": path,
+                "bytes": len(fast),
+                "identical": fast == baseline,
+                "json_p50_ms": round(baseline_ms, 3),
+                "fast_p50_ms": round(fast_ms, 3),
+                "speedup": round(baseline_ms / fast_ms, 2) if fast_ms else None,
+            }
+
+    return {
+        "environment": {
+            **_benchmark_environment(),
+            "json_backend": JSON_BACKEND,
+            "requests": requests,
+            "warmup": warmup,
+        },
+        "catalog": _catalog_size(),
+        "results": results,
+    }
@@ -0,0 +1,356 @@
+"""
+Кэш ответов на чтение с версионированием по поколениям моделей.
+
+Ключ ответа включает URL, параметры запроса и текущие номера поколений
+моделей, от которых зависит ответ. Любое изменение модели увеличивает её
+поколение (см. ``signals.py``), поэтому старые ответы перестают находиться
+и вытесняются сами, без перебора ключей.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from django.utils.module_loading import import_string
+
+
+DEFAULT_SETTINGS = {
+    "BACKEND": "artist_catalog.cache.LocMemResponseCache",
+    "TIMEOUT": 300,
+    "OPTIONS": {},
+}
+
+
+class BaseResponseCache:
+    """
+    Хранилище закэшированных ответов и поколений моделей.
+    """
+
+    def __init__(self, timeout=300, key_prefix="catalog"):
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def get_generations(self, labels):
+        raise NotImplementedError
+
+    def bump_generation(self, label):
+        raise NotImplementedError
+
+    def changed_since(self, labels, timestamp):
+        """
+        Менялась ли хотя бы одна из моделей после ``timestamp`` (``time.time()``).
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    # Асинхронные варианты для асинхронных действий вьюсетов. По умолчанию
+    # вызывают синхронные методы: это подходит для кэша в памяти процесса,
+    # сетевые хранилища должны их переопределить.
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aget_generations(self, labels):
+        return self.get_generations(labels)
+
+    def record(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+class LocMemResponseCache(BaseResponseCache):
+    """
+    Кэш в памяти процесса с вытеснением давно не использованных ответов (LRU).
+
+    Поколения хранятся в том же процессе, поэтому при нескольких процессах
+    сервера изменения, сделанные в другом процессе, станут видны только после
+    истечения ``TIMEOUT``. Для нескольких процессов используйте
+    ``DjangoResponseCache`` с файловым или Redis-кэшем.
+    """
+
+    def __init__(self, max_entries=1000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._bumped_at = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.timeout if self.timeout else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_generations(self, labels):
+        with self._lock:
+            return {label: self._generations.get(label, 0) for label in labels}
+
+    def bump_generation(self, label):
+        with self._lock:
+            self._generations[label] = self._generations.get(label, 0) + 1
+            self._bumped_at[label] = time.time()
+
+    def changed_since(self, labels, timestamp):
+        with self._lock:
+            return any(self._bumped_at.get(label, 0) > timestamp for label in labels)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats["entries"] = len(self._entries)
+        return stats
+
+
+class DjangoResponseCache(BaseResponseCache):
+    """
+    Кэш поверх бэкенда из ``CACHES`` (файловый, Redis, Memcached).
+
+    Ответы и поколения хранятся в общем хранилище, поэтому кэш корректен для
+    нескольких процессов. Вытеснение выполняет сам бэкенд.
+    """
+
+    def __init__(self, alias="default", **kwargs):
+        super().__init__(**kwargs)
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation_key(self, label):
+        return f"{self.key_prefix}:generation:{label}"
+
+    def _bumped_at_key(self, label):
+        return f"{self.key_prefix}:bumped-at:{label}"
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.timeout)
+
+    def get_generations(self, labels):
+        keys = {self._generation_key(label): label for label in labels}
+        stored = self.cache.get_many(list(keys))
+        return {label: stored.get(key, 0) for key, label in keys.items()}
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aget_generations(self, labels):
+        keys = {self._generation_key(label): label for label in labels}
+        stored = await self.cache.aget_many(list(keys))
+        return {label: stored.get(key, 0) for key, label in keys.items()}
+
+    def bump_generation(self, label):
+        key = self._generation_key(label)
+        # Поколения не должны истекать: иначе счётчик начнётся заново
+        # и может совпасть с уже закэшированным ключом.
+        if not self.cache.add(key, 1, None):
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, 1, None)
+        self.cache.set(self._bumped_at_key(label), time.time(), None)
+
+    def changed_since(self, labels, timestamp):
+        stored = self.cache.get_many([self._bumped_at_key(label) for label in labels])
+        return any(bumped_at > timestamp for bumped_at in stored.values())
+
+    def clear(self):
+        self.cache.clear()
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Возвращает кэш ответов из настройки ``CATALOG_RESPONSE_CACHE``
+    или ``None``, если кэш отключён.
+    """
+    global _response_cache
+
+    config = getattr(settings, "CATALOG_RESPONSE_CACHE", DEFAULT_SETTINGS)
+    if not config:
+        return None
+
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                backend = import_string(config.get("BACKEND", DEFAULT_SETTINGS["BACKEND"]))
+                _response_cache = backend(
+                    timeout=config.get("TIMEOUT", DEFAULT_SETTINGS["TIMEOUT"]),
+                    key_prefix=config.get("KEY_PREFIX", "catalog"),
+                    **config.get("OPTIONS", {}),
+                )
+
+    return _response_cache
+
+
+def reset_response_cache():
+    global _response_cache
+    _response_cache = None
+
+
+def bump_generation(model):
+    cache = get_response_cache()
+    if cache is not None:
+        cache.bump_generation(model._meta.label_lower)
+
+
+class CachedResponseMixin:
+    """
+    Кэширует JSON-ответы действий ``cached_actions`` вьюсета.
+
+    ``cache_models`` — модели, от данных которых зависит ответ. Закэшированный
+    ответ отдаётся без обращения к базе данных и сериализации; сохранённые
+    вместе с ним ETag и Last-Modified проверяются по условным заголовкам запроса.
+    """
+    cache_models = ()
+    cached_actions = ("list", "retrieve")
+    cached_headers = ("ETag", "Last-Modified")
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.acached_response(super().aretrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request, generations):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        parts = [
+            request.build_absolute_uri(request.path),
+            query,
+            request.accepted_media_type,
+            ",".join(f"{label}={generation}" for label, generation in sorted(generations.items())),
+        ]
+        digest = hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+        return f"{get_response_cache().key_prefix}:response:{self.basename}:{self.action}:{digest}"
+
+    def is_cacheable(self, request, cache):
+        return (
+            cache is not None
+            and self.action in self.cached_actions
+            and getattr(request.accepted_renderer, "format", None) == "json"
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_response_cache()
+        if not self.is_cacheable(request, cache):
+            return handler(request, *args, **kwargs)
+
+        generations = cache.get_generations(model._meta.label_lower for model in self.cache_models)
+        key = self.get_response_cache_key(request, generations)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cached_hit(request, cache, cached)
+
+        cache.record(hit=False)
+        return self.cache_on_render(handler(request, *args, **kwargs), cache, key)
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        cache = get_response_cache()
+        if not self.is_cacheable(request, cache):
+            return await handler(request, *args, **kwargs)
+
+        generations = await cache.aget_generations(
+            [model._meta.label_lower for model in self.cache_models]
+        )
+        key = self.get_response_cache_key(request, generations)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return self.cached_hit(request, cache, cached)
+
+        cache.record(hit=False)
+        return self.cache_on_render(await handler(request, *args, **kwargs), cache, key)
+
+    def can_store_response(self, cache):
+        return True
+
+    def cached_hit(self, request, cache, cached):
+        cache.record(hit=True)
+        response = HttpResponse(cached["content"], content_type=cached["content_type"])
+        for header, value in cached.get("headers", {}).items():
+            response[header] = value
+        response["X-Cache"] = "HIT"
+        last_modified = None
+        if self.action in getattr(self, "last_modified_actions", self.cached_actions):
+            last_modified = parse_http_date_safe(response.get("Last-Modified", ""))
+        return get_conditional_response(
+            request, etag=response.get("ETag"), last_modified=last_modified, response=response,
+        )
+
+    def cache_on_render(self, response, cache, key):
+        # Ответ сохраняется после рендеринга; у асинхронных действий Django
+        # рендерит ответ в потоке, поэтому обращения к кэшу могут быть синхронными.
+        if response.status_code == 200:
+            response["X-Cache"] = "MISS"
+
+            def store(rendered):
+                if self.can_store_response(cache):
+                    cache.set(key, {
+                        "content": rendered.content,
+                        "content_type": rendered["Content-Type"],
+                        "headers": {
+                            header: rendered[header]
+                            for header in self.cached_headers
+                            if rendered.has_header(header)
+                        },
+                    })
+
+            response.add_post_render_callback(store)
+
+        return response
@@ -0,0 +1,194 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для вьюсетов каталога.
+"""
+
+import hashlib
+from calendar import timegm
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.db.models.constants import LOOKUP_SEP
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from artist_catalog.cache import get_response_cache
+from artist_catalog.counting import count_view_rows, is_whole_table
+
+
+class ConditionalResponseMixin:
+    """
+    Отвечает 304 на ``If-None-Match``/``If-Modified-Since`` без сериализации.
+
+    Валидаторы вычисляются одним агрегирующим запросом по отфильтрованному
+    queryset: максимум ``updated_at`` по полям ``timestamp_fields`` (включая
+    связанные модели, данные которых попадают в ответ) и число строк —
+    оно меняется при удалениях. Число строк списка считается так же, как
+    в пагинации, и запоминается на вьюсете (``count_view_rows``), поэтому
+    пагинация его не пересчитывает. Для списка без фильтров это оценка
+    планировщика или закэшированный ``COUNT(*)`` (см. ``counting.py``), а
+    максимумы ``updated_at`` читаются по индексам таблиц по отдельности,
+    без соединения таблиц целиком (см. ``get_table_aggregates``).
+
+    Оценка планировщика не сразу замечает удаления, поэтому с ней в ETag
+    входят и поколения ``cache_models`` из кэша ответов. Без кэша такой
+    список отдаётся без валидаторов.
+
+    ``Last-Modified`` — максимум ``updated_at``; удаление строки его не
+    меняет, поэтому ``If-Modified-Since`` проверяется только для действий
+    из ``last_modified_actions``. Списки сверяются лишь по ETag.
+    """
+    conditional_actions = ("list", "retrieve")
+    last_modified_actions = ("retrieve",)
+    timestamp_fields = ("updated_at",)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.aconditional_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self.aconditional_response(super().aretrieve, request, *args, **kwargs)
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == "retrieve":
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        return queryset.order_by()
+
+    def get_validator_aggregates(self):
+        return {
+            f"updated_{index}": Max(field)
+            for index, field in enumerate(self.timestamp_fields)
+        }
+
+    def get_table_aggregates(self, queryset):
+        """
+        ``{модель: {имя: Max(колонка)}}`` для ``timestamp_fields``.
+
+        Максимум по всей таблице не меньше максимума по соединению, поэтому
+        ETag списка без фильтров не устаревает, а лишь иногда меняется из-за
+        связанных строк, не попавших в ответ. Зато каждый максимум читается
+        из индекса ``updated_at``, а не перебором всех строк соединения.
+        """
+        tables = {}
+        for index, field in enumerate(self.timestamp_fields):
+            *relations, column = field.split(LOOKUP_SEP)
+            model = queryset.model
+            for relation in relations:
+                model = model._meta.get_field(relation).related_model
+            tables.setdefault(model, {})[f"updated_{index}"] = Max(column)
+        return tables
+
+    def get_validators(self, request):
+        aggregates = self.get_validator_aggregates()
+        queryset = self.get_validator_queryset()
+        can_store = getattr(self, "can_store_response", None)
+        if self.action == "list" and is_whole_table(queryset):
+            total, approximate = count_view_rows(self, queryset, can_store)
+            values = {"total": total}
+            if approximate:
+                cache = get_response_cache()
+                if cache is None:
+                    return None, None, total
+                values["generations"] = cache.get_generations(self.get_generation_labels())
+            for model, columns in self.get_table_aggregates(queryset).items():
+                values.update(model._default_manager.using(queryset.db).aggregate(**columns))
+        else:
+            values = queryset.aggregate(total=Count("pk", distinct=True), **aggregates)
+            self.remember_row_count(values["total"])
+        return self.build_validators(request, aggregates, values)
+
+    async def aget_validators(self, request):
+        aggregates = self.get_validator_aggregates()
+        queryset = self.get_validator_queryset()
+        can_store = getattr(self, "can_store_response", None)
+        if self.action == "list" and is_whole_table(queryset):
+            total, approximate = await sync_to_async(count_view_rows)(self, queryset, can_store)
+            values = {"total": total}
+            if approximate:
+                cache = get_response_cache()
+                if cache is None:
+                    return None, None, total
+                values["generations"] = await cache.aget_generations(self.get_generation_labels())
+            for model, columns in self.get_table_aggregates(queryset).items():
+                values.update(await model._default_manager.using(queryset.db).aaggregate(**columns))
+        else:
+            values = await queryset.aaggregate(total=Count("pk", distinct=True), **aggregates)
+            self.remember_row_count(values["total"])
+        return self.build_validators(request, aggregates, values)
+
+    def remember_row_count(self, total):
+        # COUNT(DISTINCT id) не зависит от соединений timestamp_fields
+        # и совпадает с числом строк, которое посчитала бы пагинация.
+        if self.action == "list":
+            self.row_count = (total, False)
+
+    def get_generation_labels(self):
+        return [model._meta.label_lower for model in getattr(self, "cache_models", ())]
+
+    def build_validators(self, request, aggregates, values):
+        timestamps = [values[name] for name in aggregates if values[name] is not None]
+        generations = sorted(values.get("generations", {}).items())
+
+        parts = [
+            request.get_full_path(),
+            request.accepted_media_type,
+            str(values["total"]),
+            *(timestamp.isoformat() for timestamp in timestamps),
+            *(f"{label}:{generation}" for label, generation in generations),
+        ]
+        etag = quote_etag(hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest())
+        last_modified = timegm(max(timestamps).utctimetuple()) if timestamps else None
+        return etag, last_modified, values["total"]
+
+    def is_conditional(self, request):
+        return self.action in self.conditional_actions and request.method in ("GET", "HEAD")
+
+    def get_conditional_last_modified(self, last_modified):
+        return last_modified if self.action in self.last_modified_actions else None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return handler(request, *args, **kwargs)
+
+        etag, last_modified, total = self.get_validators(request)
+        if etag is None or self.action == "retrieve" and not total:
+            return handler(request, *args, **kwargs)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=self.get_conditional_last_modified(last_modified)
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        return self.set_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, handler, request, *args, **kwargs):
+        if not self.is_conditional(request):
+            return await handler(request, *args, **kwargs)
+
+        etag, last_modified, total = await self.aget_validators(request)
+        if etag is None or self.action == "retrieve" and not total:
+            return await handler(request, *args, **kwargs)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=self.get_conditional_last_modified(last_modified)
+        )
+        if response is None:
+            response = await handler(request, *args, **kwargs)
+
+        return self.set_validators(response, etag, last_modified)
+
+    def set_validators(self, response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified is not None:
+                response["Last-Modified"] = http_date(last_modified)
+
+        return response
@@ -0,0 +1,195 @@
+"""
+Денормализованные счётчики ``Album.tracks_count``, ``Artist.albums_count``
+и ``Artist.tracks_count``.
+
+Счётчики меняются атомарными F-выражениями в той же транзакции, что и данные.
+Создание, удаление и смена исполнителя альбома через ``save()``/``delete()``
+учитываются обработчиками сигналов ниже; массовые операции над треками
+(``bulk_create``, ``QuerySet.delete``, COPY) и инлайны админки вызывают
+``adjust_track_counters`` явно. ``recount_catalog`` пересчитывает всё заново.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from artist_catalog.models import Album, AlbumTrack, Artist, Music
+from artist_catalog.signals import bulk_changed
+
+
+class SubqueryCount(Subquery):
+    """
+    Коррелированный подзапрос ``COUNT(*)`` для аннотаций и пересчёта.
+
+    В отличие от ``Count`` через JOIN не требует GROUP BY по всей таблице.
+    """
+    template = "(SELECT COUNT(*) FROM (%(subquery)s) _count)"
+    output_field = IntegerField()
+
+
+def _apply_deltas(model, deltas):
+    """
+    Прибавляет приращения ``{pk: {field: delta}}`` к полям модели.
+
+    Строки с одинаковым набором приращений обновляются одним UPDATE.
+    """
+    groups = defaultdict(list)
+    for pk, fields in deltas.items():
+        key = tuple(sorted((field, delta) for field, delta in fields.items() if delta))
+        if key:
+            groups[key].append(pk)
+
+    if not groups:
+        return
+
+    # QuerySet.update не заполняет auto_now, а счётчики попадают в ответы API,
+    # поэтому updated_at обновляется вместе с ними (для ETag и Last-Modified).
+    updated_at = timezone.now()
+    for key, pks in groups.items():
+        model.objects.filter(pk__in=pks).update(
+            updated_at=updated_at,
+            **{field: F(field) + delta for field, delta in key},
+        )
+    bulk_changed.send(sender=model)
+
+
+def adjust_track_counters(album_deltas, artist_by_album=None):
+    """
+    Прибавляет ``{album_id: delta}`` к числу треков альбомов и их исполнителей.
+
+    ``artist_by_album`` — известные вызывающему ``{album_id: artist_id}``;
+    для остальных альбомов исполнитель читается одним запросом.
+    """
+    album_deltas = {album_id: delta for album_id, delta in album_deltas.items() if delta}
+    if not album_deltas:
+        return
+
+    artist_by_album = dict(artist_by_album or {})
+    unknown = [album_id for album_id in album_deltas if album_id not in artist_by_album]
+    if unknown:
+        artist_by_album.update(
+            Album.objects.filter(pk__in=unknown).order_by().values_list("pk", "artist_id")
+        )
+
+    artist_deltas = Counter()
+    for album_id, delta in album_deltas.items():
+        if album_id in artist_by_album:
+            artist_deltas[artist_by_album[album_id]] += delta
+
+    _apply_deltas(Album, {
+        album_id: {"tracks_count": delta} for album_id, delta in album_deltas.items()
+    })
+    _apply_deltas(Artist, {
+        artist_id: {"tracks_count": delta} for artist_id, delta in artist_deltas.items()
+    })
+
+
+def adjust_artist_counters(artist_deltas):
+    """
+    Прибавляет ``{artist_id: (albums_delta, tracks_delta)}`` к счётчикам исполнителей.
+    """
+    _apply_deltas(Artist, {
+        artist_id: {"albums_count": albums_delta, "tracks_count": tracks_delta}
+        for artist_id, (albums_delta, tracks_delta) in artist_deltas.items()
+    })
+
+
+@transaction.atomic
+def recount_catalog():
+    """
+    Пересчитывает все счётчики по фактическим данным двумя UPDATE.
+
+    Возвращает число исправленных альбомов и исполнителей.
+    """
+    updated_at = timezone.now()
+
+    albums = (
+        Album.objects
+        .annotate(actual_tracks=SubqueryCount(
+            AlbumTrack.objects.filter(album=OuterRef("pk")).order_by().values("pk")
+        ))
+        .exclude(tracks_count=F("actual_tracks"))
+        .update(tracks_count=F("actual_tracks"), updated_at=updated_at)
+    )
+
+    artists = (
+        Artist.objects
+        .annotate(
+            actual_albums=SubqueryCount(
+                Album.objects.filter(artist=OuterRef("pk")).order_by().values("pk")
+            ),
+            actual_tracks=Coalesce(
+                Subquery(
+                    Album.objects
+                    .filter(artist=OuterRef("pk"))
+                    .order_by()
+                    .values("artist")
+                    .annotate(total=Sum("tracks_count"))
+                    .values("total")
+                ),
+                0,
+            ),
+        )
+        .exclude(albums_count=F("actual_albums"), tracks_count=F("actual_tracks"))
+        .update(
+            albums_count=F("actual_albums"),
+            tracks_count=F("actual_tracks"),
+            updated_at=updated_at,
+        )
+    )
+
+    if albums:
+        bulk_changed.send(sender=Album)
+    if artists:
+        bulk_changed.send(sender=Artist)
+
+    return {"albums": albums, "artists": artists}
+
+
+@receiver(post_save, sender=Album)
+def count_saved_album(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    loaded_artist_id = getattr(instance, "_loaded_artist_id", None)
+    instance._loaded_artist_id = instance.artist_id
+
+    if created:
+        adjust_artist_counters({instance.artist_id: (1, instance.tracks_count)})
+    elif loaded_artist_id is not None and loaded_artist_id != instance.artist_id:
+        tracks_count = (
+            Album.objects.filter(pk=instance.pk).order_by()
+            .values_list("tracks_count", flat=True).first()
+            or 0
+        )
+        adjust_artist_counters({
+            loaded_artist_id: (-1, -tracks_count),
+            instance.artist_id: (1, tracks_count),
+        })
+
+
+@receiver(post_delete, sender=Album)
+def count_deleted_album(sender, instance, **kwargs):
+    # Треки альбома удаляются каскадом вместе с ним, поэтому исполнитель
+    # теряет и альбом, и все его треки.
+    adjust_artist_counters({instance.artist_id: (-1, -instance.tracks_count)})
+
+
+@receiver(pre_delete, sender=Music)
+def collect_music_albums(sender, instance, **kwargs):
+    instance._counted_album_ids = list(
+        AlbumTrack.objects.filter(track=instance).order_by().values_list("album_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Music)
+def count_deleted_music(sender, instance, **kwargs):
+    # Песня удаляется каскадом из всех альбомов, где она была треком.
+    adjust_track_counters({
+        album_id: -1 for album_id in getattr(instance, "_counted_album_ids", ())
+    })
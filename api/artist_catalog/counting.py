@@ -0,0 +1,121 @@
+"""
+Подсчёт строк для пагинации без ``COUNT(*)`` по всей таблице.
+
+Отфильтрованные queryset считаются точно. Для queryset без условий (вся
+таблица) число строк берётся:
+
+* из оценки планировщика PostgreSQL (``pg_class.reltuples``), если она не
+  меньше ``CATALOG_COUNT_ESTIMATE_THRESHOLD`` — такое число приблизительное;
+* иначе из кэша ответов: точный ``COUNT(*)`` сохраняется под текущим
+  поколением модели и пересчитывается после её изменения (см. ``cache.py``).
+
+Используется в ``CatalogLimitOffsetPagination``, ``CatalogAdminPaginator``
+и в ETag списков (``conditional.py``). Вьюсет считает строки не больше
+одного раза за запрос: ``count_view_rows`` запоминает результат в
+``view.row_count``, и пагинация берёт его оттуда.
+"""
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from artist_catalog.cache import get_response_cache
+
+
+def is_whole_table(queryset):
+    """
+    Выбирает ли ``queryset`` все строки своей таблицы.
+    """
+    query = queryset.query
+    return (
+        not query.where
+        and not query.distinct
+        and not query.combinator
+        and query.low_mark == 0
+        and query.high_mark is None
+    )
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк таблицы планировщиком PostgreSQL или ``None``
+    (другая СУБД, таблица ещё не анализировалась).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [connection.ops.quote_name(queryset.model._meta.db_table)],
+        )
+        row = cursor.fetchone()
+
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def cached_count(queryset, can_store=None):
+    """
+    Точное число строк таблицы, закэшированное до изменения модели.
+
+    ``can_store(cache)`` решает, можно ли сохранить посчитанное значение
+    (например, прочитанное из отстающей реплики).
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return queryset.count()
+
+    label = queryset.model._meta.label_lower
+    generation = cache.get_generations([label])[label]
+    key = f"{cache.key_prefix}:count:{label}:{generation}"
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        if can_store is None or can_store(cache):
+            cache.set(key, count)
+    return count
+
+
+def count_rows(queryset, can_store=None):
+    """
+    Возвращает ``(число строк, приблизительное ли оно)`` для ``queryset``.
+    """
+    if not is_whole_table(queryset):
+        return queryset.count(), False
+
+    threshold = getattr(settings, "CATALOG_COUNT_ESTIMATE_THRESHOLD", 100_000)
+    estimate = estimate_count(queryset)
+    if estimate is not None and estimate >= threshold:
+        return estimate, True
+
+    return cached_count(queryset, can_store), False
+
+
+def count_view_rows(view, queryset, can_store=None):
+    """
+    ``count_rows`` для списка вьюсета ``view``, посчитанный один раз за запрос.
+    """
+    if view is None:
+        return count_rows(queryset, can_store)
+    if getattr(view, "row_count", None) is None:
+        view.row_count = count_rows(queryset, can_store)
+    return view.row_count
+
+
+class CatalogAdminPaginator(Paginator):
+    """
+    Пагинатор списков админки с тем же подсчётом строк, что и у API.
+
+    Вместе с ``show_full_result_count = False`` избавляет список без
+    фильтров от ``COUNT(*)`` по всей таблице.
+    """
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "query"):
+            return super().count
+        return count_rows(self.object_list)[0]
@@ -0,0 +1,110 @@
+"""
+Встраивание связанных ресурсов в ответ: ``?expand=``.
+
+Вьюсет перечисляет встраиваемые связи в ``expandable_fields``; параметр
+``expand`` принимает их имена через запятую (``?expand=tracks,artist``) и
+действует на ``list``/``retrieve``. Для каждой связи задаются поле
+сериализатора, которое добавляется (или заменяет одноимённое) в ответ,
+и функция, дополняющая queryset ``select_related``/``prefetch_related``:
+число SQL-запросов на страницу не зависит от её размера.
+
+Модели и поля ``updated_at`` встроенных данных добавляются к ``cache_models``
+и ``timestamp_fields`` вьюсета, поэтому кэш ответов и ETag учитывают их
+изменения.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+from rest_framework.exceptions import ValidationError
+
+
+EXPAND_PARAM = "expand"
+
+Expansion = namedtuple(
+    "Expansion", ["field", "prepare_queryset", "cache_models", "timestamp_fields"]
+)
+
+
+@lru_cache(maxsize=None)
+def expanded_serializer(serializer_class, fields):
+    """
+    Подкласс ``serializer_class`` с дополнительными полями ``fields``
+    (кортеж пар ``(имя, поле)``).
+    """
+    attrs = dict(fields)
+    meta = getattr(serializer_class, "Meta", None)
+    if meta is not None and isinstance(getattr(meta, "fields", None), (list, tuple)):
+        extra = tuple(name for name, _ in fields if name not in meta.fields)
+        attrs["Meta"] = type("Meta", (meta,), {"fields": (*meta.fields, *extra)})
+
+    name = "".join(name.title() for name, _ in fields)
+    return type(f"{serializer_class.__name__}With{name}", (serializer_class,), attrs)
+
+
+class ExpandMixin:
+    """
+    Параметр ``expand`` для действий ``expand_actions``.
+
+    Стоит после ``SparseFieldsMixin``: встроенные поля можно выбрать
+    или исключить через ``fields``/``exclude``.
+    """
+    expand_actions = ("list", "retrieve")
+    expandable_fields = {}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        expansions = [self.expandable_fields[name] for name in self.get_expand()]
+        if expansions:
+            self.cache_models = tuple(dict.fromkeys(
+                [*self.cache_models, *(model for item in expansions for model in item.cache_models)]
+            ))
+            self.timestamp_fields = tuple(dict.fromkeys(
+                [*self.timestamp_fields, *(field for item in expansions for field in item.timestamp_fields)]
+            ))
+
+    def get_expand(self):
+        """
+        Имена встраиваемых связей в порядке ``expandable_fields``.
+        """
+        if not hasattr(self, "_expand"):
+            self._expand = self.parse_expand()
+        return self._expand
+
+    def parse_expand(self):
+        request = getattr(self, "request", None)
+        if request is None or self.action not in self.expand_actions:
+            return ()
+
+        names = {
+            name.strip()
+            for value in request.query_params.getlist(EXPAND_PARAM)
+            for name in value.split(",")
+            if name.strip()
+        }
+        unknown = sorted(names - set(self.expandable_fields))
+        if unknown:
+            raise ValidationError({
+                EXPAND_PARAM: [
+                    f"Неизвестные связи: {', '.join(unknown)}. "
+                    f"Допустимые значения: {', '.join(self.expandable_fields)}"
+                ]
+            })
+
+        return tuple(name for name in self.expandable_fields if name in names)
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        names = self.get_expand()
+        if not names:
+            return serializer_class
+        return expanded_serializer(
+            serializer_class,
+            tuple((name, self.expandable_fields[name].field) for name in names),
+        )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for name in self.get_expand():
+            queryset = self.expandable_fields[name].prepare_queryset(queryset)
+        return queryset
@@ -0,0 +1,171 @@
+"""
+Потоковая выгрузка каталога в NDJSON/JSON.
+
+Записи читаются итераторами QuerySet (на PostgreSQL — серверными курсорами)
+и кодируются построчно, поэтому расход памяти не зависит от размера каталога.
+
+На PostgreSQL вся выгрузка читается в одной транзакции ``REPEATABLE READ
+READ ONLY``: сущности согласованы между собой, как в одном снимке базы.
+На других СУБД снимка нет: каждая сущность читается отдельным запросом,
+и изменения, сделанные во время выгрузки, могут попасть в одни сущности
+и не попасть в другие.
+"""
+
+import zlib
+from itertools import chain
+
+from django.db import connections, router, transaction
+
+from artist_catalog.models import Artist, Album, AlbumTrack, Music
+from artist_catalog.renderers import dumps, iter_dumps_array
+
+
+ENTITIES = ("artists", "albums", "music")
+FORMATS = ("ndjson", "json")
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def _iter_artists(since_id):
+    rows = (
+        Artist.objects
+        .filter(id__gt=since_id)
+        .order_by("id")
+        .values_list("id", "artist_name")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for artist_id, artist_name in rows:
+        yield {"id": artist_id, "artist_name": artist_name}
+
+
+def _iter_music(since_id):
+    rows = (
+        Music.objects
+        .filter(id__gt=since_id)
+        .order_by("id")
+        .values_list("id", "title")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for music_id, title in rows:
+        yield {"id": music_id, "title": title}
+
+
+def _iter_albums(since_id):
+    # Альбомы и их треки читаются двумя курсорами в порядке album_id
+    # и сливаются, поэтому в памяти находится только текущий альбом.
+    albums = (
+        Album.objects
+        .filter(id__gt=since_id)
+        .order_by("id")
+        .values_list("id", "artist_id", "artist__artist_name", "release_date")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    tracks = (
+        AlbumTrack.objects
+        .filter(album_id__gt=since_id)
+        .order_by("album_id", "track_number")
+        .values_list("album_id", "track__title", "track_number")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    pending = next(tracks, None)
+    for album_id, artist_id, artist_name, release_date in albums:
+        album_tracks = []
+        while pending is not None and pending[0] <= album_id:
+            if pending[0] == album_id:
+                album_tracks.append({"title": pending[1], "number": pending[2]})
+            pending = next(tracks, None)
+
+        yield {
+            "id": album_id,
+            "artist_id": artist_id,
+            "album": {"artist": artist_name, "release_date": release_date},
+            "tracks": album_tracks,
+        }
+
+
+_ITERATORS = {
+    "artists": _iter_artists,
+    "albums": _iter_albums,
+    "music": _iter_music,
+}
+
+
+def iter_records(entities=ENTITIES, since_id=0):
+    """
+    Возвращает пары ``(entity, record)`` в порядке ``entities``.
+
+    ``since_id`` применяется к первой сущности: так прерванную выгрузку можно
+    продолжить с последнего полученного id, а следующие сущности выгружаются
+    целиком.
+    """
+    for index, entity in enumerate(entities):
+        for record in _ITERATORS[entity](since_id if index == 0 else 0):
+            yield entity, record
+
+
+def iter_ndjson(entities=ENTITIES, since_id=0):
+    for entity, record in iter_records(entities, since_id):
+        yield dumps({"type": entity, **record}) + b"\n"
+
+
+def iter_json(entities=ENTITIES, since_id=0):
+    # Сущности без записей в выгрузку не попадают.
+    started = False
+    for index, entity in enumerate(entities):
+        records = _ITERATORS[entity](since_id if index == 0 else 0)
+        first = next(records, None)
+        if first is None:
+            continue
+        yield (b"," if started else b"{") + dumps(entity) + b":"
+        yield from iter_dumps_array(chain([first], records))
+        started = True
+    yield b"}" if started else b"{}"
+
+
+def in_snapshot(pieces, using):
+    """
+    Отдаёт ``pieces``, читая их в одной транзакции ``REPEATABLE READ`` (PostgreSQL).
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql" or connection.in_atomic_block:
+        yield from pieces
+        return
+
+    with transaction.atomic(using=using):
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        yield from pieces
+
+
+def iter_export(entities=ENTITIES, since_id=0, output_format="ndjson", compress=False):
+    """
+    Возвращает выгрузку каталога блоками байт размером около ``BUFFER_SIZE``.
+    """
+    if output_format == "json":
+        pieces = iter_json(entities, since_id)
+    else:
+        pieces = iter_ndjson(entities, since_id)
+    pieces = in_snapshot(pieces, router.db_for_read(Artist))
+
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    buffer = []
+    size = 0
+
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= BUFFER_SIZE:
+            chunk = b"".join(buffer)
+            buffer, size = [], 0
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = b"".join(buffer)
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
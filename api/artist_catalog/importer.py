@@ -0,0 +1,241 @@
+"""
+Пакетный импорт альбомов из CSV/NDJSON.
+
+Строки проверяются правилами ``AlbumImportSerializer``, исполнители и песни
+разрешаются множественными запросами, а запись идёт пачками: каждая пачка —
+одна транзакция из нескольких ``bulk_create`` (на PostgreSQL треки альбомов
+загружаются через COPY), число треков альбома записывается сразу при вставке.
+Ошибки собираются по строкам и не прерывают импорт.
+"""
+
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from artist_catalog.counters import adjust_artist_counters
+from artist_catalog.models import Album, AlbumTrack, Artist
+from artist_catalog.serializers import AlbumImportSerializer
+from artist_catalog.services import resolve_artist_names, resolve_music_titles
+from artist_catalog.signals import bulk_changed
+
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+CSV_FIELDS = ("artist", "artist_name", "release_date", "title", "number")
+
+
+def read_ndjson(stream):
+    """
+    Читает по альбому на строку, возвращает пары ``(row_number, data)``.
+
+    Для строк, которые не удалось разобрать, вместо данных возвращается
+    ``ValueError``.
+    """
+    for row_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield row_number, ValueError(f"Некорректный JSON: {exc}")
+            continue
+        if not isinstance(data, dict):
+            yield row_number, ValueError("Ожидается JSON-объект альбома.")
+            continue
+        yield row_number, data
+
+
+def read_csv(stream):
+    """
+    Читает CSV с колонками ``CSV_FIELDS``, по треку на строку.
+
+    Идущие подряд строки одного исполнителя с одной датой выпуска собираются
+    в альбом; строка без ``title`` задаёт альбом без треков. Номер строки
+    альбома — номер его первой строки в файле.
+    """
+    reader = csv.DictReader(stream)
+    missing = {"release_date", "title", "number"} - set(reader.fieldnames or ())
+    if missing:
+        yield 1, ValueError(f"В CSV нет колонок: {', '.join(sorted(missing))}")
+        return
+
+    album_key = None
+    album_row_number = None
+    album = None
+
+    for row_number, row in enumerate(reader, 2):
+        key = (row.get("artist") or "", row.get("artist_name") or "", row["release_date"])
+        if key != album_key:
+            if album is not None:
+                yield album_row_number, album
+
+            album_key = key
+            album_row_number = row_number
+            album = {"release_date": row["release_date"], "tracks": []}
+            if row.get("artist"):
+                album["artist"] = row["artist"]
+            if row.get("artist_name"):
+                album["artist_name"] = row["artist_name"]
+
+        if row.get("title"):
+            album["tracks"].append({"title": row["title"], "number": row["number"]})
+
+    if album is not None:
+        yield album_row_number, album
+
+
+def read_records(stream, file_format):
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.StringIO(stream.decode("utf-8-sig"))
+    elif not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if file_format == "csv":
+        return read_csv(stream)
+    return read_ndjson(stream)
+
+
+def _insert_album_tracks(album_tracks):
+    if connection.vendor == "postgresql" and getattr(settings, "CATALOG_IMPORT_USE_COPY", True):
+        updated_at = timezone.now().isoformat()
+        data = "".join(
+            f"{at.album_id}\t{at.track_id}\t{at.track_number}\t{updated_at}\n"
+            for at in album_tracks
+        )
+        sql = (
+            f'COPY "{AlbumTrack._meta.db_table}" '
+            f'("album_id", "track_id", "track_number", "updated_at") FROM STDIN'
+        )
+        with connection.cursor() as cursor:
+            raw_cursor = cursor.cursor
+            if hasattr(raw_cursor, "copy_expert"):
+                raw_cursor.copy_expert(sql, io.StringIO(data))
+            else:
+                with raw_cursor.copy(sql) as copy:
+                    copy.write(data)
+        return
+
+    AlbumTrack.objects.bulk_create(album_tracks)
+
+
+def _write_batch(batch):
+    artist_by_name = resolve_artist_names(
+        attrs["artist_name"] for _, attrs in batch if "artist" not in attrs
+    )
+    albums = Album.objects.bulk_create([
+        Album(
+            artist_id=attrs["artist"] if "artist" in attrs else artist_by_name[attrs["artist_name"]].id,
+            release_date=attrs["release_date"],
+            tracks_count=len(attrs.get("tracks", ())),
+        )
+        for _, attrs in batch
+    ])
+
+    artist_deltas = {}
+    for album in albums:
+        albums_delta, tracks_delta = artist_deltas.get(album.artist_id, (0, 0))
+        artist_deltas[album.artist_id] = (albums_delta + 1, tracks_delta + album.tracks_count)
+    adjust_artist_counters(artist_deltas)
+
+    music_by_title = resolve_music_titles(
+        track_item["title"].strip()
+        for _, attrs in batch
+        for track_item in attrs.get("tracks", ())
+    )
+    album_tracks = [
+        AlbumTrack(
+            album_id=album.id,
+            track_id=music_by_title[track_item["title"].strip()].id,
+            track_number=track_item["number"],
+        )
+        for album, (_, attrs) in zip(albums, batch)
+        for track_item in attrs.get("tracks", ())
+    ]
+    bulk_changed.send(sender=Album)
+    if album_tracks:
+        _insert_album_tracks(album_tracks)
+        bulk_changed.send(sender=AlbumTrack)
+
+    return len(albums)
+
+
+class CatalogImporter:
+    """
+    Импортирует альбомы пачками по ``batch_size`` и собирает отчёт по строкам.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or getattr(settings, "CATALOG_IMPORT_BATCH_SIZE", 500)
+        self.created = 0
+        self.errors = []
+
+    def run(self, records):
+        batch = []
+        for row_number, data in records:
+            if isinstance(data, Exception):
+                self.add_error(row_number, {"non_field_errors": [str(data)]})
+                continue
+
+            serializer = AlbumImportSerializer(data=data)
+            if not serializer.is_valid():
+                self.add_error(row_number, serializer.errors)
+                continue
+
+            batch.append((row_number, serializer.validated_data))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+
+        if batch:
+            self.flush(batch)
+
+        return self.report()
+
+    def flush(self, batch):
+        artist_ids = {attrs["artist"] for _, attrs in batch if "artist" in attrs}
+        if artist_ids:
+            existing = set(Artist.objects.filter(id__in=artist_ids).values_list("id", flat=True))
+            valid = []
+            for row_number, attrs in batch:
+                if "artist" in attrs and attrs["artist"] not in existing:
+                    self.add_error(
+                        row_number,
+                        {"artist": [f"Исполнитель с id={attrs['artist']} не найден."]},
+                    )
+                    continue
+                valid.append((row_number, attrs))
+            batch = valid
+
+        if not batch:
+            return
+
+        try:
+            with transaction.atomic():
+                self.created += _write_batch(batch)
+        except DatabaseError as exc:
+            if len(batch) == 1:
+                self.add_error(batch[0][0], {"non_field_errors": [str(exc)]})
+                return
+
+            # Повторяем пачку построчно, чтобы отделить строки с ошибкой.
+            for item in batch:
+                self.flush([item])
+
+    def add_error(self, row_number, errors):
+        self.errors.append({"row": row_number, "errors": errors})
+
+    def report(self):
+        return {
+            "created": self.created,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+
+def import_catalog(stream, file_format="ndjson", batch_size=None):
+    return CatalogImporter(batch_size=batch_size).run(read_records(stream, file_format))
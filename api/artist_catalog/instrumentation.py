@@ -0,0 +1,259 @@
+"""
+Замер времени запросов по фазам: SQL, сериализация и рендеринг.
+
+``ServerTimingMiddleware`` считает SQL-запросы через ``execute_wrapper``,
+который ставится на каждое подключение при его создании (в том числе
+в потоках ``sync_to_async`` асинхронного ORM) и относит запросы к замеру
+из контекстной переменной, а ``InstrumentedViewMixin`` — время сериализатора
+и рендерера DRF. Итоги отдаются в заголовке ``Server-Timing`` и копятся
+в скользящем окне по каждому действию (``endpoint_timings``).
+Вне запроса, прошедшего через middleware, миксин ничего не делает.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+PHASES = ("db", "serialize", "render")
+
+_current_timings = ContextVar("catalog_request_timings", default=None)
+
+
+def percentile(values, percent):
+    """
+    Перцентиль с линейной интерполяцией между соседними значениями.
+    """
+    values = sorted(values)
+    if not values:
+        return None
+
+    position = (len(values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class RequestTimings:
+    """
+    Замеры одного запроса. Время фаз сериализации и рендеринга не включает
+    SQL, выполненный внутри них: он учитывается в фазе ``db``.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoint = None
+        self.queries = 0
+        self.durations = dict.fromkeys(PHASES, 0.0)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.durations["db"] += time.perf_counter() - started
+
+    def timed(self, phase, func):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            db_before = self.durations["db"]
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.durations[phase] += elapsed - (self.durations["db"] - db_before)
+
+        return wrapper
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        entries = [f'db;dur={self.durations["db"] * 1000:.2f};desc="{self.queries} queries"']
+        entries += [
+            f"{phase};dur={self.durations[phase] * 1000:.2f}"
+            for phase in PHASES[1:]
+            if self.durations[phase]
+        ]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+class EndpointTimings:
+    """
+    Скользящее окно последних ``window`` замеров по каждому действию.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def record(self, endpoint, total, queries, durations):
+        sample = (total, queries, durations["db"], durations["serialize"], durations["render"])
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+
+        summary = {}
+        for endpoint, samples in sorted(snapshot.items()):
+            totals = [sample[0] * 1000 for sample in samples]
+            count = len(samples)
+            summary[endpoint] = {
+                "count": count,
+                "p50_ms": round(percentile(totals, 50), 3),
+                "p95_ms": round(percentile(totals, 95), 3),
+                "p99_ms": round(percentile(totals, 99), 3),
+                "queries": round(sum(sample[1] for sample in samples) / count, 2),
+                **{
+                    f"{phase}_ms": round(
+                        sum(sample[index] for sample in samples) * 1000 / count, 3
+                    )
+                    for index, phase in enumerate(PHASES, 2)
+                },
+            }
+        return summary
+
+
+endpoint_timings = EndpointTimings(window=getattr(settings, "CATALOG_TIMING_WINDOW", 1000))
+
+
+def get_current_timings():
+    return _current_timings.get()
+
+
+def timed_execute(execute, sql, params, many, context):
+    """
+    ``execute_wrapper`` подключения: учитывает запрос в замере текущего
+    HTTP-запроса, если он есть.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute_wrapper(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_timed_execute(sender, connection, **kwargs):
+    # Подключения потоковые: асинхронный ORM работает с подключениями
+    # потоков sync_to_async, поэтому обёртка ставится на каждое из них,
+    # а контекстная переменная копируется в эти потоки asgiref.
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет запрос и добавляет заголовок ``Server-Timing``
+    (если ``CATALOG_SERVER_TIMING`` не выключен).
+
+    Работает и в синхронной, и в асинхронной цепочке middleware: замер
+    передаётся через контекстную переменную, которую видит ``timed_execute``
+    подключений любых потоков, включая потоки ``sync_to_async``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        with self.measure(request, timings):
+            response = self.get_response(request)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        with self.measure(request, timings):
+            response = await self.get_response(request)
+        return self.finish(request, response, timings)
+
+    @contextmanager
+    def measure(self, request, timings):
+        request.catalog_timings = timings
+        token = _current_timings.set(timings)
+        # Подключения этого потока, открытые до подключения сигнала.
+        for connection in connections.all(initialized_only=True):
+            install_timed_execute(None, connection)
+        try:
+            yield
+        finally:
+            _current_timings.reset(token)
+
+    def finish(self, request, response, timings):
+        total = timings.total
+        endpoint = timings.endpoint
+        if endpoint is None:
+            resolver_match = getattr(request, "resolver_match", None)
+            endpoint = resolver_match.view_name if resolver_match else "unmatched"
+        endpoint_timings.record(endpoint, total, timings.queries, timings.durations)
+
+        if getattr(settings, "CATALOG_SERVER_TIMING", True):
+            response["Server-Timing"] = timings.server_timing(total)
+        return response
+
+
+class TimedRenderer:
+    """
+    Обёртка рендерера ответа, относящая время ``render()`` к фазе ``render``.
+    """
+
+    def __init__(self, renderer, timings):
+        self._renderer = renderer
+        self.render = timings.timed("render", renderer.render)
+
+    def __getattr__(self, name):
+        return getattr(self._renderer, name)
+
+
+class InstrumentedViewMixin:
+    """
+    Отмечает действие вьюсета и замеряет сериализацию и рендеринг ответа.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        timings = get_current_timings()
+        if timings is not None and getattr(self, "basename", None) and self.action:
+            timings.endpoint = f"{self.basename}-{self.action.replace('_', '-')}"
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        timings = get_current_timings()
+        if timings is not None:
+            serializer.to_representation = timings.timed("serialize", serializer.to_representation)
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        timings = get_current_timings()
+        renderer = getattr(response, "accepted_renderer", None)
+        if timings is not None and renderer is not None:
+            response.accepted_renderer = TimedRenderer(renderer, timings)
+        return response
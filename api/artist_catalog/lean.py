@@ -0,0 +1,131 @@
+"""
+Быстрая сериализация списков из строк ``values_list()``.
+
+Для плоских сериализаторов (поля ``IntegerField``, ``CharField``,
+``DateField`` с ``source`` вида ``field`` или ``relation.field``) действие
+``list`` не создаёт экземпляры моделей и не проходит по полям DRF для
+каждого объекта: queryset превращается в ``values_list()`` по путям полей,
+а строки сразу собираются в словари в порядке полей сериализатора.
+JSON получается тем же байт в байт, схема OpenAPI не меняется — она по-прежнему
+строится по сериализатору вьюсета.
+
+Сериализаторы с другими полями обрабатываются как обычно. Отключается
+настройкой ``CATALOG_LEAN_SERIALIZATION = False``.
+"""
+
+import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def _identity(value):
+    return value
+
+
+@lru_cache(maxsize=None)
+def lean_fields(serializer_class):
+    """
+    ``(имя поля, путь ORM, преобразование)`` для полей ``serializer_class``
+    или ``None``, если сериализатор нельзя собрать из ``values_list()``.
+    """
+    fields = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if not field.source or field.source == "*" or not field.source.replace(".", "").isidentifier():
+            return None
+
+        if isinstance(field, serializers.DateField):
+            if getattr(field, "format", api_settings.DATE_FORMAT) == ISO_8601:
+                convert = datetime.date.isoformat
+            else:
+                convert = field.to_representation
+        elif isinstance(field, (serializers.IntegerField, serializers.CharField)):
+            # Значения целочисленных и строковых колонок уже имеют нужный тип.
+            convert = _identity
+        else:
+            return None
+
+        fields.append((name, field.source.replace(".", "__"), convert))
+
+    return tuple(fields)
+
+
+class ValuesRowsSerializer(serializers.BaseSerializer):
+    """
+    Сериализатор строк ``values_list()`` по полям из ``lean_fields``.
+    """
+
+    def __init__(self, instance, fields, **kwargs):
+        super().__init__(instance, **kwargs)
+        self.lean_fields = fields
+
+    def to_representation(self, rows):
+        names = [name for name, _, _ in self.lean_fields]
+        converters = [convert for _, _, convert in self.lean_fields]
+        if all(convert is _identity for convert in converters):
+            return [dict(zip(names, row)) for row in rows]
+
+        return [
+            {
+                name: None if value is None else convert(value)
+                for name, convert, value in zip(names, converters, row)
+            }
+            for row in rows
+        ]
+
+
+class LeanListMixin:
+    """
+    Быстрый путь действия ``list`` (синхронного и асинхронного).
+
+    Стоит перед ``AsyncReadMixin`` и базовым вьюсетом: миксины кэша и условных
+    запросов оборачивают его так же, как обычный ``list``.
+    """
+
+    def get_lean_fields(self):
+        if not getattr(settings, "CATALOG_LEAN_SERIALIZATION", True):
+            return None
+        return lean_fields(self.get_serializer_class())
+
+    def get_serializer(self, *args, **kwargs):
+        fields = kwargs.pop("lean_fields", None)
+        if fields is None:
+            return super().get_serializer(*args, **kwargs)
+        return ValuesRowsSerializer(*args, fields=fields)
+
+    def get_lean_queryset(self, fields):
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.values_list(*(path for _, path, _ in fields))
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_lean_fields()
+        if fields is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.get_lean_queryset(fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, lean_fields=fields)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, lean_fields=fields)
+        return Response(serializer.data)
+
+    async def alist(self, request, *args, **kwargs):
+        fields = self.get_lean_fields()
+        if fields is None:
+            return await super().alist(request, *args, **kwargs)
+
+        queryset = self.get_lean_queryset(fields)
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, lean_fields=fields)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer([row async for row in queryset], lean_fields=fields)
+        return Response(serializer.data)
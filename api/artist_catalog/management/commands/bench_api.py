@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from artist_catalog.benchmark import run_benchmark, run_renderer_benchmark
+
+
+class Command(BaseCommand):
+    help = "Замеряет время ответа, число SQL-запросов и память для всех действий API"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Замеряемых запросов на действие")
+        parser.add_argument("--warmup", type=int, default=5, help="Прогревочных запросов на действие")
+        parser.add_argument(
+            "--only",
+            action="append",
+            help="Замерить только указанный сценарий, например album-list (можно повторять)",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Не отключать кэш ответов на чтение",
+        )
+        parser.add_argument(
+            "--no-memory",
+            action="store_true",
+            help="Не замерять пиковую память (tracemalloc)",
+        )
+        parser.add_argument(
+            "--renderers",
+            action="store_true",
+            help="Сравнить время рендеринга ответов JSONRenderer и FastJSONRenderer",
+        )
+        parser.add_argument(
+            "-o", "--output",
+            help="Файл для записи отчёта в JSON (по умолчанию stdout)",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["warmup"] < 0:
+            raise CommandError("--requests должен быть больше нуля, --warmup — не меньше нуля")
+
+        try:
+            if options["renderers"]:
+                report = run_renderer_benchmark(
+                    requests=options["requests"], warmup=options["warmup"],
+                )
+            else:
+                report = run_benchmark(
+                    requests=options["requests"],
+                    warmup=options["warmup"],
+                    names=options["only"],
+                    use_cache=options["cache"],
+                    memory=not options["no_memory"],
+                )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for name, result in report["results"].items():
+            failed = [status for status in result.get("status", ()) if status >= 400]
+            if failed:
+                self.stderr.write(f"{name}: ответы с ошибкой {failed}")
+
+        output = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                stream.write(output + "\n")
+        else:
+            self.stdout.write(output)
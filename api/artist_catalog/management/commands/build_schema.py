@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from artist_catalog.schema import get_code_version, write_schema
+
+
+class Command(BaseCommand):
+    help = "Собирает схему OpenAPI для текущей версии кода и сохраняет её в файлы"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-o", "--output-dir",
+            help="Каталог для файлов схемы (по умолчанию CATALOG_SCHEMA_DIR)",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["output_dir"] or getattr(settings, "CATALOG_SCHEMA_DIR", None)
+        if not directory:
+            raise CommandError("Укажите --output-dir или настройку CATALOG_SCHEMA_DIR")
+
+        for path in write_schema(directory):
+            self.stdout.write(path)
+        self.stdout.write(self.style.SUCCESS(f"Схема собрана для версии кода {get_code_version()}"))
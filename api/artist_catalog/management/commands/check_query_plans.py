@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from artist_catalog.query_plans import check_query_plans
+
+
+class Command(BaseCommand):
+    help = "Проверяет через EXPLAIN, что запросы API на чтение не сканируют таблицы целиком"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only",
+            action="append",
+            help="Проверить только указанный сценарий, например album-list (можно повторять)",
+        )
+        parser.add_argument(
+            "--seqscan",
+            action="store_true",
+            help="Не отключать enable_seqscan в PostgreSQL (планы как на продакшене)",
+        )
+        parser.add_argument(
+            "--show-plans",
+            action="store_true",
+            help="Вывести SQL и план каждого запроса",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            plans, problems = check_query_plans(names=options["only"], seqscan=options["seqscan"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options["show_plans"]:
+            for name, queries in plans.items():
+                for sql, plan in queries:
+                    self.stdout.write(f"[{name}] {sql}\n{plan}\n")
+
+        for problem in problems:
+            self.stderr.write(
+                f"{problem.scenario}: последовательное сканирование {problem.table}\n"
+                f"{problem.sql}\n{problem.plan}\n"
+            )
+        if problems:
+            raise CommandError(f"Запросов с последовательным сканированием: {len(problems)}")
+
+        total = sum(len(queries) for queries in plans.values())
+        self.stdout.write(f"Проверено запросов: {total} в {len(plans)} сценариях, сканирований таблиц нет")
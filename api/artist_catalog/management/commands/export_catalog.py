@@ -0,0 +1,62 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from artist_catalog.export import ENTITIES, FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Потоково выгружает каталог в NDJSON/JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--entities",
+            default=",".join(ENTITIES),
+            help="Сущности через запятую в порядке выгрузки: artists, albums, music",
+        )
+        parser.add_argument(
+            "--since-id",
+            type=int,
+            default=0,
+            help="Выгрузить записи первой сущности с id больше указанного",
+        )
+        parser.add_argument(
+            "--format",
+            dest="output_format",
+            choices=FORMATS,
+            default="ndjson",
+            help="Формат выгрузки",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Сжимать выгрузку gzip",
+        )
+        parser.add_argument(
+            "-o", "--output",
+            help="Файл для записи (по умолчанию stdout)",
+        )
+
+    def handle(self, *args, **options):
+        entities = [entity.strip() for entity in options["entities"].split(",")]
+        unknown = [entity for entity in entities if entity not in ENTITIES]
+        if unknown:
+            raise CommandError(f"Неизвестные сущности: {', '.join(unknown)}")
+        if options["since_id"] < 0:
+            raise CommandError("--since-id не может быть отрицательным")
+
+        chunks = iter_export(
+            entities=list(dict.fromkeys(entities)),
+            since_id=options["since_id"],
+            output_format=options["output_format"],
+            compress=options["gzip"],
+        )
+
+        if options["output"]:
+            with open(options["output"], "wb") as stream:
+                for chunk in chunks:
+                    stream.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,53 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from artist_catalog.importer import IMPORT_FORMATS, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Пакетно импортирует альбомы с треками из CSV/NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу CSV или NDJSON")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=IMPORT_FORMATS,
+            help="Формат файла (по умолчанию — по расширению)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Количество альбомов в одной транзакции",
+        )
+        parser.add_argument(
+            "--report",
+            help="Файл для записи полного отчёта об ошибках в JSON",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.exists(path):
+            raise CommandError(f"Файл {path} не найден")
+
+        file_format = options["file_format"] or os.path.splitext(path)[1].lstrip(".").lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError(f"Укажите --format: {', '.join(IMPORT_FORMATS)}")
+
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            report = import_catalog(stream, file_format, batch_size=options["batch_size"])
+
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, ensure_ascii=False, indent=2)
+        else:
+            for error in report["errors"]:
+                self.stderr.write(
+                    f"Строка {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано альбомов: {report['created']}, строк с ошибками: {report['failed']}"
+        ))
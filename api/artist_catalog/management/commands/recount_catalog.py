@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from artist_catalog.counters import recount_catalog
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики альбомов и треков у альбомов и исполнителей"
+
+    def handle(self, *args, **options):
+        fixed = recount_catalog()
+        self.stdout.write(self.style.SUCCESS(
+            f"Исправлено альбомов: {fixed['albums']}, исполнителей: {fixed['artists']}"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from artist_catalog.services import renumber_album_tracks
+
+
+class Command(BaseCommand):
+    help = "Перенумеровывает треки во всех альбомах подряд, начиная с 1"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--album",
+            dest="album_ids",
+            type=int,
+            action="append",
+            help="Перенумеровать только указанный альбом (можно повторять)",
+        )
+
+    def handle(self, *args, **options):
+        renumbered = renumber_album_tracks(options["album_ids"])
+        self.stdout.write(self.style.SUCCESS(f"Перенумеровано треков: {renumbered}"))
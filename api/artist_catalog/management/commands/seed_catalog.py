@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from artist_catalog.seeding import seed_catalog
+
+
+class Command(BaseCommand):
+    help = "Заполняет каталог воспроизводимыми синтетическими данными для замеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--artists", type=int, default=100, help="Количество исполнителей")
+        parser.add_argument("--albums", type=int, default=10, help="Альбомов у каждого исполнителя")
+        parser.add_argument("--tracks", type=int, default=12, help="Треков в каждом альбоме")
+        parser.add_argument(
+            "--titles",
+            type=int,
+            help="Размер пула названий песен (по умолчанию четверть от числа треков)",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Зерно генератора случайных чисел")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Размер пачки bulk_create")
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить существующие данные каталога перед заполнением",
+        )
+
+    def handle(self, *args, **options):
+        for option in ("artists", "albums", "tracks", "batch_size"):
+            if options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} должен быть больше нуля")
+
+        try:
+            created = seed_catalog(
+                artists=options["artists"],
+                albums_per_artist=options["albums"],
+                tracks_per_album=options["tracks"],
+                titles=options["titles"],
+                seed=options["seed"],
+                batch_size=options["batch_size"],
+                clear=options["clear"],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано исполнителей: {created['artists']}, альбомов: {created['albums']}, "
+            f"песен в пуле: {created['music']}, треков в альбомах: {created['album_tracks']}"
+        ))
@@ -0,0 +1,518 @@
+"""
+Метрики процесса API в текстовом формате Prometheus (``GET /metrics``).
+
+``MetricsMiddleware`` считает запросы, время ответа, размер ответа и число
+SQL-запросов по имени маршрута (``artist-list``, ``album-detail`` и т. д.),
+а также запросы в обработке. Обновление — несколько операций со словарями
+под одной блокировкой.
+
+Если задан каталог ``CATALOG_METRICS_DIR``, каждый процесс не чаще раза
+в ``CATALOG_METRICS_FLUSH_INTERVAL`` секунд сохраняет туда снимок своих
+метрик, а ``/metrics`` суммирует снимки всех процессов: так метрики
+корректны при нескольких воркерах gunicorn/uvicorn. Снимок завершившегося
+процесса переносится в общий файл ``metrics-exited.json`` и удаляется:
+его счётчики и гистограммы продолжают учитываться, gauge-метрики — нет.
+Перенос делает gunicorn в ``child_exit`` (``mark_process_dead``), а для
+других серверов — ``/metrics``, когда находит снимок умершего процесса.
+В асинхронном режиме снимок пишется в отдельном потоке.
+
+При пуле подключений psycopg (``api.settings_production``) в метрики
+попадает и статистика пулов: размер, свободные подключения, ожидающие
+запросы, время ожидания и ошибки.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from artist_catalog.cache import get_response_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+METRICS = {
+    "catalog_http_requests_total": ("counter", "Количество обработанных HTTP-запросов."),
+    "catalog_http_request_duration_seconds": ("histogram", "Время ответа в секундах."),
+    "catalog_http_response_size_bytes": ("histogram", "Размер тела ответа в байтах."),
+    "catalog_http_request_db_queries": ("histogram", "Число SQL-запросов на HTTP-запрос."),
+    "catalog_http_requests_in_flight": ("gauge", "Запросы, обрабатываемые в данный момент."),
+    "catalog_response_cache_hits_total": ("counter", "Попадания в кэш ответов."),
+    "catalog_response_cache_misses_total": ("counter", "Промахи кэша ответов."),
+    "catalog_response_cache_hit_ratio": ("gauge", "Доля попаданий в кэш ответов."),
+    "catalog_db_pool_size": ("gauge", "Подключения в пуле, включая выданные."),
+    "catalog_db_pool_available": ("gauge", "Свободные подключения в пуле."),
+    "catalog_db_pool_max_size": ("gauge", "Максимальный размер пула."),
+    "catalog_db_pool_requests_waiting": ("gauge", "Запросы, ожидающие подключения."),
+    "catalog_db_pool_requests_total": ("counter", "Запросы подключения из пула."),
+    "catalog_db_pool_requests_queued_total": ("counter", "Запросы, ждавшие свободного подключения."),
+    "catalog_db_pool_wait_seconds_total": ("counter", "Суммарное время ожидания подключения."),
+    "catalog_db_pool_request_errors_total": ("counter", "Запросы, не получившие подключение."),
+    "catalog_db_pool_connection_errors_total": ("counter", "Ошибки открытия подключений."),
+    "catalog_db_pool_connections_lost_total": ("counter", "Разорванные подключения, найденные проверкой."),
+}
+
+# Метрика -> (поле ConnectionPool.get_stats(), множитель).
+POOL_GAUGES = {
+    "catalog_db_pool_size": ("pool_size", 1),
+    "catalog_db_pool_available": ("pool_available", 1),
+    "catalog_db_pool_max_size": ("pool_max", 1),
+    "catalog_db_pool_requests_waiting": ("requests_waiting", 1),
+}
+POOL_COUNTERS = {
+    "catalog_db_pool_requests_total": ("requests_num", 1),
+    "catalog_db_pool_requests_queued_total": ("requests_queued", 1),
+    "catalog_db_pool_wait_seconds_total": ("requests_wait_ms", 0.001),
+    "catalog_db_pool_request_errors_total": ("requests_errors", 1),
+    "catalog_db_pool_connection_errors_total": ("connections_errors", 1),
+    "catalog_db_pool_connections_lost_total": ("connections_lost", 1),
+}
+
+BUCKETS = {
+    "catalog_http_request_duration_seconds": DURATION_BUCKETS,
+    "catalog_http_response_size_bytes": SIZE_BUCKETS,
+    "catalog_http_request_db_queries": QUERY_BUCKETS,
+}
+
+
+class MetricsRegistry:
+    """
+    Значения метрик одного процесса.
+
+    Ключ значения — ``(name, labels)``, где ``labels`` — кортеж пар.
+    Гистограмма хранится как список счётчиков по корзинам (последняя — +Inf),
+    суммы и общего числа наблюдений.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {}
+        self.histograms = {}
+        self.in_flight = 0
+
+    def inc(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, labels, value):
+        buckets = BUCKETS[name]
+        key = (name, labels)
+        index = bisect_left(buckets, value)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [[0] * (len(buckets) + 1), 0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def add_in_flight(self, delta):
+        with self._lock:
+            self.in_flight += delta
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {
+                "pid": os.getpid(),
+                "values": [[name, list(labels), value] for (name, labels), value in self.values.items()],
+                "histograms": [
+                    [name, list(labels), list(counts), total, count]
+                    for (name, labels), (counts, total, count) in self.histograms.items()
+                ],
+                "in_flight": self.in_flight,
+                "gauges": [],
+            }
+
+        for alias, stats in pool_stats().items():
+            labels = [["database", alias]]
+            snapshot["gauges"] += [
+                [name, labels, stats.get(field, 0) * scale]
+                for name, (field, scale) in POOL_GAUGES.items()
+            ]
+            snapshot["values"] += [
+                [name, labels, stats.get(field, 0) * scale]
+                for name, (field, scale) in POOL_COUNTERS.items()
+            ]
+
+        cache = get_response_cache()
+        if cache is not None:
+            stats = cache.stats()
+            snapshot["values"] += [
+                ["catalog_response_cache_hits_total", [], stats["hits"]],
+                ["catalog_response_cache_misses_total", [], stats["misses"]],
+            ]
+        return snapshot
+
+
+def pool_stats():
+    """
+    Статистика пулов подключений psycopg по псевдонимам баз данных.
+    """
+    stats = {}
+    for connection in connections.all(initialized_only=True):
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            stats[connection.alias] = pool.get_stats()
+    return stats
+
+
+registry = MetricsRegistry()
+
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+def get_metrics_dir():
+    return getattr(settings, "CATALOG_METRICS_DIR", None)
+
+
+EXITED_FILENAME = "metrics-exited.json"
+LOCK_FILENAME = "metrics.lock"
+
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def _write_json(path, data):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as stream:
+        json.dump(data, stream)
+    os.replace(temporary, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+def _flush_due(force=False):
+    if not get_metrics_dir():
+        return False
+    interval = getattr(settings, "CATALOG_METRICS_FLUSH_INTERVAL", 1.0)
+    return force or time.monotonic() - _last_flush >= interval
+
+
+def flush(force=False):
+    """
+    Сохраняет снимок метрик процесса в ``CATALOG_METRICS_DIR``.
+    """
+    global _last_flush
+
+    if not _flush_due(force):
+        return
+
+    with _flush_lock:
+        # Пока ждали блокировку, снимок мог сохранить другой поток.
+        if not _flush_due(force):
+            return
+        _last_flush = time.monotonic()
+        _write_json(_snapshot_path(get_metrics_dir(), os.getpid()), registry.snapshot())
+
+
+async def aflush():
+    """
+    ``flush`` для асинхронных запросов: запись файла идёт в отдельном потоке.
+    """
+    if _flush_due():
+        await sync_to_async(flush, thread_sensitive=False)()
+
+
+atexit.register(flush, force=True)
+
+
+@contextmanager
+def _directory_lock(directory):
+    """
+    Блокировка каталога снимков между процессами на время переноса и чтения.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    with open(os.path.join(directory, LOCK_FILENAME), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _fold_exited(directory, snapshots):
+    """
+    Добавляет счётчики и гистограммы ``snapshots`` в ``metrics-exited.json``,
+    затем удаляет их файлы. Вызывается под ``_directory_lock``.
+    """
+    path = os.path.join(directory, EXITED_FILENAME)
+    exited = _read_json(path) or empty_snapshot()
+    values, histograms, _ = merge_snapshots([
+        exited,
+        *({**snapshot, "gauges": [], "in_flight": 0} for snapshot in snapshots),
+    ])
+    exited = empty_snapshot()
+    exited["values"] = [[name, list(labels), value] for (name, labels), value in values.items()]
+    exited["histograms"] = [
+        [name, list(labels), counts, total, count]
+        for (name, labels), (counts, total, count) in histograms.items()
+    ]
+    _write_json(path, exited)
+
+    for snapshot in snapshots:
+        try:
+            os.remove(_snapshot_path(directory, snapshot["pid"]))
+        except FileNotFoundError:
+            pass
+    return exited
+
+
+def mark_process_dead(pid, directory=None):
+    """
+    Переносит снимок завершившегося процесса ``pid`` в ``metrics-exited.json``.
+
+    Предназначена для хука gunicorn ``child_exit`` (см. ``gunicorn.conf.py``).
+    """
+    directory = directory or get_metrics_dir()
+    if not directory:
+        return
+
+    with _directory_lock(directory):
+        snapshot = _read_json(_snapshot_path(directory, pid))
+        if snapshot is not None:
+            _fold_exited(directory, [snapshot])
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def empty_snapshot():
+    return {"pid": None, "values": [], "histograms": [], "in_flight": 0, "gauges": []}
+
+
+def collect_snapshots():
+    """
+    Снимки всех процессов: текущий берётся из памяти, остальные — из файлов.
+
+    Снимки умерших процессов по пути переносятся в ``metrics-exited.json``.
+    """
+    current = registry.snapshot()
+    snapshots = [current]
+
+    directory = get_metrics_dir()
+    if not (directory and os.path.isdir(directory)):
+        return snapshots
+
+    with _directory_lock(directory):
+        exited = _read_json(os.path.join(directory, EXITED_FILENAME))
+        dead = []
+        for filename in os.listdir(directory):
+            if not (filename.startswith("metrics-") and filename.endswith(".json")):
+                continue
+            if filename == EXITED_FILENAME:
+                continue
+            snapshot = _read_json(os.path.join(directory, filename))
+            if snapshot is None or snapshot.get("pid") == current["pid"]:
+                continue
+            if _process_alive(snapshot["pid"]):
+                snapshots.append(snapshot)
+            else:
+                dead.append(snapshot)
+
+        if dead:
+            exited = _fold_exited(directory, dead)
+
+    if exited is not None:
+        snapshots.append(exited)
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def merge_snapshots(snapshots):
+    """
+    Суммирует снимки: ``(values, histograms, in_flight)`` с ключами ``(name, labels)``.
+    """
+    values = {}
+    histograms = {}
+    in_flight = 0
+    for snapshot in snapshots:
+        for name, labels, value in [*snapshot["values"], *snapshot.get("gauges", ())]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            values[key] = values.get(key, 0) + value
+        for name, labels, counts, total, count in snapshot["histograms"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.setdefault(key, [[0] * len(counts), 0, 0])
+            merged[0] = [left + right for left, right in zip(merged[0], counts)]
+            merged[1] += total
+            merged[2] += count
+        in_flight += snapshot["in_flight"]
+    return values, histograms, in_flight
+
+
+def render_metrics(snapshots):
+    """
+    Суммирует снимки процессов и возвращает текст в формате Prometheus 0.0.4.
+    """
+    values, histograms, in_flight = merge_snapshots(snapshots)
+    values[("catalog_http_requests_in_flight", ())] = in_flight
+    hits = values.get(("catalog_response_cache_hits_total", ()))
+    misses = values.get(("catalog_response_cache_misses_total", ()))
+    if hits is not None and misses is not None:
+        values[("catalog_response_cache_hit_ratio", ())] = hits / (hits + misses) if hits + misses else 0.0
+
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            buckets = BUCKETS[name]
+            for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        else:
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    return HttpResponse(
+        render_metrics(collect_snapshots()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+def _route_name(request):
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return "unmatched"
+    return resolver_match.url_name or resolver_match.view_name or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Записывает метрики каждого запроса. Должен стоять первым в ``MIDDLEWARE``,
+    чтобы время ответа включало остальные middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        registry.add_in_flight(1)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            registry.add_in_flight(-1)
+        response = self.record(request, response, started)
+        flush()
+        return response
+
+    async def __acall__(self, request):
+        registry.add_in_flight(1)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            registry.add_in_flight(-1)
+        response = self.record(request, response, started)
+        await aflush()
+        return response
+
+    def record(self, request, response, started):
+        elapsed = time.perf_counter() - started
+        route = _route_name(request)
+        method = request.method
+        registry.inc(
+            "catalog_http_requests_total",
+            (("method", method), ("route", route), ("status", str(response.status_code))),
+        )
+        registry.observe("catalog_http_request_duration_seconds", (("method", method), ("route", route)), elapsed)
+
+        timings = getattr(request, "catalog_timings", None)
+        if timings is not None:
+            registry.observe("catalog_http_request_db_queries", (("route", route),), timings.queries)
+
+        if response.streaming:
+            count = self._acount_streamed if response.is_async else self._count_streamed
+            response.streaming_content = count(response.streaming_content, route)
+        else:
+            registry.observe("catalog_http_response_size_bytes", (("route", route),), len(response.content))
+
+        return response
+
+    def _count_streamed(self, content, route):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            registry.observe("catalog_http_response_size_bytes", (("route", route),), size)
+
+    async def _acount_streamed(self, content, route):
+        size = 0
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            registry.observe("catalog_http_response_size_bytes", (("route", route),), size)
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:57
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_music(apps, schema_editor):
+    Music = apps.get_model('artist_catalog', 'Music')
+    AlbumTrack = apps.get_model('artist_catalog', 'AlbumTrack')
+
+    duplicated_titles = (
+        Music.objects.order_by()
+        .values('title')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .values_list('title', flat=True)
+    )
+    for title in list(duplicated_titles):
+        music_ids = list(Music.objects.filter(title=title).order_by('id').values_list('id', flat=True))
+        keep_id, duplicate_ids = music_ids[0], music_ids[1:]
+
+        albums_with_track = set()
+        for album_track in AlbumTrack.objects.filter(track_id__in=music_ids).order_by('album_id', 'track_id'):
+            if album_track.album_id in albums_with_track:
+                album_track.delete()
+                continue
+
+            albums_with_track.add(album_track.album_id)
+            if album_track.track_id != keep_id:
+                album_track.track_id = keep_id
+                album_track.save(update_fields=['track'])
+
+        Music.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist_catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_music, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist_catalog', '0002_merge_duplicate_music'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='album',
+            name='artist',
+            field=models.ForeignKey(help_text='Исполнитель, выпустивший альбом', on_delete=django.db.models.deletion.CASCADE, to='artist_catalog.artist', verbose_name='Исполнитель'),
+        ),
+        migrations.AlterField(
+            model_name='album',
+            name='release_date',
+            field=models.DateField(help_text='Дата выпуска альбома', verbose_name='Дата выпуска'),
+        ),
+        migrations.AlterField(
+            model_name='albumtrack',
+            name='album',
+            field=models.ForeignKey(help_text='Альбом, в который входит трек', on_delete=django.db.models.deletion.CASCADE, related_name='album_tracks', to='artist_catalog.album', verbose_name='Альбом'),
+        ),
+        migrations.AlterField(
+            model_name='albumtrack',
+            name='track',
+            field=models.ForeignKey(help_text='Музыкальное произведение', on_delete=django.db.models.deletion.CASCADE, related_name='album_tracks', to='artist_catalog.music', verbose_name='Трек'),
+        ),
+        migrations.AlterField(
+            model_name='albumtrack',
+            name='track_number',
+            field=models.PositiveIntegerField(help_text='Порядковый номер трека в альбоме', verbose_name='Номер трека'),
+        ),
+        migrations.AlterField(
+            model_name='artist',
+            name='artist_name',
+            field=models.CharField(help_text='Название исполнителя или музыкальной группы', max_length=100, verbose_name='Имя исполнителя'),
+        ),
+        migrations.AlterField(
+            model_name='music',
+            name='title',
+            field=models.CharField(help_text='Название музыкального произведения', max_length=100, unique=True, verbose_name='Название песни'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist_catalog', '0003_music_title_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Дата и время последнего изменения записи', verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='albumtrack',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Дата и время последнего изменения записи', verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Дата и время последнего изменения записи', verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='music',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, help_text='Дата и время последнего изменения записи', verbose_name='Дата изменения'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Artist = apps.get_model('artist_catalog', 'Artist')
+    Album = apps.get_model('artist_catalog', 'Album')
+    AlbumTrack = apps.get_model('artist_catalog', 'AlbumTrack')
+
+    Album.objects.update(tracks_count=Coalesce(
+        Subquery(
+            AlbumTrack.objects.filter(album=OuterRef('pk')).order_by()
+            .values('album').annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    ))
+    Artist.objects.update(
+        albums_count=Coalesce(
+            Subquery(
+                Album.objects.filter(artist=OuterRef('pk')).order_by()
+                .values('artist').annotate(total=Count('pk')).values('total')
+            ),
+            0,
+        ),
+        tracks_count=Coalesce(
+            Subquery(
+                Album.objects.filter(artist=OuterRef('pk')).order_by()
+                .values('artist').annotate(total=Sum('tracks_count')).values('total')
+            ),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist_catalog', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='tracks_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Число треков в альбоме, обновляется автоматически', verbose_name='Количество треков'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='albums_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Число альбомов исполнителя, обновляется автоматически', verbose_name='Количество альбомов'),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='tracks_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Число треков во всех альбомах исполнителя, обновляется автоматически', verbose_name='Количество треков'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
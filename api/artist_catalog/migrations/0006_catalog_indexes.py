@@ -0,0 +1,87 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Trim
+
+
+def trim_music_titles(apps, schema_editor):
+    """
+    Убирает пробелы по краям названий песен. Если после этого название
+    совпадает с другой песней, песни объединяются, как в 0002.
+    """
+    Artist = apps.get_model('artist_catalog', 'Artist')
+    Album = apps.get_model('artist_catalog', 'Album')
+    Music = apps.get_model('artist_catalog', 'Music')
+    AlbumTrack = apps.get_model('artist_catalog', 'AlbumTrack')
+
+    untrimmed = (
+        Music.objects.annotate(trimmed=Trim('title'))
+        .exclude(title=F('trimmed'))
+        .order_by('id')
+        .values_list('id', 'trimmed')
+    )
+    changed_albums = set()
+    for music_id, title in list(untrimmed):
+        keep = Music.objects.filter(title=title).order_by('id').first()
+        if keep is None:
+            Music.objects.filter(id=music_id).update(title=title)
+            continue
+
+        keep_albums = set(AlbumTrack.objects.filter(track_id=keep.id).values_list('album_id', flat=True))
+        duplicates = AlbumTrack.objects.filter(track_id=music_id)
+        changed_albums.update(duplicates.filter(album_id__in=keep_albums).values_list('album_id', flat=True))
+        duplicates.filter(album_id__in=keep_albums).delete()
+        duplicates.update(track_id=keep.id)
+        Music.objects.filter(id=music_id).delete()
+
+    if not changed_albums:
+        return
+
+    # Удалённые повторы треков уменьшают счётчики из 0005.
+    Album.objects.filter(id__in=changed_albums).update(tracks_count=Coalesce(
+        Subquery(
+            AlbumTrack.objects.filter(album=OuterRef('pk')).order_by()
+            .values('album').annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    ))
+    Artist.objects.filter(album__id__in=changed_albums).update(tracks_count=Coalesce(
+        Subquery(
+            Album.objects.filter(artist=OuterRef('pk')).order_by()
+            .values('artist').annotate(total=Sum('tracks_count')).values('total')
+        ),
+        0,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist_catalog', '0005_catalog_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(trim_music_titles, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='album',
+            options={'ordering': ['release_date', 'id'], 'verbose_name': 'Альбом', 'verbose_name_plural': 'Альбомы'},
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['release_date', 'id'], include=('artist', 'tracks_count'), name='album_release_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(fields=['artist', 'release_date'], name='album_artist_release_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(fields=['artist_name', 'id'], include=('albums_count', 'tracks_count'), name='artist_name_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='music',
+            constraint=models.CheckConstraint(condition=models.Q(('title', django.db.models.functions.text.Trim('title'))), name='music_title_trimmed'),
+        ),
+    ]
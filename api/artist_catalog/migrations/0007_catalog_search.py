@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:05
+
+from django.db import migrations
+
+
+# (модель, колонка) — те же, что SEARCH_COLUMNS в artist_catalog/search.py.
+SEARCH_COLUMNS = [
+    ('Artist', 'artist_name'),
+    ('Music', 'title'),
+]
+
+
+def postgresql_indexes(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    for model_name, column in SEARCH_COLUMNS:
+        model = apps.get_model('artist_catalog', model_name)
+        prefix = model_name.lower()
+        yield model, GinIndex(SearchVector(column, config='simple'), name=f'{prefix}_{column}_fts_idx')
+        yield model, GinIndex(fields=[column], opclasses=['gin_trgm_ops'], name=f'{prefix}_{column}_trgm_idx')
+
+
+def sqlite_fts_tables(apps):
+    for model_name, column in SEARCH_COLUMNS:
+        table = apps.get_model('artist_catalog', model_name)._meta.db_table
+        yield table, f'{table}_fts', column
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for model, index in postgresql_indexes(apps):
+            schema_editor.add_index(model, index)
+
+    elif vendor == 'sqlite':
+        # Внешняя таблица содержимого FTS5 хранит только индекс; триггеры
+        # повторяют в нём вставки, изменения и удаления строк каталога.
+        for table, fts, column in sqlite_fts_tables(apps):
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='{table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+            )
+            schema_editor.execute(
+                f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {column} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+                f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END"
+            )
+            schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for model, index in postgresql_indexes(apps):
+            schema_editor.remove_index(model, index)
+
+    elif vendor == 'sqlite':
+        for table, fts, column in sqlite_fts_tables(apps):
+            for action in ('insert', 'delete', 'update'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{action}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artist_catalog', '0006_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,23 +1,71 @@
 from django.db import models
+from django.db.models.functions import Trim
 
 
-class Artist(models.Model):
+class CounterFieldsMixin:
+    """
+    Не перезаписывает счётчики ``counter_fields`` при ``save()`` существующей
+    записи: они меняются только атомарными F-выражениями (см. ``counters.py``),
+    и значение, прочитанное раньше, затёрло бы параллельные изменения.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Artist(CounterFieldsMixin, models.Model):
     artist_name = models.CharField(
         max_length=100,
         verbose_name="Имя исполнителя",
         help_text="Название исполнителя или музыкальной группы"
     )
+    albums_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество альбомов",
+        help_text="Число альбомов исполнителя, обновляется автоматически"
+    )
+    tracks_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество треков",
+        help_text="Число треков во всех альбомах исполнителя, обновляется автоматически"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+        help_text="Дата и время последнего изменения записи"
+    )
+
+    counter_fields = ("albums_count", "tracks_count")
 
     class Meta:
         verbose_name = "Исполнитель"
         verbose_name_plural = "Исполнители"
         ordering = ["artist_name"]
+        indexes = [
+            # Сортировка по умолчанию и курсорная пагинация; в PostgreSQL
+            # список исполнителей читается только из индекса.
+            models.Index(
+                fields=["artist_name", "id"],
+                include=["albums_count", "tracks_count"],
+                name="artist_name_id_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.artist_name
 
 
-class Album(models.Model):
+class Album(CounterFieldsMixin, models.Model):
     artist = models.ForeignKey(
         Artist, 
         on_delete=models.CASCADE,
@@ -28,11 +76,45 @@ class Album(models.Model):
         verbose_name="Дата выпуска",
         help_text="Дата выпуска альбома"
     )
+    tracks_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество треков",
+        help_text="Число треков в альбоме, обновляется автоматически"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+        help_text="Дата и время последнего изменения записи"
+    )
+
+    counter_fields = ("tracks_count",)
 
     class Meta:
         verbose_name = "Альбом"
         verbose_name_plural = "Альбомы"
-        ordering = ["release_date", "artist__artist_name"]
+        # Без artist__artist_name: сортировка по полю исполнителя требовала
+        # JOIN в каждом запросе альбомов. Альбомы с одной датой выпуска идут
+        # по id, прежний порядок — ?ordering=release_date,artist__artist_name.
+        ordering = ["release_date", "id"]
+        indexes = [
+            models.Index(
+                fields=["release_date", "id"],
+                include=["artist", "tracks_count"],
+                name="album_release_date_id_idx",
+            ),
+            models.Index(fields=["artist", "release_date"], name="album_artist_release_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исполнитель на момент загрузки: при смене исполнителя счётчики
+        # переносятся со старого на нового (см. counters.py).
+        if "artist_id" in field_names:
+            instance._loaded_artist_id = instance.artist_id
+        return instance
 
     def __str__(self):
         return f"{self.artist} - {self.release_date}"
@@ -41,14 +123,31 @@ class Album(models.Model):
 class Music(models.Model):
     title = models.CharField(
         max_length=100,
+        unique=True,
         verbose_name="Название песни",
         help_text="Название музыкального произведения"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+        help_text="Дата и время последнего изменения записи"
+    )
 
     class Meta:
         verbose_name = "Песня"
         verbose_name_plural = "Песни"
         ordering = ["title"]
+        constraints = [
+            # Названия хранятся без пробелов по краям, поэтому уникальность
+            # title — это уникальность названия без этих пробелов. Регистр
+            # не нормализуется: «Song» и «song» — разные песни (LOWER()
+            # в SQLite приводит к нижнему регистру только ASCII).
+            models.CheckConstraint(
+                condition=models.Q(title=Trim("title")),
+                name="music_title_trimmed",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -73,6 +172,12 @@ class AlbumTrack(models.Model):
         verbose_name="Номер трека",
         help_text="Порядковый номер трека в альбоме"
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+        help_text="Дата и время последнего изменения записи"
+    )
 
     class Meta:
         verbose_name = "Трек в альбоме"
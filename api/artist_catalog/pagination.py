@@ -0,0 +1,409 @@
+"""
+Классы пагинации для API каталога.
+"""
+
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Q
+from django.db.models.query import ModelIterable, ValuesListIterable
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    BasePagination, CursorPagination, Cursor, LimitOffsetPagination, _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from artist_catalog.counting import count_view_rows
+from artist_catalog.services import group_album_tracks
+
+
+class CatalogLimitOffsetPagination(LimitOffsetPagination):
+    """
+    ``LimitOffsetPagination`` с подсчётом строк из ``counting.py``
+    и асинхронным вариантом ``apaginate_queryset`` для асинхронных
+    действий вьюсетов (см. ``asynchronous.py``).
+
+    Поле ``count_approximate`` ответа показывает, что ``count`` — оценка
+    планировщика. В этом случае наличие следующей страницы определяется
+    по одной лишней записи, а не по ``count``.
+    """
+    count_approximate = False
+    has_next = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count, self.count_approximate = count_view_rows(
+            view, queryset, self.get_count_store_check(view)
+        )
+        page = self._page_slice(request)
+        if page is None:
+            return []
+        return self._finish_page(list(queryset[page]))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count, self.count_approximate = await sync_to_async(count_view_rows)(
+            view, queryset, self.get_count_store_check(view)
+        )
+        page = self._page_slice(request)
+        if page is None:
+            return []
+        # Не aiterator(): для values_list() он выполняет запрос прямо в цикле
+        # событий. Страница всё равно собирается в список целиком.
+        return self._finish_page([obj async for obj in queryset[page]])
+
+    def get_count_store_check(self, view):
+        # Посчитанное на отстающей реплике число не должно попасть в кэш
+        # (см. ReplicaReadMixin.can_store_response).
+        return getattr(view, "can_store_response", None)
+
+    def _page_slice(self, request):
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if not self.count_approximate and (self.count == 0 or self.offset > self.count):
+            return None
+        extra = 1 if self.count_approximate else 0
+        return slice(self.offset, self.offset + self.limit + extra)
+
+    def _finish_page(self, rows):
+        if self.count_approximate:
+            self.has_next = len(rows) > self.limit
+            rows = rows[:self.limit]
+            self.count = max(self.count, self.offset + len(rows) + self.has_next)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.count,
+            "count_approximate": self.count_approximate,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        properties = response_schema["properties"]
+        response_schema["properties"] = {
+            "count": properties["count"],
+            "count_approximate": {
+                "type": "boolean",
+                "description": (
+                    "count — оценка числа записей (большая таблица без фильтров), "
+                    "а не точное значение"
+                ),
+                "example": False,
+            },
+            **properties,
+        }
+        return response_schema
+
+    def get_next_link(self):
+        if not self.count_approximate:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+
+        url = replace_query_param(self.request.build_absolute_uri(), self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+
+class AlbumGroupCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация сгруппированных треков по альбомам.
+
+    Страница содержит ``limit`` альбомов целиком. Курсор хранит ``album_id``
+    крайнего альбома страницы, поэтому стоимость страницы зависит только от
+    её размера, а не от размера каталога.
+    """
+    ordering = ("album_id", "track_number")
+    page_size_query_param = "limit"
+    max_page_size = 100
+    chunk_size = 2000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        album_ids = self._prepare_page(queryset, request)
+        album_ids = self._set_page_bounds(list(album_ids))
+        if not album_ids:
+            return []
+
+        album_tracks = self._album_tracks(queryset, album_ids).iterator(chunk_size=self.chunk_size)
+        return group_album_tracks(album_tracks)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        album_ids = self._prepare_page(queryset, request)
+        album_ids = self._set_page_bounds([album_id async for album_id in album_ids])
+        if not album_ids:
+            return []
+
+        album_tracks = self._album_tracks(queryset, album_ids).aiterator(chunk_size=self.chunk_size)
+        return group_album_tracks([album_track async for album_track in album_tracks])
+
+    def _prepare_page(self, queryset, request):
+        """
+        Разбирает курсор и возвращает запрос id альбомов страницы
+        (на один больше размера страницы, чтобы узнать, есть ли следующая).
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.position, self.reverse = None, False
+        else:
+            self.position = self._parse_position(self.cursor.position)
+            self.reverse = self.cursor.reverse
+
+        album_ids = queryset.order_by().values_list("album_id", flat=True).distinct()
+        if self.position is not None:
+            if self.reverse:
+                album_ids = album_ids.filter(album_id__lt=self.position)
+            else:
+                album_ids = album_ids.filter(album_id__gt=self.position)
+
+        return album_ids.order_by("-album_id" if self.reverse else "album_id")[:self.page_size + 1]
+
+    def _set_page_bounds(self, album_ids):
+        has_following = len(album_ids) > self.page_size
+        album_ids = album_ids[:self.page_size]
+        if self.reverse:
+            album_ids.reverse()
+
+        if self.reverse:
+            self.has_next = self.position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.position is not None
+
+        self.first_album_id = album_ids[0] if album_ids else None
+        self.last_album_id = album_ids[-1] if album_ids else None
+        return album_ids
+
+    def _album_tracks(self, queryset, album_ids):
+        return queryset.filter(album_id__in=album_ids).order_by(*self.ordering)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_album_id is None:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=str(self.last_album_id))
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_album_id is None:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=str(self.first_album_id))
+        )
+
+    def _parse_position(self, position):
+        if position is None:
+            return None
+        try:
+            return int(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+
+PAGINATION_PARAM = "pagination"
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по сортировке списка.
+
+    Ключ страницы — значения полей сортировки последней записи: сортировка
+    из параметра ``ordering`` (``OrderingFilter``) или ``Meta.ordering``
+    модели, дополненная ``id`` для однозначности. Следующая страница
+    выбирается условием «после ключа» по индексу, а не ``OFFSET``, поэтому
+    стоит одинаково на любой глубине. Курсор непрозрачен и действует только
+    с той сортировкой, с которой получен.
+    """
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    max_limit = 1000
+    invalid_cursor_message = CursorPagination.invalid_cursor_message
+    display_page_controls = False
+    key_prefix = "_keyset_"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._finish_page(list(self._prepare_page(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self._finish_page([row async for row in self._prepare_page(queryset, request)])
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.limit_query_param], strict=True, cutoff=self.max_limit
+            )
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+    def get_ordering(self, queryset):
+        """
+        Поля сортировки ``(путь ORM, по убыванию)`` с ``id`` в конце.
+        """
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        keys = []
+        for item in ordering:
+            if not isinstance(item, str) or item == "?":
+                raise NotFound("Курсорная пагинация недоступна для этой сортировки.")
+            descending = item.startswith("-")
+            name = item.lstrip("-")
+            keys.append(("id" if name == "pk" else name, descending))
+
+        if not any(name == "id" for name, _ in keys):
+            keys.append(("id", False))
+        return keys
+
+    def _prepare_page(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.limit = self.get_limit(request)
+        self.keys = self.get_ordering(queryset)
+        self.reverse, position = self.decode_cursor(request)
+
+        queryset = queryset.annotate(**{
+            f"{self.key_prefix}{index}": F(name) for index, (name, _) in enumerate(self.keys)
+        })
+        self.row_kind = queryset._iterable_class
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        queryset = queryset.order_by(*(
+            f"{'-' if descending != self.reverse else ''}{name}" for name, descending in self.keys
+        ))
+        self.position = position
+        return queryset[:self.limit + 1]
+
+    def after(self, position):
+        """
+        Условие «строго после ``position``» в направлении обхода:
+        ``a > x OR (a = x AND b > y) OR ...`` с учётом направлений полей.
+        """
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = "lt" if descending != self.reverse else "gt"
+            equal = {self.keys[previous][0]: position[previous] for previous in range(index)}
+            condition |= Q(**equal, **{f"{name}__{lookup}": position[index]})
+
+        # Граница по первому полю позволяет базе пройти индекс диапазоном.
+        name, descending = self.keys[0]
+        bound = "lte" if descending != self.reverse else "gte"
+        return Q(**{f"{name}__{bound}": position[0]}) & condition
+
+    def _finish_page(self, rows):
+        has_following = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+
+        positions = [self.split_row(rows, index) for index in range(len(rows))]
+        self.first_position = positions[0] if positions else None
+        self.last_position = positions[-1] if positions else None
+        if self.reverse:
+            self.has_next = self.position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.position is not None
+        return rows
+
+    def split_row(self, rows, index):
+        """
+        Извлекает ключ строки и убирает из неё служебные значения.
+        """
+        count = len(self.keys)
+        row = rows[index]
+        if issubclass(self.row_kind, ModelIterable):
+            return [getattr(row, f"{self.key_prefix}{key}") for key in range(count)]
+        if issubclass(self.row_kind, ValuesListIterable):
+            rows[index] = row[:-count]
+            return list(row[-count:])
+        return [row.pop(f"{self.key_prefix}{key}") for key in range(count)]
+
+    def encode_cursor(self, position, reverse):
+        ordering = [f"{'-' if descending else ''}{name}" for name, descending in self.keys]
+        payload = json.dumps([ordering, reverse, position], default=str, separators=(",", ":"))
+        token = urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return False, None
+
+        try:
+            payload = urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            ordering, reverse, position = json.loads(payload)
+        except (binascii.Error, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        expected = [f"{'-' if descending else ''}{name}" for name, descending in self.keys]
+        if ordering != expected or not isinstance(position, list) or len(position) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_position is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first_position, True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class KeysetPaginationMixin:
+    """
+    Включает ``KeysetPagination`` для запроса с ``?pagination=cursor``
+    или с параметром ``cursor``; без них остаётся ``pagination_class``.
+    """
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            params = request.query_params if request is not None else {}
+            if params.get(PAGINATION_PARAM) == "cursor" or KeysetPagination.cursor_query_param in params:
+                self._paginator = self.keyset_pagination_class()
+        return super().paginator
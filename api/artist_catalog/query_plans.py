@@ -0,0 +1,156 @@
+"""
+Проверка планов SQL-запросов API каталога.
+
+Запросы на чтение (те же, что в ``benchmark.py``, плюс курсорная пагинация,
+``?expand=`` и ``?search=``) выполняются через тестовый клиент Django,
+каждый выполненный ``SELECT`` записывается вместе с параметрами и
+разбирается через ``EXPLAIN`` в той же базе. Проблемой считается
+последовательное сканирование таблицы: ``Seq Scan`` в PostgreSQL или
+``SCAN <таблица>`` без индекса в SQLite.
+
+Проверку запускают ``QueryPlanTests`` (``tests.py``) и команда
+``check_query_plans``.
+
+В PostgreSQL на время ``EXPLAIN`` отключается ``enable_seqscan``: тогда
+планировщик выбирает ``Seq Scan`` только там, где подходящего индекса нет,
+и проверка не зависит от размера заполненного каталога. С ``seqscan=True``
+планы строятся с настройками по умолчанию — имеет смысл на каталоге
+размера продакшена (``seed_catalog``).
+"""
+
+import json
+import re
+from collections import namedtuple
+from contextlib import ExitStack
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from artist_catalog.benchmark import build_scenarios
+from artist_catalog.models import Artist, Music
+
+
+PlanProblem = namedtuple("PlanProblem", ["scenario", "table", "sql", "plan"])
+
+# «SCAN artist_catalog_artist», «SCAN TABLE t AS U0» (SQLite до 3.36);
+# «SCAN t USING INDEX ...» и «SCAN CONSTANT ROW» не подходят.
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+class QueryRecorder:
+    """
+    Обёртка ``connection.execute_wrapper``, запоминающая выполненные ``SELECT``.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def build_plan_scenarios():
+    """
+    Сценарии чтения ``{имя: (путь, перейти ли на следующую страницу)}``.
+    """
+    scenarios = {
+        scenario.name: (scenario.path, False)
+        for scenario in build_scenarios()
+        # Выгрузка по определению читает таблицы целиком.
+        if not scenario.write and scenario.name != "catalog-export"
+    }
+    for basename in ("artist", "music", "album"):
+        scenarios[f"{basename}-list-cursor"] = (reverse(f"{basename}-list") + "?pagination=cursor", True)
+    scenarios["album-list-expand"] = (reverse("album-list") + "?expand=artist,tracks", False)
+
+    artist_name = Artist.objects.order_by("id").values_list("artist_name", flat=True).first()
+    title = Music.objects.order_by("id").values_list("title", flat=True).first()
+    for basename, text in (("artist", artist_name), ("music", title), ("album", artist_name)):
+        scenarios[f"{basename}-search"] = (reverse(f"{basename}-list") + "?" + urlencode({"search": text}), False)
+    return scenarios
+
+
+def _walk_postgresql(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk_postgresql(child)
+
+
+def explain(alias, sql, params, seqscan=False):
+    """
+    Возвращает ``(план текстом, последовательно сканируемые таблицы)``.
+    """
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            if not seqscan:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = list(_walk_postgresql(plan[0]["Plan"]))
+        text = "\n".join(
+            f"{node['Node Type']} {node.get('Relation Name', '')}".rstrip() for node in nodes
+        )
+        tables = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+        return text, tables
+
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            details = [row[-1] for row in cursor.fetchall()]
+        tables = [match.group(1) for match in map(_SQLITE_SCAN.match, details) if match]
+        return "\n".join(details), tables
+
+    raise ValueError(f"EXPLAIN для СУБД {connection.vendor} не поддерживается.")
+
+
+def check_query_plans(names=None, seqscan=False):
+    """
+    Выполняет сценарии и возвращает ``(планы по сценариям, проблемы)``.
+
+    ``names`` — подмножество имён сценариев, ``seqscan`` — не отключать
+    последовательное сканирование в PostgreSQL.
+    """
+    overrides = {
+        "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+        "CATALOG_RESPONSE_CACHE": None,
+    }
+    plans = {}
+    problems = []
+    with override_settings(**overrides):
+        scenarios = build_plan_scenarios()
+        if names:
+            unknown = set(names) - scenarios.keys()
+            if unknown:
+                raise ValueError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+            scenarios = {name: scenarios[name] for name in names}
+
+        client = Client()
+        for name, (path, follow_next) in scenarios.items():
+            recorders = [QueryRecorder(alias) for alias in connections]
+            with ExitStack() as stack:
+                for recorder in recorders:
+                    stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+                response = client.get(path, HTTP_ACCEPT="application/json")
+                if follow_next and response.status_code == 200 and response.data.get("next"):
+                    response = client.get(response.data["next"], HTTP_ACCEPT="application/json")
+            if response.status_code != 200:
+                raise ValueError(f"{name}: ответ {response.status_code} на {path}")
+
+            plans[name] = []
+            for recorder in recorders:
+                for sql, params in recorder.queries:
+                    text, tables = explain(recorder.alias, sql, params, seqscan)
+                    plans[name].append((sql, text))
+                    problems.extend(PlanProblem(name, table, sql, text) for table in tables)
+
+    return plans, problems
@@ -0,0 +1,167 @@
+"""
+Быстрый JSON-рендерер для DRF.
+
+Кодировщик выбирается один раз при импорте: ``orjson``, если он установлен,
+иначе заранее настроенный ``JSONEncoder`` DRF (без пересоздания на каждый
+ответ). Вывод — компактный UTF-8 без ``\\u``-экранирования, совпадающий
+с выводом ``JSONRenderer`` для данных API. Типы, которых нет в JSON
+(``Decimal``, ленивые строки, ``timedelta`` и т. п.), кодируются так же,
+как в DRF. Ответы с отступами (``Accept: application/json; indent=4``)
+рендерит стандартный ``JSONRenderer``.
+
+``iter_render`` кодирует страницу списка по частям, не собирая весь ответ
+в одну строку: ``StreamingListMixin`` отдаёт так ответы ``list`` через
+``StreamingHttpResponse``. Тем же способом, через ``iter_dumps_array``,
+кодируется потоковая выгрузка каталога.
+"""
+
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils import encoders
+
+from artist_catalog.asynchronous import streaming_content
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# JSON допускает U+2028 и U+2029 в строках, а JavaScript — нет;
+# DRF экранирует их, рендерер делает так же.
+_LINE_SEPARATORS = (("\u2028".encode(), b"\\u2028"), ("\u2029".encode(), b"\\u2029"))
+
+_drf_encoder = encoders.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _escape_line_separators(content):
+    if b"\xe2\x80" in content:
+        for raw, escaped in _LINE_SEPARATORS:
+            content = content.replace(raw, escaped)
+    return content
+
+
+def _stdlib_dumps(data):
+    return _drf_encoder.encode(data).encode("utf-8")
+
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+
+    def dumps(data):
+        """
+        Кодирует ``data`` в компактный JSON (UTF-8, ``bytes``).
+        """
+        try:
+            content = orjson.dumps(data, default=_drf_encoder.default, option=orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            # Нестроковые ключи словарей, целые больше 64 бит и т. п.
+            content = _stdlib_dumps(data)
+        return _escape_line_separators(content)
+else:
+    JSON_BACKEND = "json"
+
+    def dumps(data):
+        """
+        Кодирует ``data`` в компактный JSON (UTF-8, ``bytes``).
+        """
+        return _escape_line_separators(_stdlib_dumps(data))
+
+
+def iter_dumps_array(items, batch_size=500):
+    """
+    Кодирует итерируемый объект как JSON-массив пачками по ``batch_size``
+    элементов, отдавая ``bytes`` по мере готовности.
+    """
+    items = iter(items)
+    yield b"["
+    separator = b""
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            break
+        yield separator + dumps(batch)[1:-1]
+        separator = b","
+    yield b"]"
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` на быстром кодировщике (см. модуль).
+    """
+    ensure_ascii = False
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        if not self.compact or self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
+
+    def iter_render(self, data, batch_size=500):
+        """
+        Потоковый вариант ``render`` для списков и страниц пагинации:
+        элементы списка (или поля ``results``) кодируются пачками.
+        """
+        if isinstance(data, dict) and isinstance(data.get("results"), list):
+            head = dumps({key: value for key, value in data.items() if key != "results"})
+            yield head[:-1] + (b"," if len(head) > 2 else b"") + b'"results":'
+            yield from iter_dumps_array(data["results"], batch_size)
+            yield b"}"
+        elif isinstance(data, (list, tuple)):
+            yield from iter_dumps_array(data, batch_size)
+        else:
+            yield self.render(data)
+
+
+class StreamingListMixin:
+    """
+    Отдаёт ответы ``list`` потоком: страница кодируется пачками через
+    ``iter_render`` рендерера, и первые байты уходят клиенту до того, как
+    закодирована вся страница.
+
+    Включается настройкой ``CATALOG_STREAMING_LISTS``. Обычным ответом
+    остаются ответы с отступами, рендереры без ``iter_render`` и ответы,
+    которые сохранит кэш ответов (``X-Cache: MISS``): кэшу нужно всё
+    содержимое сразу.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not self.is_streamable(response):
+            return response
+
+        renderer = response.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        streaming = StreamingHttpResponse(
+            streaming_content(request, renderer.iter_render(response.data)),
+            status=response.status_code,
+            content_type=content_type,
+        )
+        for header, value in response.items():
+            if header.lower() != "content-type":
+                streaming[header] = value
+        return streaming
+
+    def is_streamable(self, response):
+        renderer = getattr(response, "accepted_renderer", None)
+        return (
+            getattr(settings, "CATALOG_STREAMING_LISTS", False)
+            and self.action == "list"
+            and isinstance(response, Response)
+            and response.status_code == 200
+            and response.data is not None
+            and hasattr(renderer, "iter_render")
+            and renderer.compact
+            and renderer.get_indent(response.accepted_media_type, {}) is None
+            and response.get("X-Cache") != "MISS"
+        )
@@ -0,0 +1,174 @@
+"""
+Чтение из реплик базы данных для действий ``list``/``retrieve``.
+
+``ReplicaReadMixin`` на время запроса на чтение выбирает одну из баз
+``CATALOG_READ_REPLICAS`` (по кругу или наименее загруженную этим процессом,
+``CATALOG_REPLICA_STRATEGY``), и ``ReplicaRouter`` направляет в неё все
+чтения запроса. Запись, админка, импорт и остальные запросы работают
+с ``default``.
+
+Чтобы клиент сразу видел свои изменения, ответ на успешный изменяющий
+запрос содержит cookie и заголовок ``X-Catalog-Last-Write`` со временем
+записи. Следующие ``CATALOG_REPLICA_STICKY_SECONDS`` секунд чтения такого
+клиента (с cookie или с тем же заголовком в запросе) идут в ``default``.
+Ответ, прочитанный из реплики, не сохраняется в кэш ответов, если его
+модели менялись в течение этого же окна: реплика могла ещё не получить
+изменения, а ключ кэша уже содержит новое поколение.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+LAST_WRITE_COOKIE = "catalog_last_write"
+LAST_WRITE_HEADER = "X-Catalog-Last-Write"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_read_database = ContextVar("catalog_read_database", default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, "CATALOG_READ_REPLICAS", ()))
+
+
+class ReplicaChooser:
+    """
+    Выбор реплики: ``round_robin`` — по кругу, ``least_loaded`` — с наименьшим
+    числом запросов, читающих из неё в этом процессе (при равенстве — по кругу).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.active = {}
+
+    def choose(self, replicas, strategy):
+        offset = next(self._counter)
+        ordered = [replicas[(offset + index) % len(replicas)] for index in range(len(replicas))]
+        if strategy == "least_loaded":
+            with self._lock:
+                return min(ordered, key=lambda alias: self.active.get(alias, 0))
+        return ordered[0]
+
+    @contextmanager
+    def acquire(self, alias):
+        with self._lock:
+            self.active[alias] = self.active.get(alias, 0) + 1
+        try:
+            yield alias
+        finally:
+            with self._lock:
+                self.active[alias] -= 1
+
+
+chooser = ReplicaChooser()
+
+
+@contextmanager
+def read_from_replica():
+    """
+    Направляет чтения внутри блока в одну из реплик, если они настроены.
+    """
+    replicas = get_replicas()
+    if not replicas:
+        yield DEFAULT_DB_ALIAS
+        return
+
+    alias = chooser.choose(replicas, getattr(settings, "CATALOG_REPLICA_STRATEGY", "round_robin"))
+    with chooser.acquire(alias):
+        token = _read_database.set(alias)
+        try:
+            yield alias
+        finally:
+            _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Роутер баз данных: чтения из реплики, выбранной ``read_from_replica``,
+    всё остальное — в ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def wrote_recently(request):
+    """
+    Был ли у клиента изменяющий запрос за последние
+    ``CATALOG_REPLICA_STICKY_SECONDS`` секунд.
+    """
+    value = request.headers.get(LAST_WRITE_HEADER) or request.COOKIES.get(LAST_WRITE_COOKIE)
+    try:
+        last_write = float(value)
+    except (TypeError, ValueError):
+        return False
+
+    window = getattr(settings, "CATALOG_REPLICA_STICKY_SECONDS", 5)
+    return time.time() - last_write < window
+
+
+class ReplicaReadMixin:
+    """
+    Выполняет действия ``replica_actions`` вьюсета на реплике и отмечает
+    изменяющие запросы клиента для чтения своих записей.
+    """
+    replica_actions = ("list", "retrieve")
+    read_database_alias = DEFAULT_DB_ALIAS
+
+    def dispatch(self, request, *args, **kwargs):
+        with self.use_read_database(request):
+            response = super().dispatch(request, *args, **kwargs)
+        return self.mark_write(request, response)
+
+    async def adispatch(self, request, *args, **kwargs):
+        with self.use_read_database(request):
+            response = await super().adispatch(request, *args, **kwargs)
+        return self.mark_write(request, response)
+
+    @contextmanager
+    def use_read_database(self, request):
+        action = self.action_map.get(request.method.lower())
+        use_replica = action in self.replica_actions and not wrote_recently(request)
+        with read_from_replica() if use_replica else nullcontext(DEFAULT_DB_ALIAS) as alias:
+            self.read_database_alias = alias
+            yield alias
+
+    def can_store_response(self, cache):
+        if self.read_database_alias != DEFAULT_DB_ALIAS:
+            window = getattr(settings, "CATALOG_REPLICA_STICKY_SECONDS", 5)
+            labels = [model._meta.label_lower for model in self.cache_models]
+            if cache.changed_since(labels, time.time() - window):
+                return False
+        return super().can_store_response(cache)
+
+    def mark_write(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            timestamp = f"{time.time():.3f}"
+            response[LAST_WRITE_HEADER] = timestamp
+            response.set_cookie(
+                LAST_WRITE_COOKIE,
+                timestamp,
+                max_age=getattr(settings, "CATALOG_REPLICA_STICKY_SECONDS", 5),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
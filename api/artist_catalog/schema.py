@@ -0,0 +1,188 @@
+"""
+Заранее собранная схема OpenAPI.
+
+Схема генерируется один раз на версию кода: при первом запросе (и хранится
+в памяти процесса) или командой ``build_schema``, которая записывает файлы
+в ``CATALOG_SCHEMA_DIR``. Версия кода берётся из ``CATALOG_CODE_VERSION``
+(например, SHA коммита при деплое), а если она не задана — из хэша исходников
+проекта, поэтому после изменения кода схема пересобирается сама.
+
+Страницы Swagger UI и ReDoc (``schema_ui_view``) схему не собирают: это
+только шаблоны ``drf_yasg``, а интерфейс загружает собранную схему по
+``SPEC_URL`` (``schema-json``).
+"""
+
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from importlib import import_module
+
+import django
+import drf_yasg
+import rest_framework
+from django.apps import apps
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+
+
+SCHEMA_FORMATS = {
+    "json": (OpenAPICodecJson, "application/json; charset=utf-8"),
+    "yaml": (OpenAPICodecYaml, "application/yaml; charset=utf-8"),
+}
+
+SCHEMA_UI_RENDERERS = {
+    "swagger": SwaggerUIRenderer,
+    "redoc": ReDocRenderer,
+}
+
+
+@lru_cache(maxsize=None)
+def get_code_version():
+    configured = getattr(settings, "CATALOG_CODE_VERSION", None)
+    if configured:
+        return str(configured)
+
+    base_dir = os.path.realpath(str(settings.BASE_DIR))
+    roots = {
+        os.path.realpath(app_config.path)
+        for app_config in apps.get_app_configs()
+        if os.path.realpath(app_config.path).startswith(base_dir + os.sep)
+    }
+    urlconf = import_module(settings.ROOT_URLCONF)
+    roots.add(os.path.dirname(os.path.realpath(urlconf.__file__)))
+
+    digest = hashlib.sha1()
+    for library in (django, rest_framework, drf_yasg):
+        digest.update(f"{library.__name__}={library.__version__};".encode())
+    for root in sorted(roots):
+        for directory, subdirectories, filenames in os.walk(root):
+            subdirectories[:] = sorted(name for name in subdirectories if name != "__pycache__")
+            for filename in sorted(filenames):
+                if filename.endswith(".py"):
+                    path = os.path.join(directory, filename)
+                    digest.update(os.path.relpath(path, base_dir).encode())
+                    with open(path, "rb") as source:
+                        digest.update(source.read())
+
+    return digest.hexdigest()[:16]
+
+
+def generate_schema():
+    """
+    Собирает схему по всем маршрутам API и возвращает ``{format: bytes}``.
+    """
+    from artist_catalog.urls import API_INFO
+
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        schema_format: codec_class(validators=[]).encode(schema)
+        for schema_format, (codec_class, _) in SCHEMA_FORMATS.items()
+    }
+
+
+def get_schema_dir():
+    return getattr(settings, "CATALOG_SCHEMA_DIR", None)
+
+
+def schema_path(directory, version, schema_format):
+    return os.path.join(str(directory), f"openapi-{version}.{schema_format}")
+
+
+def write_schema(directory):
+    """
+    Записывает схему текущей версии кода в ``directory`` и удаляет файлы
+    прежних версий. Возвращает пути записанных файлов.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = get_code_version()
+    documents = generate_schema()
+
+    paths = []
+    for schema_format, content in documents.items():
+        path = schema_path(directory, version, schema_format)
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as stream:
+            stream.write(content)
+        os.replace(temporary, path)
+        paths.append(path)
+
+    for filename in os.listdir(directory):
+        if filename.startswith("openapi-") and os.path.join(str(directory), filename) not in paths:
+            os.remove(os.path.join(str(directory), filename))
+
+    _documents.clear()
+    return paths
+
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+def _load_documents(version):
+    directory = get_schema_dir()
+    if directory:
+        try:
+            documents = {}
+            for schema_format in SCHEMA_FORMATS:
+                with open(schema_path(directory, version, schema_format), "rb") as stream:
+                    documents[schema_format] = stream.read()
+            return documents
+        except FileNotFoundError:
+            pass
+
+    return generate_schema()
+
+
+def get_schema_document(schema_format):
+    """
+    Возвращает ``(content, etag)`` схемы для текущей версии кода.
+    """
+    version = get_code_version()
+    document = _documents.get((version, schema_format))
+    if document is None:
+        with _documents_lock:
+            document = _documents.get((version, schema_format))
+            if document is None:
+                _documents.clear()
+                for loaded_format, content in _load_documents(version).items():
+                    etag = quote_etag(hashlib.sha1(content).hexdigest())
+                    _documents[(version, loaded_format)] = (content, etag)
+                document = _documents[(version, schema_format)]
+
+    return document
+
+
+def schema_document_view(request, format):
+    schema_format = format.lstrip(".")
+    if schema_format not in SCHEMA_FORMATS:
+        raise Http404
+
+    content, etag = get_schema_document(schema_format)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=SCHEMA_FORMATS[schema_format][1])
+
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def schema_ui_view(request, ui):
+    """
+    Страница Swagger UI (``ui="swagger"``) или ReDoc (``ui="redoc"``).
+    """
+    from artist_catalog.urls import API_INFO
+
+    renderer = SCHEMA_UI_RENDERERS[ui]()
+    context = {"request": request}
+    renderer.set_context(context)
+    context["title"] = API_INFO.title
+    content = render_to_string(renderer.template, context, request)
+    return HttpResponse(content, content_type="text/html; charset=utf-8")
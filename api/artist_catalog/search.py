@@ -0,0 +1,276 @@
+"""
+Поиск по каталогу: ``?search=``.
+
+``CatalogSearchFilter`` заменяет ``SearchFilter`` DRF. Вьюсет перечисляет
+в ``search_fields`` пути ORM к текстовым колонкам, например
+``artist__artist_name`` или ``album_tracks__track__title``; строка ищется
+в каждой колонке, совпадения по разным полям объединяются через OR, а
+результаты без параметра ``ordering`` сортируются по релевантности
+(лучшее совпадение среди полей).
+
+Колонки из ``SEARCH_COLUMNS`` проиндексированы миграцией ``0007``:
+
+* в PostgreSQL — GIN-индексы по ``to_tsvector('simple', ...)`` для
+  полнотекстового поиска и по ``gin_trgm_ops`` (``pg_trgm``) для поиска
+  с опечатками и по частям слов; ранг — сумма ``ts_rank`` и
+  ``word_similarity``;
+* в SQLite — таблицы FTS5 ``<таблица>_fts`` с триггерами синхронизации;
+  каждое слово ищется целиком или как префикс, ранг — ``bm25``.
+
+Совпадения ищутся в таблице колонки по индексу, а строки списка
+выбираются по найденным id, поэтому время поиска не растёт с размером
+каталога так, как ``icontains`` по всем строкам. Остальные колонки и СУБД
+ищутся через ``icontains`` по каждому слову, без ранжирования.
+
+Если ``search_fields`` ведут через связи, ``SearchDependenciesMixin``
+добавляет модели на этих путях к ``cache_models`` и ``timestamp_fields``
+вьюсета на время поиска, как ``ExpandMixin``.
+"""
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, OuterRef, Q, Subquery, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Coalesce, Greatest
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from artist_catalog.models import Artist, Music
+
+
+SEARCH_COLUMNS = {
+    Artist: "artist_name",
+    Music: "title",
+}
+
+# Словарь без стемминга: имена и названия на разных языках.
+SEARCH_CONFIG = "simple"
+
+
+def fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+class FullTextMatch(Func):
+    """
+    ``<id> IN (SELECT rowid FROM <fts> WHERE <fts> MATCH <запрос>)`` (SQLite FTS5).
+    """
+    output_field = BooleanField()
+
+    def __init__(self, expression, table, query):
+        super().__init__(expression)
+        self.table = table
+        self.query = query
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        table = connection.ops.quote_name(self.table)
+        return f"{sql} IN (SELECT rowid FROM {table} WHERE {table} MATCH %s)", (*params, self.query)
+
+
+class FullTextRank(FullTextMatch):
+    """
+    Релевантность строки ``<id>`` по ``bm25`` FTS5: чем больше, тем лучше.
+    """
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        table = connection.ops.quote_name(self.table)
+        return (
+            f"(SELECT -rank FROM {table} WHERE {table} MATCH %s AND rowid = {sql})",
+            (self.query, *params),
+        )
+
+
+class SearchBackend:
+    """
+    Поиск без индексов: ``icontains`` по каждому слову, без ранжирования.
+    """
+
+    def match(self, model, column, terms):
+        """
+        Условие для queryset ``model``: колонка ``column`` содержит ``terms``.
+        """
+        return Q(*(Q(**{f"{column}__icontains": term}) for term in terms))
+
+    def rank(self, model, column, terms):
+        """
+        Релевантность строки ``model`` (больше — лучше) или ``None``.
+        """
+        return None
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Полнотекстовый поиск и ``pg_trgm`` по индексам из миграции ``0007``.
+    """
+
+    def match(self, model, column, terms):
+        if SEARCH_COLUMNS.get(model) != column:
+            return super().match(model, column, terms)
+
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import SearchVectorExact
+
+        text = " ".join(terms)
+        return (
+            Q(SearchVectorExact(self.vector(column), self.query(text)))
+            | Q(TrigramWordSimilar(F(column), text))
+        )
+
+    def rank(self, model, column, terms):
+        if SEARCH_COLUMNS.get(model) != column:
+            return None
+
+        from django.contrib.postgres.search import SearchRank, TrigramWordSimilarity
+
+        text = " ".join(terms)
+        return SearchRank(self.vector(column), self.query(text)) + TrigramWordSimilarity(text, column)
+
+    def vector(self, column):
+        from django.contrib.postgres.search import SearchVector
+
+        # Выражение совпадает с выражением GIN-индекса из миграции 0007.
+        return SearchVector(column, config=SEARCH_CONFIG)
+
+    def query(self, text):
+        from django.contrib.postgres.search import SearchQuery
+
+        return SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    Поиск по таблицам FTS5 из миграции ``0007``.
+    """
+
+    def match(self, model, column, terms):
+        if SEARCH_COLUMNS.get(model) != column:
+            return super().match(model, column, terms)
+        return Q(FullTextMatch(F("pk"), fts_table(model), self.query(terms)))
+
+    def rank(self, model, column, terms):
+        if SEARCH_COLUMNS.get(model) != column:
+            return None
+        return FullTextRank(F("pk"), fts_table(model), self.query(terms))
+
+    def query(self, terms):
+        # Каждое слово ищется целиком или как префикс; совпадение целого
+        # слова попадает в обе части и получает больший bm25.
+        quoted = ('"{}"'.format(term.replace('"', '""')) for term in terms)
+        return " AND ".join(f"({term} OR {term}*)" for term in quoted)
+
+
+SEARCH_BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend(alias):
+    return SEARCH_BACKENDS.get(connections[alias].vendor, SearchBackend)()
+
+
+def search_dependencies(model, paths):
+    """
+    Модели и поля ``updated_at`` на путях ``paths`` через связи.
+    """
+    models = []
+    fields = []
+    for path in paths:
+        *relations, _ = path.split(LOOKUP_SEP)
+        current = model
+        for index, name in enumerate(relations):
+            current = current._meta.get_field(name).related_model
+            models.append(current)
+            fields.append(LOOKUP_SEP.join([*relations[:index + 1], "updated_at"]))
+    return tuple(dict.fromkeys(models)), tuple(dict.fromkeys(fields))
+
+
+def resolve_search_field(model, path):
+    """
+    Для пути ``path`` от ``model`` возвращает ``(модель колонки, колонка,
+    путь обратно к model, есть ли связи «ко многим»)``.
+    """
+    *relations, column = path.split(LOOKUP_SEP)
+    reverse = []
+    many = False
+    for name in relations:
+        field = model._meta.get_field(name)
+        many = many or field.one_to_many or field.many_to_many
+        reverse.append(field.related_query_name() if field.concrete else field.remote_field.name)
+        model = field.related_model
+    return model, column, LOOKUP_SEP.join(reversed(reverse)), many
+
+
+class CatalogSearchFilter(SearchFilter):
+    """
+    ``SearchFilter`` с индексированным поиском и ранжированием (см. модуль).
+    """
+    rank_annotation = "search_rank"
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not search_fields or not terms:
+            return queryset
+
+        backend = get_search_backend(queryset.db)
+        conditions = Q()
+        ranks = []
+        for path in search_fields:
+            model, column, reverse, many = resolve_search_field(queryset.model, path)
+            match = backend.match(model, column, terms)
+            rank = backend.rank(model, column, terms)
+            relation = path.rpartition(LOOKUP_SEP)[0]
+
+            if not relation:
+                conditions |= match
+            else:
+                # Сначала по индексу находятся строки колонки, затем —
+                # строки списка, связанные с ними.
+                matches = model._default_manager.filter(match).values("pk")
+                if many:
+                    related = queryset.model._default_manager.filter(**{f"{relation}__in": matches})
+                    conditions |= Q(pk__in=related.values("pk"))
+                else:
+                    conditions |= Q(**{f"{relation}__in": matches})
+
+            if rank is not None and relation:
+                rank = Subquery(
+                    model._default_manager
+                    .filter(match, **{reverse: OuterRef("pk")})
+                    .annotate(_rank=rank)
+                    .order_by("-_rank")
+                    .values("_rank")[:1],
+                    output_field=FloatField(),
+                )
+            if rank is not None:
+                ranks.append(Coalesce(rank, Value(0.0), output_field=FloatField()))
+
+        queryset = queryset.filter(conditions)
+        if not ranks:
+            return queryset
+
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        return (
+            queryset
+            .annotate(**{self.rank_annotation: ranks[0] if len(ranks) == 1 else Greatest(*ranks)})
+            .order_by(f"-{self.rank_annotation}", *ordering)
+        )
+
+
+class SearchDependenciesMixin:
+    """
+    Учитывает в кэше ответов и ETag связанные модели из ``search_fields``:
+    результаты поиска меняются вместе с ними.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action != "list" or not request.query_params.get(api_settings.SEARCH_PARAM):
+            return
+
+        models, fields = search_dependencies(self.queryset.model, getattr(self, "search_fields", ()))
+        self.cache_models = tuple(dict.fromkeys([*self.cache_models, *models]))
+        self.timestamp_fields = tuple(dict.fromkeys([*self.timestamp_fields, *fields]))
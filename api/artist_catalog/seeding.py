@@ -0,0 +1,111 @@
+"""
+Генератор синтетического каталога для замеров производительности.
+
+Каталог воспроизводим: при одинаковом ``seed`` получаются те же имена,
+даты выпуска и составы альбомов. Названия песен берутся из общего пула,
+поэтому одна песня встречается в нескольких альбомах, как в реальных данных.
+Запись идёт пачками ``bulk_create``, счётчики заполняются сразу при вставке.
+"""
+
+import datetime
+import random
+
+from django.db import connection, transaction
+
+from artist_catalog.models import Album, AlbumTrack, Artist, Music
+from artist_catalog.services import resolve_music_titles
+from artist_catalog.signals import bulk_changed
+
+
+FIRST_RELEASE_DATE = datetime.date(1960, 1, 1)
+RELEASE_DATE_SPAN_DAYS = 365 * 65
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def clear_catalog():
+    """
+    Удаляет все данные каталога без загрузки объектов в память.
+    """
+    models = (AlbumTrack, Album, Music, Artist)
+    with connection.cursor() as cursor:
+        for model in models:
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+    for model in models:
+        bulk_changed.send(sender=model)
+
+
+@transaction.atomic
+def seed_catalog(artists=100, albums_per_artist=10, tracks_per_album=12, titles=None,
+                 seed=0, batch_size=1000, clear=False):
+    """
+    Создаёт ``artists`` исполнителей по ``albums_per_artist`` альбомов
+    из ``tracks_per_album`` треков.
+
+    ``titles`` — размер пула названий песен (по умолчанию четверть от числа
+    треков, то есть каждая песня в среднем встречается в четырёх альбомах).
+    Возвращает количество созданных записей по моделям.
+    """
+    if titles is None:
+        titles = max(tracks_per_album, artists * albums_per_artist * tracks_per_album // 4)
+    if titles < tracks_per_album:
+        raise ValueError("Пул названий меньше числа треков в альбоме.")
+
+    rng = random.Random(seed)
+    if clear:
+        clear_catalog()
+
+    pool = [f"Song {number:06d}" for number in range(titles)]
+    music_ids = []
+    for chunk in _chunks(pool, batch_size):
+        music_by_title = resolve_music_titles(chunk)
+        music_ids.extend(music_by_title[title].id for title in chunk)
+
+    created_artists = Artist.objects.bulk_create(
+        [
+            Artist(
+                artist_name=f"Artist {number:05d}",
+                albums_count=albums_per_artist,
+                tracks_count=albums_per_artist * tracks_per_album,
+            )
+            for number in range(artists)
+        ],
+        batch_size=batch_size,
+    )
+
+    albums_created = 0
+    tracks_created = 0
+    artists_per_batch = max(1, batch_size // max(1, albums_per_artist))
+    for artist_chunk in _chunks(created_artists, artists_per_batch):
+        albums = Album.objects.bulk_create([
+            Album(
+                artist_id=artist.id,
+                release_date=FIRST_RELEASE_DATE + datetime.timedelta(
+                    days=rng.randrange(RELEASE_DATE_SPAN_DAYS)
+                ),
+                tracks_count=tracks_per_album,
+            )
+            for artist in artist_chunk
+            for _ in range(albums_per_artist)
+        ])
+        album_tracks = [
+            AlbumTrack(album_id=album.id, track_id=track_id, track_number=number)
+            for album in albums
+            for number, track_id in enumerate(rng.sample(music_ids, tracks_per_album), 1)
+        ]
+        AlbumTrack.objects.bulk_create(album_tracks, batch_size=batch_size)
+        albums_created += len(albums)
+        tracks_created += len(album_tracks)
+
+    for model in (Artist, Album, AlbumTrack):
+        bulk_changed.send(sender=model)
+
+    return {
+        "artists": len(created_artists),
+        "albums": albums_created,
+        "music": len(set(music_ids)),
+        "album_tracks": tracks_created,
+    }
@@ -1,6 +1,12 @@
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
+from artist_catalog.counters import adjust_track_counters
+from artist_catalog.export import ENTITIES, FORMATS
 from artist_catalog.models import Artist, Album, AlbumTrack, Music
+from artist_catalog.services import resolve_music_titles, sync_album_tracks
+from artist_catalog.signals import bulk_changed
 
 
 class ArtistSerializer(serializers.ModelSerializer):
@@ -12,10 +18,18 @@ class ArtistSerializer(serializers.ModelSerializer):
         max_length=100,
         help_text="Название исполнителя или музыкальной группы"
     )
+    albums_count = serializers.IntegerField(
+        read_only=True,
+        help_text="Количество альбомов исполнителя"
+    )
+    tracks_count = serializers.IntegerField(
+        read_only=True,
+        help_text="Общее количество треков в альбомах исполнителя"
+    )
 
     class Meta:
         model = Artist
-        fields = ("id", "artist_name",)
+        fields = ("id", "artist_name", "albums_count", "tracks_count",)
 
 
 class MusicSerializer(serializers.ModelSerializer):
@@ -25,6 +39,7 @@ class MusicSerializer(serializers.ModelSerializer):
     )
     title = serializers.CharField(
         max_length=100,
+        validators=[UniqueValidator(queryset=Music.objects.all())],
         help_text="Название музыкального произведения"
     )
 
@@ -44,6 +59,18 @@ class AlbumWriteTrackSerializer(serializers.Serializer):
     )
 
 
+def validate_album_tracks(value):
+    titles = [track_item["title"].strip() for track_item in value]
+    if len(set(titles)) != len(titles):
+        raise serializers.ValidationError("Названия треков в альбоме не должны повторяться.")
+
+    numbers = [track_item["number"] for track_item in value]
+    if len(set(numbers)) != len(numbers):
+        raise serializers.ValidationError("Номера треков в альбоме не должны повторяться.")
+
+    return value
+
+
 class AlbumWriteSerializer(serializers.ModelSerializer):
     tracks = AlbumWriteTrackSerializer(
         many=True, 
@@ -56,6 +83,10 @@ class AlbumWriteSerializer(serializers.ModelSerializer):
         fields = ("id", "artist", "release_date", "tracks")
         read_only_fields = ("id",)
 
+    def validate_tracks(self, value):
+        return validate_album_tracks(value)
+
+    @transaction.atomic
     def create(self, validated_data):
         tracks_data = validated_data.pop("tracks", [])
         album = Album.objects.create(**validated_data)
@@ -64,6 +95,7 @@ class AlbumWriteSerializer(serializers.ModelSerializer):
 
         return album
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tracks_data = validated_data.pop("tracks", None)
         for attr, value in validated_data.items():
@@ -72,23 +104,79 @@ class AlbumWriteSerializer(serializers.ModelSerializer):
         instance.save()
 
         if tracks_data is not None:
-            instance.album_tracks.all().delete()
-            self._upsert_tracks(instance, tracks_data)
+            sync_album_tracks(
+                instance,
+                ((track_item["title"].strip(), track_item["number"]) for track_item in tracks_data),
+            )
 
         return instance
 
     def _upsert_tracks(self, album: Album, tracks_data):
-        album_tracks_to_create = []
-        for track_item in tracks_data:
-            title = track_item["title"].strip()
-            number = track_item["number"]
-            music, _ = Music.objects.get_or_create(title=title)
-            album_tracks_to_create.append(
-                AlbumTrack(album=album, track=music, track_number=number)
+        music_by_title = resolve_music_titles(
+            track_item["title"].strip() for track_item in tracks_data
+        )
+        album_tracks_to_create = [
+            AlbumTrack(
+                album=album,
+                track=music_by_title[track_item["title"].strip()],
+                track_number=track_item["number"],
             )
+            for track_item in tracks_data
+        ]
 
         if album_tracks_to_create:
             AlbumTrack.objects.bulk_create(album_tracks_to_create)
+            bulk_changed.send(sender=AlbumTrack)
+            adjust_track_counters(
+                {album.pk: len(album_tracks_to_create)},
+                artist_by_album={album.pk: album.artist_id},
+            )
+
+
+class AlbumImportSerializer(serializers.Serializer):
+    artist = serializers.IntegerField(
+        min_value=1,
+        required=False,
+        help_text="Идентификатор существующего исполнителя"
+    )
+    artist_name = serializers.CharField(
+        max_length=100,
+        required=False,
+        help_text="Имя исполнителя; отсутствующий исполнитель будет создан"
+    )
+    release_date = serializers.DateField(
+        help_text="Дата выпуска альбома"
+    )
+    tracks = AlbumWriteTrackSerializer(
+        many=True,
+        required=False,
+        help_text="Список треков альбома"
+    )
+
+    def validate_artist_name(self, value):
+        return value.strip()
+
+    def validate_tracks(self, value):
+        return validate_album_tracks(value)
+
+    def validate(self, attrs):
+        if "artist" not in attrs and not attrs.get("artist_name"):
+            raise serializers.ValidationError("Укажите artist или artist_name.")
+
+        return attrs
+
+
+class AlbumImportReportSerializer(serializers.Serializer):
+    created = serializers.IntegerField(
+        help_text="Количество созданных альбомов"
+    )
+    failed = serializers.IntegerField(
+        help_text="Количество строк с ошибками"
+    )
+    errors = serializers.ListField(
+        child=serializers.DictField(),
+        help_text="Ошибки по строкам: номер строки и описание ошибок"
+    )
 
 
 class AlbumReadSerializer(serializers.ModelSerializer):
@@ -100,10 +188,14 @@ class AlbumReadSerializer(serializers.ModelSerializer):
     release_date = serializers.DateField(
         help_text="Дата выпуска альбома"
     )
+    tracks_count = serializers.IntegerField(
+        read_only=True,
+        help_text="Количество треков в альбоме"
+    )
 
     class Meta:
         model = Album
-        fields = ("artist", "release_date")
+        fields = ("artist", "release_date", "tracks_count")
 
 
 class TrackInAlbumSerializer(serializers.Serializer):
@@ -115,6 +207,17 @@ class TrackInAlbumSerializer(serializers.Serializer):
     )
 
 
+class AlbumTrackReadSerializer(serializers.Serializer):
+    title = serializers.CharField(
+        source="track.title",
+        help_text="Название трека"
+    )
+    number = serializers.IntegerField(
+        source="track_number",
+        help_text="Порядковый номер трека в альбоме"
+    )
+
+
 class AlbumTracksGroupedSerializer(serializers.Serializer):
     album = AlbumReadSerializer(
         help_text="Информация об альбоме"
@@ -124,3 +227,40 @@ class AlbumTracksGroupedSerializer(serializers.Serializer):
         help_text="Список треков в альбоме"
     )
 
+
+class CatalogExportQuerySerializer(serializers.Serializer):
+    entities = serializers.CharField(
+        required=False,
+        default=",".join(ENTITIES),
+        help_text="Сущности через запятую в порядке выгрузки: artists, albums, music"
+    )
+    since_id = serializers.IntegerField(
+        required=False,
+        default=0,
+        min_value=0,
+        help_text="Выгрузить записи первой сущности с id больше указанного"
+    )
+    output = serializers.ChoiceField(
+        choices=FORMATS,
+        required=False,
+        default="ndjson",
+        help_text="Формат выгрузки: ndjson (по записи на строку) или json"
+    )
+    compress = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Сжимать выгрузку gzip на лету"
+    )
+
+    def validate_entities(self, value):
+        entities = []
+        for entity in value.split(","):
+            entity = entity.strip()
+            if entity not in ENTITIES:
+                raise serializers.ValidationError(
+                    f"Неизвестная сущность '{entity}'. Допустимые значения: {', '.join(ENTITIES)}"
+                )
+            if entity not in entities:
+                entities.append(entity)
+
+        return entities
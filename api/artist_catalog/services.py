@@ -0,0 +1,311 @@
+"""
+Служебные операции над каталогом, общие для представлений, админки и команд.
+"""
+
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.db.models import Max, Prefetch
+from django.utils import timezone
+
+from artist_catalog.counters import adjust_track_counters
+from artist_catalog.models import AlbumTrack, Artist, Music
+from artist_catalog.signals import bulk_changed
+
+
+TrackListDiff = namedtuple("TrackListDiff", ["to_delete", "to_update", "to_create"])
+
+
+def resolve_music_titles(titles):
+    """
+    Возвращает словарь ``{title: Music}`` для всех названий, создавая недостающие.
+
+    Существующие песни ищутся одним запросом ``title__in`` по уникальному
+    индексу, недостающие создаются одним ``bulk_create``. Количество запросов
+    не зависит от числа названий.
+    """
+    titles = set(titles)
+    if not titles:
+        return {}
+
+    music_by_title = {music.title: music for music in Music.objects.filter(title__in=titles).order_by()}
+    missing = titles - music_by_title.keys()
+    if missing:
+        # ignore_conflicts: параллельный запрос мог уже создать часть песен,
+        # поэтому созданные записи перечитываются вместе с чужими.
+        Music.objects.bulk_create(
+            [Music(title=title) for title in missing],
+            ignore_conflicts=True,
+        )
+        bulk_changed.send(sender=Music)
+        music_by_title.update(
+            (music.title, music) for music in Music.objects.filter(title__in=missing).order_by()
+        )
+
+    return music_by_title
+
+
+def resolve_artist_names(names):
+    """
+    Возвращает словарь ``{artist_name: Artist}``, создавая недостающих исполнителей.
+
+    Имена исполнителей не уникальны, поэтому при совпадении берётся
+    исполнитель с наименьшим id.
+    """
+    names = set(names)
+    if not names:
+        return {}
+
+    artist_by_name = {
+        artist.artist_name: artist
+        for artist in Artist.objects.filter(artist_name__in=names).order_by("-id")
+    }
+    missing = names - artist_by_name.keys()
+    if missing:
+        created = Artist.objects.bulk_create([Artist(artist_name=name) for name in missing])
+        bulk_changed.send(sender=Artist)
+        artist_by_name.update((artist.artist_name, artist) for artist in created)
+
+    return artist_by_name
+
+
+def diff_album_tracks(existing, incoming):
+    """
+    Сравнивает текущие треки альбома с новым списком.
+
+    ``existing`` — пары ``(album_track_id, (track_id, track_number))``,
+    ``incoming`` — пары ``(track_id, track_number)``. Возвращает ``TrackListDiff``:
+    id удаляемых строк, тройки ``(album_track_id, track_id, track_number)``
+    для изменяемых строк и пары ``(track_id, track_number)`` для новых.
+
+    Строки сопоставляются сначала целиком, затем по треку (перенумерация),
+    затем по номеру (замена трека на позиции), поэтому исправление названия
+    одного трека меняет одну строку.
+    """
+    existing = dict(existing)
+    incoming = list(incoming)
+
+    exact = set(existing.values()) & set(incoming)
+    rows = {row_id: pair for row_id, pair in existing.items() if pair not in exact}
+    pending = [pair for pair in incoming if pair not in exact]
+
+    to_update = []
+    row_by_track = {track_id: row_id for row_id, (track_id, _) in rows.items()}
+    unmatched = []
+    for track_id, number in pending:
+        row_id = row_by_track.get(track_id)
+        if row_id is None:
+            unmatched.append((track_id, number))
+            continue
+        to_update.append((row_id, track_id, number))
+        del rows[row_id]
+
+    row_by_number = {number: row_id for row_id, (_, number) in rows.items()}
+    to_create = []
+    for track_id, number in unmatched:
+        row_id = row_by_number.pop(number, None)
+        if row_id is None:
+            to_create.append((track_id, number))
+            continue
+        to_update.append((row_id, track_id, number))
+        del rows[row_id]
+
+    return TrackListDiff(to_delete=list(rows), to_update=to_update, to_create=to_create)
+
+
+@transaction.atomic
+def sync_album_tracks(album, tracks):
+    """
+    Приводит треки альбома к списку пар ``(title, track_number)``.
+
+    Применяет только разницу с текущим состоянием: удаления, изменения и
+    вставки выполняются пакетно. Если изменяемые строки меняются номерами,
+    они сначала переносятся на временные номера за пределами используемых,
+    чтобы не нарушить ``uniq_track_number_per_album`` посреди обмена.
+    """
+    tracks = list(tracks)
+    music_by_title = resolve_music_titles(title for title, _ in tracks)
+    incoming = [(music_by_title[title].id, number) for title, number in tracks]
+
+    current = {
+        row_id: (track_id, number)
+        for row_id, track_id, number in (
+            AlbumTrack.objects
+            .select_for_update()
+            .filter(album=album)
+            .order_by()
+            .values_list("id", "track_id", "track_number")
+        )
+    }
+    diff = diff_album_tracks(current.items(), incoming)
+
+    if diff.to_delete:
+        AlbumTrack.objects.filter(id__in=diff.to_delete).delete()
+
+    if diff.to_update:
+        current_numbers = {current[row_id][1] for row_id, _, _ in diff.to_update}
+        renumbered = [
+            number for row_id, _, number in diff.to_update
+            if number != current[row_id][1]
+        ]
+        if any(number in current_numbers for number in renumbered):
+            spare = max(
+                max(number for _, number in current.values()),
+                max(renumbered),
+            ) + 1
+            AlbumTrack.objects.bulk_update(
+                [
+                    AlbumTrack(id=row_id, track_number=spare + index)
+                    for index, (row_id, _, _) in enumerate(diff.to_update)
+                ],
+                ["track_number"],
+            )
+
+        # bulk_update не заполняет auto_now, поэтому updated_at задаётся явно.
+        updated_at = timezone.now()
+        AlbumTrack.objects.bulk_update(
+            [
+                AlbumTrack(
+                    id=row_id,
+                    album=album,
+                    track_id=track_id,
+                    track_number=number,
+                    updated_at=updated_at,
+                )
+                for row_id, track_id, number in diff.to_update
+            ],
+            ["track", "track_number", "updated_at"],
+        )
+
+    if diff.to_create:
+        AlbumTrack.objects.bulk_create([
+            AlbumTrack(album=album, track_id=track_id, track_number=number)
+            for track_id, number in diff.to_create
+        ])
+
+    if diff.to_delete or diff.to_update or diff.to_create:
+        bulk_changed.send(sender=AlbumTrack)
+
+    adjust_track_counters(
+        {album.pk: len(diff.to_create) - len(diff.to_delete)},
+        artist_by_album={album.pk: album.artist_id},
+    )
+
+    return diff
+
+
+@transaction.atomic
+def renumber_album_tracks(album_ids=None):
+    """
+    Перенумеровывает треки альбомов подряд с 1, сохраняя их порядок.
+
+    ``album_ids`` — альбомы для перенумерации, ``None`` — весь каталог.
+    Номера вычисляются одним UPDATE с ``ROW_NUMBER() OVER (PARTITION BY album_id)``
+    и сначала записываются со сдвигом за пределы существующих номеров, а вторым
+    UPDATE сдвиг снимается: так ``uniq_track_number_per_album`` не нарушается
+    посреди обновления. Меняются только строки с неверным номером.
+    Возвращает число перенумерованных треков.
+    """
+    queryset = AlbumTrack.objects.order_by()
+    album_condition = ""
+    album_params = []
+    if album_ids is not None:
+        album_ids = sorted(set(album_ids))
+        if not album_ids:
+            return 0
+        queryset = queryset.filter(album_id__in=album_ids)
+        album_condition = f"album_id IN ({', '.join(['%s'] * len(album_ids))})"
+        album_params = album_ids
+        # Блокируем треки альбомов, чтобы параллельная запись не изменила
+        # максимальный номер между его чтением и обновлением.
+        list(queryset.select_for_update().values_list("id", flat=True))
+
+    offset = queryset.aggregate(offset=Max("track_number"))["offset"]
+    if offset is None:
+        return 0
+
+    table = connection.ops.quote_name(AlbumTrack._meta.db_table)
+    where_albums = f"WHERE {album_condition}" if album_condition else ""
+    and_albums = f"AND {album_condition}" if album_condition else ""
+    updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table}
+            SET track_number = ranked.position + %s, updated_at = %s
+            FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY album_id ORDER BY track_number, id
+                ) AS position
+                FROM {table}
+                {where_albums}
+            ) AS ranked
+            WHERE {table}.id = ranked.id AND {table}.track_number <> ranked.position
+            """,
+            [offset, updated_at, *album_params],
+        )
+        renumbered = cursor.rowcount
+        if renumbered:
+            cursor.execute(
+                f"UPDATE {table} SET track_number = track_number - %s "
+                f"WHERE track_number > %s {and_albums}",
+                [offset, offset, *album_params],
+            )
+
+    if renumbered:
+        bulk_changed.send(sender=AlbumTrack)
+
+    return renumbered
+
+
+def group_album_tracks(album_tracks):
+    """
+    Группирует треки, упорядоченные по ``(album_id, track_number)``, по альбомам.
+
+    Принимает любой итерируемый объект, в том числе ``QuerySet.iterator()``.
+    """
+    grouped = []
+    current_album_id = None
+    current_group = None
+
+    for at in album_tracks:
+        if at.album_id != current_album_id:
+            if current_group is not None:
+                grouped.append(current_group)
+
+            current_group = {
+                "album": at.album,
+                "tracks": [],
+            }
+
+            current_album_id = at.album_id
+
+        current_group["tracks"].append({
+            "title": at.track.title,
+            "number": at.track_number,
+        })
+
+    if current_group is not None:
+        grouped.append(current_group)
+
+    return grouped
+
+
+def select_album_artist(queryset):
+    """
+    Загружает исполнителей альбомов ``queryset`` в том же запросе.
+    """
+    return queryset.select_related("artist")
+
+
+def prefetch_album_tracks(queryset):
+    """
+    Загружает треки альбомов ``queryset`` одним дополнительным запросом,
+    упорядоченными по номеру в альбоме.
+    """
+    return queryset.prefetch_related(
+        Prefetch(
+            "album_tracks",
+            queryset=AlbumTrack.objects.select_related("track").order_by("track_number"),
+        )
+    )
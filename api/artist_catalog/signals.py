@@ -1,7 +1,21 @@
+from functools import partial
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_migrate
-from django.dispatch import receiver
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_migrate, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from artist_catalog.cache import bump_generation, reset_response_cache
+from artist_catalog.models import Artist, Album, Music, AlbumTrack
+
+
+# Отправляется после массовых операций (bulk_create, bulk_update, update,
+# COPY), для которых Django не отправляет post_save/post_delete.
+bulk_changed = Signal()
+
+CATALOG_MODELS = (Artist, Album, Music, AlbumTrack)
 
 
 @receiver(post_migrate)
@@ -20,3 +34,20 @@ def create_superuser(sender, **kwargs):
             username=username, email=email, password=password
         )
 
+
+def invalidate_cached_responses(sender, **kwargs):
+    # Поколение меняется после фиксации транзакции, чтобы параллельный
+    # запрос не закэшировал под новым поколением ещё незафиксированные данные.
+    transaction.on_commit(partial(bump_generation, sender))
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
+    bulk_changed.connect(invalidate_cached_responses, sender=model)
+
+
+@receiver(setting_changed)
+def reset_cache_on_setting_change(setting, **kwargs):
+    if setting == 'CATALOG_RESPONSE_CACHE':
+        reset_response_cache()
@@ -0,0 +1,165 @@
+"""
+Выборочные поля ответа: ``?fields=`` и ``?exclude=``.
+
+Параметры принимают имена полей ответа через запятую (``?fields=id,title``,
+``?exclude=tracks_count``) и действуют на ``list``/``retrieve``. Лишние
+поля убираются из сериализатора, а queryset получает ``only()`` по колонкам
+выбранных полей и ``select_related`` только для нужных связей: например,
+``/albums/?fields=release_date`` не делает JOIN с исполнителями. Быстрый путь
+``values_list()`` (см. ``lean.py``) выбирает только колонки выбранных полей.
+
+Если поле нельзя свести к колонке модели (вложенные сериализаторы,
+вычисляемые значения), ответ всё равно урезается, а queryset не меняется.
+"""
+
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_PARAM = "fields"
+EXCLUDE_PARAM = "exclude"
+
+
+@lru_cache(maxsize=None)
+def serializer_sources(serializer_class):
+    """
+    ``{имя поля: source}`` для полей ответа ``serializer_class``
+    в порядке сериализатора.
+    """
+    return {
+        name: field.source
+        for name, field in serializer_class().fields.items()
+        if not field.write_only
+    }
+
+
+def column_path(model, source):
+    """
+    Путь ORM к колонке для ``source`` поля сериализатора и связи, которые
+    нужно загрузить через ``select_related``, или ``None``, если ``source``
+    не ведёт к колонке модели через связи «многие к одному».
+    """
+    if not source or source == "*":
+        return None
+
+    parts = source.split(".")
+    relations = []
+    for index, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+
+        if index == len(parts) - 1:
+            if field.is_relation or not field.concrete:
+                return None
+        elif (field.many_to_one or field.one_to_one) and field.concrete:
+            model = field.related_model
+            relations.append("__".join(parts[:index + 1]))
+        else:
+            return None
+
+    return "__".join(parts), relations
+
+
+def prune_queryset(queryset, sources):
+    """
+    Ограничивает ``queryset`` колонками полей с ``sources`` и нужными им
+    связями (``prefetch_related`` таким полям не нужен). Если хотя бы одно поле не сводится к колонке, ``queryset``
+    возвращается без изменений.
+    """
+    paths = []
+    relations = []
+    for source in sources:
+        resolved = column_path(queryset.model, source)
+        if resolved is None:
+            return queryset
+        paths.append(resolved[0])
+        relations.extend(resolved[1])
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if relations:
+        queryset = queryset.select_related(*dict.fromkeys(relations))
+    return queryset.only(*paths)
+
+
+class SparseFieldsMixin:
+    """
+    Параметры ``fields``/``exclude`` для действий ``sparse_actions``.
+
+    Стоит перед ``LeanListMixin``: сужает его поля ``values_list()``.
+    """
+    sparse_actions = ("list", "retrieve")
+
+    def get_sparse_fields(self):
+        """
+        Имена выбранных полей ответа или ``None``, если параметры не переданы.
+        """
+        if not hasattr(self, "_sparse_fields"):
+            self._sparse_fields = self.parse_sparse_fields()
+        return self._sparse_fields
+
+    def parse_sparse_fields(self):
+        request = getattr(self, "request", None)
+        if request is None or self.action not in self.sparse_actions:
+            return None
+
+        params = request.query_params
+        if FIELDS_PARAM not in params and EXCLUDE_PARAM not in params:
+            return None
+
+        available = serializer_sources(self.get_serializer_class())
+
+        def names(param):
+            values = [
+                name.strip()
+                for value in params.getlist(param)
+                for name in value.split(",")
+                if name.strip()
+            ]
+            unknown = [name for name in values if name not in available]
+            if unknown:
+                raise ValidationError({
+                    param: [
+                        f"Неизвестные поля: {', '.join(unknown)}. "
+                        f"Допустимые значения: {', '.join(available)}"
+                    ]
+                })
+            return set(values)
+
+        selected = names(FIELDS_PARAM) if FIELDS_PARAM in params else set(available)
+        selected -= names(EXCLUDE_PARAM)
+        if not selected:
+            raise ValidationError({FIELDS_PARAM: ["Не выбрано ни одного поля."]})
+
+        return tuple(name for name in available if name in selected)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        selected = self.get_sparse_fields()
+        if selected is None:
+            return queryset
+
+        sources = serializer_sources(self.get_serializer_class())
+        return prune_queryset(queryset, [sources[name] for name in selected])
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        selected = self.get_sparse_fields()
+        if selected is None or "lean_fields" in kwargs:
+            return serializer
+
+        fields = getattr(serializer, "child", serializer).fields
+        for name in list(fields):
+            if name not in selected:
+                del fields[name]
+        return serializer
+
+    def get_lean_fields(self):
+        fields = super().get_lean_fields()
+        selected = self.get_sparse_fields()
+        if fields is None or selected is None:
+            return fields
+        return tuple(field for field in fields if field[0] in selected)
@@ -106,15 +106,21 @@ RESPONSE_EXAMPLES = {
         "value": [
             {
                 "id": 1,
-                "artist_name": "The Beatles"
+                "artist_name": "The Beatles",
+                "albums_count": 13,
+                "tracks_count": 167
             },
             {
                 "id": 2,
-                "artist_name": "Queen"
+                "artist_name": "Queen",
+                "albums_count": 15,
+                "tracks_count": 179
             },
             {
                 "id": 3,
-                "artist_name": "Led Zeppelin"
+                "artist_name": "Led Zeppelin",
+                "albums_count": 9,
+                "tracks_count": 74
             }
         ]
     },
@@ -124,51 +130,103 @@ RESPONSE_EXAMPLES = {
         "value": [
             {
                 "artist": "The Beatles",
-                "release_date": "1967-06-01"
+                "release_date": "1967-06-01",
+                "tracks_count": 13
             },
             {
                 "artist": "Queen",
-                "release_date": "1975-10-31"
+                "release_date": "1975-10-31",
+                "tracks_count": 12
             }
         ]
     },
     "tracks_grouped": {
         "summary": "Треки, сгруппированные по альбомам",
         "description": "Пример ответа с треками, сгруппированными по альбомам",
-        "value": [
-            {
-                "album": {
-                    "artist": "The Beatles",
-                    "release_date": "1967-06-01"
-                },
-                "tracks": [
-                    {
-                        "title": "Sgt. Pepper's Lonely Hearts Club Band",
-                        "number": 1
+        "value": {
+            "next": "http://127.0.0.1:8000/api/v1/tracks-in-albums/?cursor=cD0y",
+            "previous": None,
+            "results": [
+                {
+                    "album": {
+                        "artist": "The Beatles",
+                        "release_date": "1967-06-01",
+                        "tracks_count": 2
                     },
-                    {
-                        "title": "With a Little Help from My Friends",
-                        "number": 2
-                    }
-                ]
-            },
-            {
-                "album": {
-                    "artist": "Queen",
-                    "release_date": "1975-10-31"
+                    "tracks": [
+                        {
+                            "title": "Sgt. Pepper's Lonely Hearts Club Band",
+                            "number": 1
+                        },
+                        {
+                            "title": "With a Little Help from My Friends",
+                            "number": 2
+                        }
+                    ]
                 },
-                "tracks": [
-                    {
-                        "title": "Bohemian Rhapsody",
-                        "number": 1
+                {
+                    "album": {
+                        "artist": "Queen",
+                        "release_date": "1975-10-31",
+                        "tracks_count": 2
                     },
-                    {
-                        "title": "Love of My Life",
-                        "number": 2
+                    "tracks": [
+                        {
+                            "title": "Bohemian Rhapsody",
+                            "number": 1
+                        },
+                        {
+                            "title": "Love of My Life",
+                            "number": 2
+                        }
+                    ]
+                }
+            ]
+        }
+    },
+    "album_import": {
+        "summary": "Отчёт об импорте альбомов",
+        "description": "Пример отчёта, где одна строка файла не прошла проверку",
+        "value": {
+            "created": 998,
+            "failed": 1,
+            "errors": [
+                {
+                    "row": 17,
+                    "errors": {
+                        "release_date": [
+                            "Неправильный формат date. Используйте один из этих форматов: YYYY-MM-DD."
+                        ]
                     }
-                ]
+                }
+            ]
+        }
+    },
+    "catalog_export": {
+        "summary": "Выгрузка каталога в NDJSON",
+        "description": "Пример фрагмента потоковой выгрузки, по одной записи на строку",
+        "value": (
+            '{"type":"artists","id":1,"artist_name":"The Beatles"}\n'
+            '{"type":"albums","id":1,"artist_id":1,"album":{"artist":"The Beatles",'
+            '"release_date":"1967-06-01"},"tracks":[{"title":"Getting Better","number":4}]}\n'
+            '{"type":"music","id":1,"title":"Getting Better"}\n'
+        )
+    },
+    "endpoint_timings": {
+        "summary": "Статистика времени ответа",
+        "description": "Пример статистики по действиям за последние запросы",
+        "value": {
+            "album-list": {
+                "count": 1000,
+                "p50_ms": 7.9,
+                "p95_ms": 14.2,
+                "p99_ms": 31.5,
+                "queries": 3.0,
+                "db_ms": 2.4,
+                "serialize_ms": 1.8,
+                "render_ms": 0.6
             }
-        ]
+        }
     }
 }
 
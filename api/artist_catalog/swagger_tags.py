@@ -21,6 +21,14 @@ TAGS = {
     'tracks': {
         'name': 'Треки в альбомах',
         'description': 'Операции для работы с треками в альбомах'
+    },
+    'export': {
+        'name': 'Выгрузка каталога',
+        'description': 'Потоковая выгрузка всего каталога'
+    },
+    'monitoring': {
+        'name': 'Мониторинг',
+        'description': 'Статистика производительности API'
     }
 }
 
@@ -29,14 +37,16 @@ QUERY_PARAMETERS = {
     'search': openapi.Parameter(
         'search',
         openapi.IN_QUERY,
-        description="Поиск по названию",
+        description="Полнотекстовый поиск с учётом опечаток (исполнители — по имени, песни — по названию, "
+                    "альбомы — по имени исполнителя и названиям треков); без ordering результаты "
+                    "сортируются по релевантности",
         type=openapi.TYPE_STRING,
         required=False
     ),
     'ordering': openapi.Parameter(
         'ordering',
         openapi.IN_QUERY,
-        description="Сортировка результатов (например: 'artist_name', '-release_date')",
+        description="Сортировка результатов (например: 'artist_name', '-release_date', '-tracks_count')",
         type=openapi.TYPE_STRING,
         required=False
     ),
@@ -53,6 +63,53 @@ QUERY_PARAMETERS = {
         description="Смещение для пагинации",
         type=openapi.TYPE_INTEGER,
         required=False
+    ),
+    'pagination': openapi.Parameter(
+        'pagination',
+        openapi.IN_QUERY,
+        description=(
+            "'cursor' — курсорная пагинация по сортировке списка вместо offset: "
+            "страница любой глубины выбирается одинаково быстро, в ответе только "
+            "ссылки next/previous без count"
+        ),
+        type=openapi.TYPE_STRING,
+        enum=['cursor'],
+        required=False
+    ),
+    'cursor': openapi.Parameter(
+        'cursor',
+        openapi.IN_QUERY,
+        description="Непрозрачный курсор страницы из ссылок `next`/`previous`",
+        type=openapi.TYPE_STRING,
+        required=False
+    ),
+    'fields': openapi.Parameter(
+        'fields',
+        openapi.IN_QUERY,
+        description=(
+            "Вернуть только перечисленные поля ответа через запятую "
+            "(например: 'id,artist_name'); остальные колонки и связи не загружаются из базы"
+        ),
+        type=openapi.TYPE_STRING,
+        required=False
+    ),
+    'exclude': openapi.Parameter(
+        'exclude',
+        openapi.IN_QUERY,
+        description="Не возвращать перечисленные поля ответа (через запятую)",
+        type=openapi.TYPE_STRING,
+        required=False
+    ),
+    'expand': openapi.Parameter(
+        'expand',
+        openapi.IN_QUERY,
+        description=(
+            "Встроить связанные данные через запятую: 'tracks' — треки альбома "
+            "по порядку (поле tracks: title, number), 'artist' — исполнитель "
+            "целиком вместо имени"
+        ),
+        type=openapi.TYPE_STRING,
+        required=False
     )
 }
 
@@ -1,3 +1,1038 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from artist_catalog import metrics
+from artist_catalog.cache import get_response_cache
+from artist_catalog.models import Album, AlbumTrack, Artist, Music
+from artist_catalog.pagination import KeysetPagination
+from artist_catalog.query_plans import check_query_plans
+from artist_catalog.replicas import LAST_WRITE_COOKIE, LAST_WRITE_HEADER
+from artist_catalog.schema import SCHEMA_FORMATS, _documents
+from artist_catalog.seeding import seed_catalog
+from artist_catalog.services import diff_album_tracks, renumber_album_tracks, sync_album_tracks
+
+
+def server_timing_queries(response):
+    return int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+
+
+def count_queries(queries):
+    return [query["sql"] for query in queries if "COUNT(" in query["sql"].upper()]
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class ServerTimingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        artist = Artist.objects.create(artist_name="Artist")
+        album = Album.objects.create(artist=artist, release_date=datetime.date(2000, 1, 1))
+        AlbumTrack.objects.create(album=album, track=Music.objects.create(title="Song"), track_number=1)
+        cls.album = album
+
+    def test_sync_views_count_queries(self):
+        response = self.client.get(reverse("artist-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(server_timing_queries(response), 0)
+
+    @override_settings(CATALOG_ASYNC_VIEWS=True)
+    async def test_async_views_count_queries(self):
+        # Асинхронный ORM выполняет запросы в потоках sync_to_async.
+        for path in (reverse("artist-list"), reverse("album-detail", args=[self.album.pk])):
+            with self.subTest(path=path):
+                response = await self.async_client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(server_timing_queries(response), 0)
+
+
+class BrowsableAPITests(APITestCase):
+
+    def test_list_pages_with_filters_render_as_html(self):
+        Artist.objects.create(artist_name="Artist")
+        for name in ("artist-list", "music-list", "album-list"):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name), HTTP_ACCEPT="text/html")
+                self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class ConditionalCountTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(3):
+            Artist.objects.create(artist_name=f"Artist {index}")
+
+    def test_list_counts_rows_once(self):
+        for query in ("", "?albums_count=0"):
+            with self.subTest(query=query), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("artist-list") + query)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data["count"], 3)
+                self.assertIn("ETag", response)
+                self.assertEqual(len(count_queries(queries)), 1)
+
+    @mock.patch("artist_catalog.counting.estimate_count", return_value=1_000_000)
+    def test_estimated_list_without_cache_has_no_etag(self, estimate_count):
+        # Оценка не меняется сразу после удаления: ETag мог бы устареть.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("artist-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1_000_000)
+        self.assertTrue(response.data["count_approximate"])
+        self.assertNotIn("ETag", response)
+        self.assertEqual(count_queries(queries), [])
+
+
+class QueryPlanTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(artists=20, albums_per_artist=3, tracks_per_album=5)
+
+    def test_read_queries_use_indexes(self):
+        plans, problems = check_query_plans()
+        self.assertTrue(plans)
+        self.assertEqual(
+            [f"{problem.scenario}: {problem.table}\n{problem.sql}" for problem in problems], []
+        )
+
+
+class AlbumTrackSyncTests(APITestCase):
+
+    def setUp(self):
+        self.artist = Artist.objects.create(artist_name="Artist")
+        self.album = Album.objects.create(artist=self.artist, release_date=datetime.date(2000, 1, 1))
+
+    def album_tracks(self):
+        return list(
+            AlbumTrack.objects.filter(album=self.album)
+            .order_by("track_number").values_list("track__title", "track_number")
+        )
+
+    def test_diff_matches_rows_by_pair_then_track_then_number(self):
+        existing = [(10, (1, 1)), (11, (2, 2)), (12, (3, 3)), (13, (4, 4))]
+        # 1 остаётся, 2 и 3 меняются номерами, на позиции 4 — другой трек, 5 — новый.
+        diff = diff_album_tracks(existing, [(1, 1), (3, 2), (2, 3), (6, 4), (5, 5)])
+        self.assertEqual(diff.to_delete, [])
+        self.assertEqual(sorted(diff.to_update), [(11, 2, 3), (12, 3, 2), (13, 6, 4)])
+        self.assertEqual(diff.to_create, [(5, 5)])
+
+    def test_diff_deletes_unmatched_rows(self):
+        diff = diff_album_tracks([(10, (1, 1)), (11, (2, 2))], [(1, 1)])
+        self.assertEqual(diff, ([11], [], []))
+
+    def test_sync_swaps_numbers_without_unique_violation(self):
+        sync_album_tracks(self.album, [("A", 1), ("B", 2), ("C", 3)])
+        row_ids = dict(AlbumTrack.objects.filter(album=self.album).values_list("track__title", "id"))
+
+        diff = sync_album_tracks(self.album, [("C", 1), ("B", 2), ("A", 3)])
+
+        self.assertEqual(self.album_tracks(), [("C", 1), ("B", 2), ("A", 3)])
+        self.assertEqual((diff.to_delete, diff.to_create), ([], []))
+        self.assertEqual(
+            dict(AlbumTrack.objects.filter(album=self.album).values_list("track__title", "id")), row_ids
+        )
+
+    def test_sync_updates_counters(self):
+        sync_album_tracks(self.album, [("A", 1), ("B", 2), ("C", 3)])
+        sync_album_tracks(self.album, [("A", 1), ("D", 2)])
+
+        self.assertEqual(self.album_tracks(), [("A", 1), ("D", 2)])
+        self.album.refresh_from_db()
+        self.artist.refresh_from_db()
+        self.assertEqual(self.album.tracks_count, 2)
+        self.assertEqual((self.artist.albums_count, self.artist.tracks_count), (1, 2))
+
+
+class RenumberTracksTests(APITestCase):
+
+    def setUp(self):
+        artist = Artist.objects.create(artist_name="Artist")
+        self.first = Album.objects.create(artist=artist, release_date=datetime.date(2000, 1, 1))
+        self.second = Album.objects.create(artist=artist, release_date=datetime.date(2001, 1, 1))
+
+    def add_tracks(self, album, numbers):
+        for title, number in numbers:
+            track, _ = Music.objects.get_or_create(title=title)
+            AlbumTrack.objects.create(album=album, track=track, track_number=number)
+
+    def album_tracks(self, album):
+        return list(
+            AlbumTrack.objects.filter(album=album)
+            .order_by("track_number").values_list("track__title", "track_number")
+        )
+
+    def test_gaps_are_closed_in_order(self):
+        # Номера 2 и 3 заняты: без сдвига первый UPDATE нарушил бы уникальность.
+        self.add_tracks(self.first, [("C", 9), ("A", 2), ("B", 3), ("D", 12)])
+        self.assertEqual(renumber_album_tracks(), 4)
+        self.assertEqual(self.album_tracks(self.first), [("A", 1), ("B", 2), ("C", 3), ("D", 4)])
+
+    def test_number_wins_over_id(self):
+        # Совпадающих номеров не бывает (uniq_track_number_per_album), поэтому
+        # id лишь доопределяет порядок; важен номер, а не порядок вставки.
+        self.add_tracks(self.first, [("Later", 7), ("Earlier", 5)])
+        renumber_album_tracks()
+        self.assertEqual(self.album_tracks(self.first), [("Earlier", 1), ("Later", 2)])
+
+    def test_album_subset(self):
+        self.add_tracks(self.first, [("A", 3), ("B", 6)])
+        self.add_tracks(self.second, [("C", 4), ("D", 8)])
+        untouched = list(AlbumTrack.objects.filter(album=self.second).values_list("id", "track_number", "updated_at"))
+
+        self.assertEqual(renumber_album_tracks([self.first.pk]), 2)
+        self.assertEqual(self.album_tracks(self.first), [("A", 1), ("B", 2)])
+        self.assertEqual(
+            list(AlbumTrack.objects.filter(album=self.second).values_list("id", "track_number", "updated_at")),
+            untouched,
+        )
+        self.assertEqual(renumber_album_tracks([]), 0)
+
+    def test_contiguous_tracks_are_not_updated(self):
+        self.add_tracks(self.first, [("A", 1), ("B", 2)])
+        self.add_tracks(self.second, [("C", 1), ("D", 3)])
+        updated_at = AlbumTrack.objects.get(album=self.first, track_number=1).updated_at
+
+        self.assertEqual(renumber_album_tracks(), 1)
+        self.assertEqual(self.album_tracks(self.second), [("C", 1), ("D", 2)])
+        self.assertEqual(AlbumTrack.objects.get(album=self.first, track_number=1).updated_at, updated_at)
+        self.assertEqual(renumber_album_tracks(), 0)
+
+
+class CounterTests(APITestCase):
+
+    def setUp(self):
+        self.first = Artist.objects.create(artist_name="First")
+        self.second = Artist.objects.create(artist_name="Second")
+        response = self.client.post(reverse("album-list"), {
+            "artist": self.first.pk,
+            "release_date": "2000-01-01",
+            "tracks": [{"title": "A", "number": 1}, {"title": "B", "number": 2}],
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.album = Album.objects.get(pk=response.data["id"])
+
+    def assertCounters(self, artist, albums_count, tracks_count):
+        artist.refresh_from_db()
+        self.assertEqual((artist.albums_count, artist.tracks_count), (albums_count, tracks_count))
+
+    def test_create(self):
+        self.assertEqual(self.album.tracks_count, 2)
+        self.assertCounters(self.first, 1, 2)
+        self.assertCounters(self.second, 0, 0)
+
+    def test_album_reassignment_moves_counters(self):
+        response = self.client.patch(
+            reverse("album-detail", args=[self.album.pk]), {"artist": self.second.pk}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertCounters(self.first, 0, 0)
+        self.assertCounters(self.second, 1, 2)
+
+    def test_album_delete(self):
+        response = self.client.delete(reverse("album-detail", args=[self.album.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertCounters(self.first, 0, 0)
+
+    def test_music_delete(self):
+        music = Music.objects.get(title="A")
+        response = self.client.delete(reverse("music-detail", args=[music.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.album.refresh_from_db()
+        self.assertEqual(self.album.tracks_count, 1)
+        self.assertCounters(self.first, 1, 1)
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class KeysetPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Повторяющиеся значения: порядок внутри них задаёт id.
+        for name in ("C", "A", "B", "A", "C", "B", "A"):
+            Artist.objects.create(artist_name=name)
+
+    def expected_ids(self, *ordering):
+        return list(Artist.objects.order_by(*ordering).values_list("id", flat=True))
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([artist["id"] for artist in response.data["results"]])
+            url = response.data[link]
+        return pages, response
+
+    def test_after(self):
+        paginator = KeysetPagination()
+        artists = Artist.objects.all()
+        for ordering in (("artist_name", "id"), ("-artist_name", "id")):
+            for reverse_walk in (False, True):
+                with self.subTest(ordering=ordering, reverse=reverse_walk):
+                    paginator.keys = paginator.get_ordering(artists.order_by(*ordering))
+                    paginator.reverse = reverse_walk
+                    ids = self.expected_ids(*ordering)
+                    if reverse_walk:
+                        ids.reverse()
+                    middle = Artist.objects.get(pk=ids[3])
+                    position = [getattr(middle, name) for name, _ in paginator.keys]
+                    self.assertEqual(
+                        set(artists.filter(paginator.after(position)).values_list("id", flat=True)),
+                        set(ids[4:]),
+                    )
+
+    def test_walk_forward_and_back(self):
+        for ordering in ("artist_name", "-artist_name"):
+            with self.subTest(ordering=ordering):
+                url = reverse("artist-list") + f"?pagination=cursor&limit=3&ordering={ordering}"
+                forward, last = self.walk(url, "next")
+                self.assertEqual(sum(forward, []), self.expected_ids(ordering, "id"))
+                self.assertEqual([len(page) for page in forward], [3, 3, 1])
+
+                backward, first = self.walk(last.data["previous"], "previous")
+                self.assertEqual(backward, forward[-2::-1])
+                self.assertIsNone(first.data["previous"])
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class AlbumGroupPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        artist = Artist.objects.create(artist_name="Artist")
+        cls.albums = {}
+        for index, tracks in enumerate((3, 1, 4, 2, 5, 1, 2)):
+            album = Album.objects.create(artist=artist, release_date=datetime.date(2000 + index, 1, 1))
+            sync_album_tracks(album, [(f"{index}-{number}", number) for number in range(1, tracks + 1)])
+            cls.albums[str(album.release_date)] = tracks
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data["results"])
+            url = response.data[link]
+        return pages, response
+
+    def test_pages_hold_whole_albums(self):
+        forward, last = self.walk(reverse("tracks-in-albums-list") + "?limit=3", "next")
+        self.assertEqual([len(page) for page in forward], [3, 3, 1])
+
+        groups = sum(forward, [])
+        self.assertEqual([group["album"]["release_date"] for group in groups], list(self.albums))
+        for group in groups:
+            tracks = self.albums[group["album"]["release_date"]]
+            self.assertEqual([track["number"] for track in group["tracks"]], list(range(1, tracks + 1)))
+            self.assertEqual(group["album"]["tracks_count"], tracks)
+
+        backward, first = self.walk(last.data["previous"], "previous")
+        self.assertEqual(backward, forward[-2::-1])
+        self.assertIsNone(first.data["previous"])
+
+
+class LeanSerializationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(artists=5, albums_per_artist=2, tracks_per_album=3)
+
+    def test_lists_are_byte_identical(self):
+        for name, field in (("artist-list", "id"), ("music-list", "title"), ("album-list", "release_date")):
+            for query in ("", "?limit=5&offset=3", "?pagination=cursor", f"?fields={field}", f"?ordering=-{field}"):
+                with self.subTest(name=name, query=query):
+                    path = reverse(name) + query
+                    with override_settings(CATALOG_RESPONSE_CACHE=None, CATALOG_LEAN_SERIALIZATION=True):
+                        lean = self.client.get(path)
+                    with override_settings(CATALOG_RESPONSE_CACHE=None, CATALOG_LEAN_SERIALIZATION=False):
+                        regular = self.client.get(path)
+                    self.assertEqual(lean.status_code, 200)
+                    self.assertEqual(lean.content, regular.content)
+
+
+class StreamingListTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(artists=5, albums_per_artist=2, tracks_per_album=3)
+
+    def paths(self):
+        yield reverse("artist-list") + "?limit=30"
+        yield reverse("album-list") + "?pagination=cursor"
+        yield reverse("music-list") + "?limit=2"
+        yield reverse("tracks-in-albums-list")
+
+    @override_settings(CATALOG_RESPONSE_CACHE=None)
+    def test_lists_stream_the_same_bytes(self):
+        for path in self.paths():
+            with self.subTest(path=path):
+                regular = self.client.get(path)
+                with override_settings(CATALOG_STREAMING_LISTS=True):
+                    streamed = self.client.get(path)
+                self.assertFalse(regular.streaming)
+                self.assertTrue(streamed.streaming)
+                self.assertEqual(streamed["Content-Type"], regular["Content-Type"])
+                self.assertEqual(streamed["ETag"], regular["ETag"])
+                self.assertEqual(b"".join(streamed.streaming_content), regular.content)
+
+    @override_settings(CATALOG_RESPONSE_CACHE=None, CATALOG_STREAMING_LISTS=True, CATALOG_ASYNC_VIEWS=True)
+    async def test_async_lists_stream_asynchronously(self):
+        path = reverse("artist-list") + "?limit=30"
+        response = await self.async_client.get(path)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        with override_settings(CATALOG_STREAMING_LISTS=False):
+            regular = await self.async_client.get(path)
+        self.assertEqual(content, regular.content)
+
+    @override_settings(CATALOG_STREAMING_LISTS=True)
+    def test_cached_and_indented_responses_are_not_streamed(self):
+        path = reverse("artist-list")
+        self.assertFalse(self.client.get(path).streaming)
+        with override_settings(CATALOG_RESPONSE_CACHE=None):
+            response = self.client.get(path, HTTP_ACCEPT="application/json; indent=2")
+        self.assertFalse(response.streaming)
+
+
+class CatalogExportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = Artist.objects.create(artist_name="First")
+        cls.second = Artist.objects.create(artist_name="Второй")
+        cls.album = Album.objects.create(artist=cls.first, release_date=datetime.date(2000, 1, 1))
+        sync_album_tracks(cls.album, [("A", 1), ("Б", 2)])
+
+    def export(self, **params):
+        response = self.client.get(reverse("catalog-export"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_ndjson(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson; charset=utf-8")
+        records = [json.loads(line) for line in content.decode("utf-8").splitlines()]
+        self.assertEqual([record["type"] for record in records], ["artists", "artists", "albums", "music", "music"])
+        self.assertEqual(records[1], {"type": "artists", "id": self.second.pk, "artist_name": "Второй"})
+        self.assertEqual(records[2], {
+            "type": "albums",
+            "id": self.album.pk,
+            "artist_id": self.first.pk,
+            "album": {"artist": "First", "release_date": "2000-01-01"},
+            "tracks": [{"title": "A", "number": 1}, {"title": "Б", "number": 2}],
+        })
+
+    def test_json(self):
+        response, content = self.export(output="json", entities="music,artists")
+        self.assertEqual(response["Content-Type"], "application/json; charset=utf-8")
+        data = json.loads(content)
+        self.assertEqual(list(data), ["music", "artists"])
+        self.assertEqual(sorted(music["title"] for music in data["music"]), ["A", "Б"])
+        self.assertEqual(len(data["artists"]), 2)
+
+    def test_gzip(self):
+        _, plain = self.export()
+        response, compressed = self.export(compress="true")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_since_id_applies_to_first_entity(self):
+        _, content = self.export(entities="artists,albums", since_id=self.first.pk)
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [(record["type"], record["id"]) for record in records],
+            [("artists", self.second.pk), ("albums", self.album.pk)],
+        )
+
+    def test_bad_parameters(self):
+        for params in ({"entities": "artists,users"}, {"since_id": -1}, {"output": "xml"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("catalog-export"), params)
+                self.assertEqual(response.status_code, 400)
+
+    async def test_asgi_streams_asynchronously(self):
+        # Синхронный итератор Django под ASGI собрал бы в список целиком.
+        response = await self.async_client.get(reverse("catalog-export"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(content.splitlines()), 5)
+
+
+@override_settings(CATALOG_SCHEMA_DIR=None)
+class SchemaTests(APITestCase):
+
+    def setUp(self):
+        _documents.clear()
+        self.addCleanup(_documents.clear)
+
+    def test_schema_is_built_once(self):
+        get_schema = OpenAPISchemaGenerator.get_schema
+        with mock.patch.object(
+            OpenAPISchemaGenerator, "get_schema", autospec=True, side_effect=get_schema
+        ) as generated:
+            for _ in range(2):
+                for name in ("schema-swagger-ui", "schema-redoc"):
+                    response = self.client.get(reverse(name))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertContains(response, reverse("schema-json", args=[".json"]))
+                for schema_format in SCHEMA_FORMATS:
+                    response = self.client.get(reverse("schema-json", args=[f".{schema_format}"]))
+                    self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(generated.call_count, 1)
+
+    def test_unchanged_schema_is_not_modified(self):
+        path = reverse("schema-json", args=[".json"])
+        etag = self.client.get(path)["ETag"]
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ReplicaRoutingTests(APITransactionTestCase):
+    """
+    Реплика — отдельная база SQLite с другими данными, поэтому по ответу
+    видно, из какой базы он прочитан.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        databases = {
+            **settings.DATABASES,
+            "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(directory.name, "replica.sqlite3")},
+        }
+        with warnings.catch_warnings():
+            # Django не переподключает базы при смене DATABASES: новый
+            # псевдоним регистрируется в connections ниже.
+            warnings.simplefilter("ignore")
+            cls.enterClassContext(override_settings(
+                DATABASES=databases, CATALOG_READ_REPLICAS=["replica"], CATALOG_REPLICA_STICKY_SECONDS=60
+            ))
+        connections.settings["replica"] = connections.configure_settings(databases)["replica"]
+        cls.databases = cls.databases | {"replica"}
+        call_command("migrate", database="replica", verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        super().tearDownClass()
+
+    def setUp(self):
+        Artist.objects.create(artist_name="Primary")
+        Artist.objects.using("replica").create(artist_name="Replica")
+        get_response_cache().clear()
+
+    def artist_names(self, **headers):
+        response = self.client.get(reverse("artist-list"), **headers)
+        self.assertEqual(response.status_code, 200)
+        return [artist["artist_name"] for artist in json.loads(response.content)["results"]], response
+
+    @override_settings(CATALOG_RESPONSE_CACHE=None)
+    def test_reads_go_to_replica_and_writes_to_default(self):
+        names, _ = self.artist_names()
+        self.assertEqual(names, ["Replica"])
+
+        response = self.client.post(reverse("artist-list"), {"artist_name": "New"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(Artist.objects.values_list("artist_name", flat=True)), ["New", "Primary"])
+        self.assertEqual(list(Artist.objects.using("replica").values_list("artist_name", flat=True)), ["Replica"])
+
+    @override_settings(CATALOG_RESPONSE_CACHE=None)
+    def test_reads_after_write_stick_to_default(self):
+        response = self.client.post(reverse("artist-list"), {"artist_name": "New"}, format="json")
+        self.assertIn(LAST_WRITE_HEADER, response)
+        self.assertIn(LAST_WRITE_COOKIE, response.cookies)
+
+        # Cookie из ответа на запись.
+        names, _ = self.artist_names()
+        self.assertEqual(names, ["New", "Primary"])
+
+        # Заголовок вместо cookie: свежая запись и запись за пределами окна.
+        self.client.cookies.clear()
+        names, _ = self.artist_names(HTTP_X_CATALOG_LAST_WRITE=response[LAST_WRITE_HEADER])
+        self.assertEqual(names, ["New", "Primary"])
+        names, _ = self.artist_names(HTTP_X_CATALOG_LAST_WRITE=str(time.time() - 120))
+        self.assertEqual(names, ["Replica"])
+
+    def test_replica_read_after_write_is_not_cached(self):
+        # Без недавних изменений ответ реплики кэшируется.
+        with override_settings(CATALOG_REPLICA_STICKY_SECONDS=0):
+            self.assertEqual(self.artist_names()[1]["X-Cache"], "MISS")
+            self.assertEqual(self.artist_names()[1]["X-Cache"], "HIT")
+
+        self.client.post(reverse("artist-list"), {"artist_name": "New"}, format="json")
+        self.client.cookies.clear()
+
+        # Реплика могла не получить запись, а ключ уже содержит новое поколение.
+        for _ in range(2):
+            names, response = self.artist_names()
+            self.assertEqual(names, ["Replica"])
+            self.assertEqual(response["X-Cache"], "MISS")
+
+
+class CachedResponseTests(APITransactionTestCase):
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.artist = Artist.objects.create(artist_name="Artist")
+        self.album = Album.objects.create(artist=self.artist, release_date=datetime.date(2000, 1, 1))
+        sync_album_tracks(self.album, [("A", 1)])
+
+    def get(self, name, *args):
+        response = self.client.get(reverse(name, args=args))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def generation(self, model):
+        label = model._meta.label_lower
+        return get_response_cache().get_generations([label])[label]
+
+    def test_hit_is_served_without_queries(self):
+        for name, args in (("artist-list", ()), ("artist-detail", (self.artist.pk,)), ("tracks-in-albums-list", ())):
+            with self.subTest(name=name):
+                miss = self.get(name, *args)
+                self.assertEqual(miss["X-Cache"], "MISS")
+                with self.assertNumQueries(0):
+                    hit = self.get(name, *args)
+                self.assertEqual(hit["X-Cache"], "HIT")
+                self.assertEqual(hit.content, miss.content)
+
+    def test_write_invalidates_cached_responses(self):
+        self.get("artist-list")
+        response = self.client.patch(
+            reverse("artist-detail", args=[self.artist.pk]), {"artist_name": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.get("artist-list")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(json.loads(response.content)["results"][0]["artist_name"], "Renamed")
+
+    def test_bulk_track_changes_invalidate_grouped_tracks(self):
+        self.get("tracks-in-albums-list")
+        sync_album_tracks(self.album, [("A", 1), ("B", 2)])
+
+        response = self.get("tracks-in-albums-list")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertIn("B", response.content.decode("utf-8"))
+
+    def test_invalidation_waits_for_commit(self):
+        before = self.generation(Artist)
+        with transaction.atomic():
+            Artist.objects.filter(pk=self.artist.pk).update(artist_name="Uncommitted")
+            Artist.objects.get(pk=self.artist.pk).save()
+            self.assertEqual(self.generation(Artist), before)
+        self.assertNotEqual(self.generation(Artist), before)
+
+        before = self.generation(Artist)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.artist.save()
+            raise RuntimeError
+        self.assertEqual(self.generation(Artist), before)
+
+
+class ConditionalGetTests(APITransactionTestCase):
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.create_artists()
+
+    def create_artists(self):
+        Artist.objects.all().delete()
+        self.artists = [Artist.objects.create(artist_name=name) for name in ("A", "B")]
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def assert_revalidates(self, url, change):
+        response = self.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        response = self.get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        change()
+        response = self.get(url, if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def rename(self):
+        self.client.patch(
+            reverse("artist-detail", args=[self.artists[0].pk]), {"artist_name": "Renamed"}, format="json"
+        )
+
+    def delete(self):
+        self.client.delete(reverse("artist-detail", args=[self.artists[1].pk]))
+
+    def test_etag_changes_after_update_and_delete(self):
+        for cache in (settings.CATALOG_RESPONSE_CACHE, None):
+            for name, change in (("update", self.rename), ("delete", self.delete)):
+                with self.subTest(cache=bool(cache), change=name), override_settings(CATALOG_RESPONSE_CACHE=cache):
+                    self.create_artists()
+                    self.assert_revalidates(reverse("artist-list"), change)
+
+    def test_retrieve_etag_changes_after_update(self):
+        self.assert_revalidates(reverse("artist-detail", args=[self.artists[0].pk]), self.rename)
+
+    def test_list_ignores_if_modified_since(self):
+        # Удаление не сдвигает максимум updated_at: по дате список не сверяется.
+        for cache in (settings.CATALOG_RESPONSE_CACHE, None):
+            with self.subTest(cache=bool(cache)), override_settings(CATALOG_RESPONSE_CACHE=cache):
+                self.create_artists()
+                url = reverse("artist-list")
+                last_modified = self.get(url)["Last-Modified"]
+                self.delete()
+
+                response = self.get(url, if_modified_since=last_modified)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(json.loads(response.content)["results"]), 1)
+
+    def test_retrieve_honours_if_modified_since(self):
+        url = reverse("artist-detail", args=[self.artists[0].pk])
+        last_modified = self.get(url)["Last-Modified"]
+        self.assertEqual(self.get(url, if_modified_since=last_modified).status_code, 304)
+
+
+class AlbumImportTests(APITestCase):
+
+    def setUp(self):
+        self.artist = Artist.objects.create(artist_name="Existing")
+
+    def upload(self, name, content, **data):
+        response = self.client.post(reverse("album-import-albums"), {
+            "file": SimpleUploadedFile(name, content.encode("utf-8")), **data,
+        }, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def album_tracks(self, artist):
+        return [
+            (str(album.release_date), album.tracks_count, [
+                tuple(row) for row in AlbumTrack.objects.filter(album=album)
+                .order_by("track_number").values_list("track__title", "track_number")
+            ])
+            for album in Album.objects.filter(artist=artist).order_by("release_date")
+        ]
+
+    def assertCounters(self, artist, albums_count, tracks_count):
+        artist.refresh_from_db()
+        self.assertEqual((artist.albums_count, artist.tracks_count), (albums_count, tracks_count))
+
+    def test_ndjson(self):
+        lines = [
+            {"artist": self.artist.pk, "release_date": "2001-01-01",
+             "tracks": [{"title": "A", "number": 1}, {"title": " B ", "number": 2}]},
+            {"artist_name": "New", "release_date": "2002-01-01", "tracks": [{"title": "A", "number": 1}]},
+            {"artist_name": "New", "release_date": "2003-01-01"},
+        ]
+        report = self.upload("albums.ndjson", "\n".join(json.dumps(line) for line in lines))
+        self.assertEqual(report, {"created": 3, "failed": 0, "errors": []})
+
+        new = Artist.objects.get(artist_name="New")
+        self.assertEqual(self.album_tracks(self.artist), [("2001-01-01", 2, [("A", 1), ("B", 2)])])
+        self.assertEqual(self.album_tracks(new), [("2002-01-01", 1, [("A", 1)]), ("2003-01-01", 0, [])])
+        self.assertEqual(Music.objects.filter(title="A").count(), 1)
+        self.assertCounters(self.artist, 1, 2)
+        self.assertCounters(new, 2, 1)
+
+    def test_csv(self):
+        content = (
+            "artist,artist_name,release_date,title,number\n"
+            f"{self.artist.pk},,2001-01-01,A,1\n"
+            f"{self.artist.pk},,2001-01-01,B,2\n"
+            ",New,2002-01-01,C,1\n"
+        )
+        report = self.upload("albums.csv", content)
+        self.assertEqual(report, {"created": 2, "failed": 0, "errors": []})
+
+        new = Artist.objects.get(artist_name="New")
+        self.assertEqual(self.album_tracks(self.artist), [("2001-01-01", 2, [("A", 1), ("B", 2)])])
+        self.assertEqual(self.album_tracks(new), [("2002-01-01", 1, [("C", 1)])])
+        self.assertCounters(self.artist, 1, 2)
+        self.assertCounters(new, 1, 1)
+
+    def test_bad_rows_are_reported_and_others_committed(self):
+        lines = [
+            json.dumps({"artist": self.artist.pk, "release_date": "2001-01-01",
+                        "tracks": [{"title": "A", "number": 1}]}),
+            "{not json",
+            json.dumps({"artist": 999999, "release_date": "2002-01-01"}),
+            json.dumps({"artist": self.artist.pk, "release_date": "2003-01-01",
+                        "tracks": [{"title": "A", "number": 1}, {"title": "A", "number": 2}]}),
+            json.dumps({"artist": self.artist.pk, "release_date": "2004-01-01",
+                        "tracks": [{"title": "B", "number": 1}]}),
+        ]
+        # Пачка из двух строк: неизвестный исполнитель отсекается до записи пачки.
+        with override_settings(CATALOG_IMPORT_BATCH_SIZE=2):
+            report = self.upload("albums.txt", "\n".join(lines), file_format="ndjson")
+
+        self.assertEqual(report["created"], 2)
+        self.assertEqual(report["failed"], 3)
+        self.assertEqual([error["row"] for error in report["errors"]], [2, 3, 4])
+        self.assertIn("artist", report["errors"][1]["errors"])
+        self.assertIn("tracks", report["errors"][2]["errors"])
+
+        self.assertEqual(self.album_tracks(self.artist), [
+            ("2001-01-01", 1, [("A", 1)]),
+            ("2004-01-01", 1, [("B", 1)]),
+        ])
+        self.assertCounters(self.artist, 2, 2)
+
+    def test_unknown_format(self):
+        response = self.client.post(reverse("album-import-albums"), {
+            "file": SimpleUploadedFile("albums.xml", b"<albums/>"),
+        }, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("file_format", response.data)
+
+
+class MetricsTests(APITestCase):
+
+    def metric(self, name, **labels):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        selector = ",".join(f'{label}="{value}"' for label, value in labels.items())
+        line = f"{name}{{{selector}}} " if selector else f"{name} "
+        for row in response.content.decode("utf-8").splitlines():
+            if row.startswith(line):
+                return float(row[len(line):])
+        return 0
+
+    def dead_pid(self):
+        process = subprocess.Popen([sys.executable, "-c", ""])
+        process.wait()
+        return process.pid
+
+    def test_requests_are_counted(self):
+        labels = {"method": "GET", "route": "artist-list", "status": "200"}
+        before = self.metric("catalog_http_requests_total", **labels)
+        duration = self.metric("catalog_http_request_duration_seconds_count", method="GET", route="artist-list")
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse("artist-list")).status_code, 200)
+
+        self.assertEqual(self.metric("catalog_http_requests_total", **labels), before + 2)
+        self.assertEqual(
+            self.metric("catalog_http_request_duration_seconds_count", method="GET", route="artist-list"),
+            duration + 2,
+        )
+
+    def test_exited_process_snapshots_are_folded(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(CATALOG_METRICS_DIR=directory))
+        labels = [["method", "GET"], ["route", "exited"], ["status", "200"]]
+        for pid in (self.dead_pid(), self.dead_pid()):
+            with open(os.path.join(directory, f"metrics-{pid}.json"), "w", encoding="utf-8") as stream:
+                json.dump({
+                    "pid": pid,
+                    "values": [["catalog_http_requests_total", labels, 5]],
+                    "histograms": [],
+                    "in_flight": 3,
+                    "gauges": [["catalog_db_pool_size", [["database", "exited"]], 4]],
+                }, stream)
+        metrics.mark_process_dead(pid)
+
+        for _ in range(2):
+            self.assertEqual(self.metric("catalog_http_requests_total", **dict(labels)), 10)
+            self.assertEqual(self.metric("catalog_db_pool_size", database="exited"), 0)
+        self.assertEqual(
+            sorted(name for name in os.listdir(directory) if name.endswith(".json")),
+            [metrics.EXITED_FILENAME],
+        )
+
+    def test_async_flush_writes_snapshot(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(CATALOG_METRICS_DIR=directory, CATALOG_METRICS_FLUSH_INTERVAL=0))
+        async_to_sync(metrics.aflush)()
+        self.assertTrue(os.path.exists(os.path.join(directory, f"metrics-{os.getpid()}.json")))
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class SparseFieldsTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist = Artist.objects.create(artist_name="Artist")
+        cls.album = Album.objects.create(artist=cls.artist, release_date=datetime.date(2000, 1, 1))
+
+    def get(self, url, query, status=200):
+        response = self.client.get(url + query)
+        self.assertEqual(response.status_code, status)
+        return json.loads(response.content)
+
+    def test_fields_and_exclude(self):
+        list_url = reverse("artist-list")
+        detail_url = reverse("artist-detail", args=[self.artist.pk])
+        for query, fields in (
+            ("?fields=artist_name,id", ["id", "artist_name"]),
+            ("?exclude=albums_count,tracks_count", ["id", "artist_name"]),
+            ("?fields=id,albums_count&exclude=albums_count", ["id"]),
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(list(self.get(detail_url, query)), fields)
+                self.assertEqual([list(row) for row in self.get(list_url, query)["results"]], [fields])
+
+    def test_unknown_fields_are_rejected(self):
+        for query, param in (
+            ("?fields=id,missing", "fields"),
+            ("?exclude=missing", "exclude"),
+            ("?fields=id&exclude=id", "fields"),
+        ):
+            with self.subTest(query=query):
+                self.assertIn(param, self.get(reverse("artist-list"), query, status=400))
+                self.assertIn(param, self.get(reverse("artist-detail", args=[self.artist.pk]), query, status=400))
+
+    def test_queryset_selects_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(reverse("album-list"), "?fields=release_date")
+        self.assertEqual(data["results"], [{"release_date": "2000-01-01"}])
+        select = [query["sql"] for query in queries if 'FROM "artist_catalog_album"' in query["sql"]][-1]
+        columns = select.split(" FROM ")[0]
+        self.assertIn("release_date", columns)
+        self.assertNotIn("tracks_count", columns)
+        self.assertNotIn("artist_catalog_artist", select)
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class ExpandTests(APITestCase):
+
+    def setUp(self):
+        self.artist = Artist.objects.create(artist_name="Artist")
+
+    def add_albums(self, count, tracks):
+        for index in range(count):
+            album = Album.objects.create(artist=self.artist, release_date=datetime.date(2000 + index, 1, 1))
+            sync_album_tracks(album, [(f"Track {number}", number) for number in range(1, tracks + 1)])
+
+    def get(self, query, status=200):
+        response = self.client.get(reverse("album-list") + query)
+        self.assertEqual(response.status_code, status)
+        return json.loads(response.content)
+
+    def test_expanded_fields(self):
+        self.add_albums(1, 2)
+        album = self.get("?expand=tracks,artist")["results"][0]
+        self.assertEqual(album["artist"], {
+            "id": self.artist.pk, "artist_name": "Artist", "albums_count": 1, "tracks_count": 2,
+        })
+        self.assertEqual(album["tracks"], [{"title": "Track 1", "number": 1}, {"title": "Track 2", "number": 2}])
+
+        album = self.get("?expand=tracks&fields=tracks")["results"][0]
+        self.assertEqual(list(album), ["tracks"])
+        self.assertNotIn("tracks", self.get("")["results"][0])
+
+    def test_unknown_expand_is_rejected(self):
+        for query in ("?expand=tracks,missing", "?expand=album_tracks"):
+            with self.subTest(query=query):
+                self.assertIn("expand", self.get(query, status=400))
+
+    def test_expand_query_count_does_not_grow_with_page(self):
+        self.add_albums(2, 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.get("?expand=tracks,artist&limit=50")["results"]), 2)
+
+        self.add_albums(10, 5)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(self.get("?expand=tracks,artist&limit=50")["results"]), 12)
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class SearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        names = ["Blue Moon", "Bluegrass Band", "Moonlight Blue", "Red Sun"]
+        cls.artists = {name: Artist.objects.create(artist_name=name) for name in names}
+        cls.albums = {}
+        for index, (name, titles) in enumerate((
+            ("Red Sun", ["Blue Song", "Blue Song Reprise"]),
+            ("Bluegrass Band", ["Green"]),
+            ("Moonlight Blue", ["Yellow"]),
+        )):
+            album = Album.objects.create(artist=cls.artists[name], release_date=datetime.date(2000 + index, 1, 1))
+            sync_album_tracks(album, [(title, number) for number, title in enumerate(titles, 1)])
+            cls.albums[name] = album
+
+    def search(self, name, query):
+        response = self.client.get(reverse(name), {"search": query, "limit": 50})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["results"]
+
+    def test_artists_are_ranked(self):
+        names = [row["artist_name"] for row in self.search("artist-list", "blue")]
+        # Целое слово ранжируется выше префикса, «Red Sun» не совпадает.
+        self.assertEqual(sorted(names), ["Blue Moon", "Bluegrass Band", "Moonlight Blue"])
+        self.assertEqual(names[-1], "Bluegrass Band")
+
+        # Каждое слово ищется и как префикс: «Moonlight» совпадает с «moon».
+        self.assertEqual([row["artist_name"] for row in self.search("artist-list", "moon blue")],
+                         ["Blue Moon", "Moonlight Blue"])
+        self.assertEqual(self.search("artist-list", "purple"), [])
+
+    def test_ordering_overrides_rank(self):
+        response = self.client.get(reverse("artist-list"), {"search": "blue", "ordering": "-artist_name"})
+        names = [row["artist_name"] for row in json.loads(response.content)["results"]]
+        self.assertEqual(names, ["Moonlight Blue", "Bluegrass Band", "Blue Moon"])
+
+    def test_albums_match_artist_or_track_once(self):
+        albums = self.search("album-list", "blue")
+        # «Red Sun» находится по двум трекам, но попадает в ответ один раз.
+        self.assertEqual(
+            sorted(album["artist"] for album in albums),
+            ["Bluegrass Band", "Moonlight Blue", "Red Sun"],
+        )
+        self.assertEqual([album["artist"] for album in self.search("album-list", "green")], ["Bluegrass Band"])
+        self.assertEqual([album["artist"] for album in self.search("album-list", "reprise")], ["Red Sun"])
+
+    def test_music_search(self):
+        titles = [row["title"] for row in self.search("music-list", "song")]
+        self.assertEqual(titles, ["Blue Song", "Blue Song Reprise"])
+
+
+@override_settings(CATALOG_RESPONSE_CACHE=None)
+class CatalogRulesTests(APITestCase):
+
+    def test_albums_of_one_date_are_ordered_by_id(self):
+        second = Artist.objects.create(artist_name="B")
+        first = Artist.objects.create(artist_name="A")
+        for artist in (second, first):
+            Album.objects.create(artist=artist, release_date=datetime.date(2000, 1, 1))
+
+        for query, names in (("", ["B", "A"]), ("?ordering=release_date,artist__artist_name", ["A", "B"])):
+            with self.subTest(query=query):
+                response = self.client.get(reverse("album-list") + query)
+                self.assertEqual([album["artist"] for album in json.loads(response.content)["results"]], names)
+
+    def test_title_uniqueness_ignores_only_surrounding_spaces(self):
+        Music.objects.create(title="Song")
+        Music.objects.create(title="song")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Music.objects.create(title=" Song ")
@@ -1,17 +1,23 @@
 from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from rest_framework import permissions
 
-from artist_catalog.views import ArtistViewSet, MusicViewSet, AlbumViewSet, TracksInAlbumViewSet
+from artist_catalog.metrics import metrics_view
+from artist_catalog.schema import schema_document_view, schema_ui_view
+from artist_catalog.views import (
+    ArtistViewSet,
+    MusicViewSet,
+    AlbumViewSet,
+    TracksInAlbumViewSet,
+    CatalogExportView,
+    EndpointTimingsView,
+)
 
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Artist Catalog API",
-        default_version='v1',
-        description="""
+API_INFO = openapi.Info(
+    title="Artist Catalog API",
+    default_version='v1',
+    description="""
         # API каталога исполнителей
         
         Это API для управления музыкальным каталогом, включающим:
@@ -26,6 +32,7 @@ schema_view = get_schema_view(
         - Полный CRUD для всех сущностей
         - Создание альбомов с треками в одном запросе
         - Группировка треков по альбомам
+        - Потоковая выгрузка всего каталога в NDJSON/JSON
         - Пагинация и фильтрация результатов
         - Подробная документация всех операций
         
@@ -50,12 +57,9 @@ schema_view = get_schema_view(
         }
         ```
         """,
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@artistcatalog.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@artistcatalog.local"),
+    license=openapi.License(name="BSD License"),
 )
 
 router = DefaultRouter()
@@ -67,11 +71,14 @@ router.register(r'tracks-in-albums', TracksInAlbumViewSet, basename='tracks-in-a
 
 urlpatterns = [
     path('api/v1/', include(router.urls)),
+    path('api/v1/export/', CatalogExportView.as_view(), name='catalog-export'),
+    path('api/v1/timings/', EndpointTimingsView.as_view(), name='endpoint-timings'),
+    path('metrics', metrics_view, name='metrics'),
     
     # Swagger UI
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_document_view, name='schema-json'),
+    path('swagger/', schema_ui_view, {'ui': 'swagger'}, name='schema-swagger-ui'),
     
     # ReDoc
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('redoc/', schema_ui_view, {'ui': 'redoc'}, name='schema-redoc'),
 ]
\ No newline at end of file
@@ -1,16 +1,38 @@
-from rest_framework import viewsets, mixins
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, mixins, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from drf_yasg.utils import swagger_auto_schema
+from rest_framework.views import APIView
+from drf_yasg.utils import no_body, swagger_auto_schema
 from drf_yasg import openapi
 
+from artist_catalog.asynchronous import AsyncReadMixin, streaming_content
+from artist_catalog.cache import CachedResponseMixin
+from artist_catalog.conditional import ConditionalResponseMixin
+from artist_catalog.expand import Expansion, ExpandMixin
+from artist_catalog.export import iter_export
+from artist_catalog.importer import IMPORT_FORMATS, CatalogImporter, read_records
+from artist_catalog.instrumentation import InstrumentedViewMixin, endpoint_timings
+from artist_catalog.lean import LeanListMixin
 from artist_catalog.models import Artist, Music, Album, AlbumTrack
+from artist_catalog.pagination import AlbumGroupCursorPagination, KeysetPaginationMixin
+from artist_catalog.renderers import StreamingListMixin
+from artist_catalog.replicas import ReplicaReadMixin
+from artist_catalog.search import SearchDependenciesMixin
 from artist_catalog.serializers import (
     ArtistSerializer,
+    AlbumTrackReadSerializer,
     MusicSerializer,
     AlbumWriteSerializer,
     AlbumReadSerializer,
     AlbumTracksGroupedSerializer,
+    AlbumImportReportSerializer,
+    CatalogExportQuerySerializer,
 )
+from artist_catalog.services import prefetch_album_tracks, select_album_artist
+from artist_catalog.sparse import SparseFieldsMixin
 from artist_catalog.swagger_examples import (
     ARTIST_EXAMPLES,
     MUSIC_EXAMPLES,
@@ -21,9 +43,24 @@ from artist_catalog.swagger_examples import (
 from artist_catalog.swagger_tags import TAGS, QUERY_PARAMETERS
 
 
-class ArtistViewSet(viewsets.ModelViewSet):
+class ArtistViewSet(InstrumentedViewMixin,
+                    StreamingListMixin,
+                    ReplicaReadMixin,
+                    CachedResponseMixin,
+                    ConditionalResponseMixin,
+                    SparseFieldsMixin,
+                    LeanListMixin,
+                    KeysetPaginationMixin,
+                    AsyncReadMixin,
+                    viewsets.ModelViewSet):
     queryset = Artist.objects.all()
     serializer_class = ArtistSerializer
+    cache_models = (Artist,)
+    search_fields = ("artist_name",)
+    filterset_fields = {
+        "albums_count": ["exact", "gte", "lte"],
+        "tracks_count": ["exact", "gte", "lte"],
+    }
 
     @swagger_auto_schema(
         operation_summary="Получить список всех исполнителей",
@@ -33,7 +70,11 @@ class ArtistViewSet(viewsets.ModelViewSet):
             QUERY_PARAMETERS['search'],
             QUERY_PARAMETERS['ordering'],
             QUERY_PARAMETERS['limit'],
-            QUERY_PARAMETERS['offset']
+            QUERY_PARAMETERS['offset'],
+            QUERY_PARAMETERS['pagination'],
+            QUERY_PARAMETERS['cursor'],
+            QUERY_PARAMETERS['fields'],
+            QUERY_PARAMETERS['exclude']
         ],
         responses={
             200: openapi.Response(
@@ -70,6 +111,10 @@ class ArtistViewSet(viewsets.ModelViewSet):
         operation_summary="Получить информацию об исполнителе",
         operation_description="Возвращает детальную информацию о конкретном исполнителе",
         tags=[TAGS['artists']['name']],
+        manual_parameters=[
+            QUERY_PARAMETERS['fields'],
+            QUERY_PARAMETERS['exclude']
+        ],
         responses={
             200: openapi.Response(
                 description="Информация об исполнителе",
@@ -148,9 +193,20 @@ class ArtistViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class MusicViewSet(viewsets.ModelViewSet):
+class MusicViewSet(InstrumentedViewMixin,
+                   StreamingListMixin,
+                   ReplicaReadMixin,
+                   CachedResponseMixin,
+                   ConditionalResponseMixin,
+                   SparseFieldsMixin,
+                   LeanListMixin,
+                   KeysetPaginationMixin,
+                   AsyncReadMixin,
+                   viewsets.ModelViewSet):
     queryset = Music.objects.all()
     serializer_class = MusicSerializer
+    cache_models = (Music,)
+    search_fields = ("title",)
 
     @swagger_auto_schema(
         operation_summary="Получить список всех песен",
@@ -160,7 +216,11 @@ class MusicViewSet(viewsets.ModelViewSet):
             QUERY_PARAMETERS['search'],
             QUERY_PARAMETERS['ordering'],
             QUERY_PARAMETERS['limit'],
-            QUERY_PARAMETERS['offset']
+            QUERY_PARAMETERS['offset'],
+            QUERY_PARAMETERS['pagination'],
+            QUERY_PARAMETERS['cursor'],
+            QUERY_PARAMETERS['fields'],
+            QUERY_PARAMETERS['exclude']
         ],
         responses={
             200: openapi.Response(
@@ -196,6 +256,10 @@ class MusicViewSet(viewsets.ModelViewSet):
         operation_summary="Получить информацию о песне",
         operation_description="Возвращает детальную информацию о конкретной песне",
         tags=[TAGS['music']['name']],
+        manual_parameters=[
+            QUERY_PARAMETERS['fields'],
+            QUERY_PARAMETERS['exclude']
+        ],
         responses={
             200: openapi.Response(
                 description="Информация о песне",
@@ -274,12 +338,49 @@ class MusicViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class AlbumViewSet(viewsets.ModelViewSet):
+class AlbumViewSet(InstrumentedViewMixin,
+                   StreamingListMixin,
+                   ReplicaReadMixin,
+                   CachedResponseMixin,
+                   ConditionalResponseMixin,
+                   SparseFieldsMixin,
+                   ExpandMixin,
+                   SearchDependenciesMixin,
+                   LeanListMixin,
+                   KeysetPaginationMixin,
+                   AsyncReadMixin,
+                   viewsets.ModelViewSet):
     queryset = Album.objects.select_related("artist").all()
+    serializer_class = AlbumReadSerializer
+    cache_models = (Album, Artist)
+    timestamp_fields = ("updated_at", "artist__updated_at")
+    search_fields = ("artist__artist_name", "album_tracks__track__title")
+    filterset_fields = {
+        "tracks_count": ["exact", "gte", "lte"],
+    }
+    expandable_fields = {
+        "artist": Expansion(
+            field=ArtistSerializer(read_only=True, help_text="Исполнитель альбома"),
+            prepare_queryset=select_album_artist,
+            cache_models=(),
+            timestamp_fields=(),
+        ),
+        "tracks": Expansion(
+            field=AlbumTrackReadSerializer(
+                source="album_tracks",
+                many=True,
+                read_only=True,
+                help_text="Треки альбома по порядку"
+            ),
+            prepare_queryset=prefetch_album_tracks,
+            cache_models=(AlbumTrack, Music),
+            timestamp_fields=("album_tracks__updated_at", "album_tracks__track__updated_at"),
+        ),
+    }
 
     def get_serializer_class(self):
         if self.action in {"list", "retrieve"}:
-            return AlbumReadSerializer
+            return super().get_serializer_class()
         return AlbumWriteSerializer
 
     @swagger_auto_schema(
@@ -290,7 +391,12 @@ class AlbumViewSet(viewsets.ModelViewSet):
             QUERY_PARAMETERS['search'],
             QUERY_PARAMETERS['ordering'],
             QUERY_PARAMETERS['limit'],
-            QUERY_PARAMETERS['offset']
+            QUERY_PARAMETERS['offset'],
+            QUERY_PARAMETERS['pagination'],
+            QUERY_PARAMETERS['cursor'],
+            QUERY_PARAMETERS['fields'],
+            QUERY_PARAMETERS['exclude'],
+            QUERY_PARAMETERS['expand']
         ],
         responses={
             200: openapi.Response(
@@ -327,6 +433,11 @@ class AlbumViewSet(viewsets.ModelViewSet):
         operation_summary="Получить информацию об альбоме",
         operation_description="Возвращает детальную информацию о конкретном альбоме",
         tags=[TAGS['albums']['name']],
+        manual_parameters=[
+            QUERY_PARAMETERS['fields'],
+            QUERY_PARAMETERS['exclude'],
+            QUERY_PARAMETERS['expand']
+        ],
         responses={
             200: openapi.Response(
                 description="Информация об альбоме",
@@ -404,20 +515,100 @@ class AlbumViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_summary="Импортировать альбомы из файла",
+        operation_description=(
+            "Пакетно создаёт альбомы с треками из CSV (по треку на строку: "
+            "artist или artist_name, release_date, title, number) или NDJSON "
+            "(по альбому на строку, как в теле создания альбома; вместо artist "
+            "можно передать artist_name). Отсутствующие исполнители и песни создаются. "
+            "Строки с ошибками пропускаются и перечисляются в отчёте"
+        ),
+        tags=[TAGS['albums']['name']],
+        request_body=no_body,
+        manual_parameters=[
+            openapi.Parameter(
+                'file',
+                openapi.IN_FORM,
+                description="Файл CSV или NDJSON в кодировке UTF-8",
+                type=openapi.TYPE_FILE,
+                required=True
+            ),
+            openapi.Parameter(
+                'file_format',
+                openapi.IN_FORM,
+                description="Формат файла: csv или ndjson (по умолчанию — по расширению файла)",
+                type=openapi.TYPE_STRING,
+                enum=[*IMPORT_FORMATS],
+                required=False
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Отчёт об импорте",
+                schema=AlbumImportReportSerializer,
+                examples=RESPONSE_EXAMPLES["album_import"]
+            ),
+            400: openapi.Response(
+                description="Некорректный запрос",
+                examples=ERROR_EXAMPLES["validation_error"]
+            )
+        }
+    )
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_albums(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["Файл не передан."]})
+
+        file_format = request.data.get("file_format") or upload.name.rsplit(".", 1)[-1].lower()
+        if file_format not in IMPORT_FORMATS:
+            raise ValidationError({
+                "file_format": [f"Допустимые форматы: {', '.join(IMPORT_FORMATS)}."]
+            })
+
+        report = CatalogImporter().run(read_records(upload, file_format))
+        return Response(AlbumImportReportSerializer(report).data)
+
 
-class TracksInAlbumViewSet(mixins.ListModelMixin,
+class TracksInAlbumViewSet(InstrumentedViewMixin,
+                           StreamingListMixin,
+                           ReplicaReadMixin,
+                           CachedResponseMixin,
+                           ConditionalResponseMixin,
+                           SparseFieldsMixin,
+                           AsyncReadMixin,
+                           mixins.ListModelMixin,
                            viewsets.GenericViewSet):
     queryset = AlbumTrack.objects.select_related("album", "album__artist", "track").all()
+    serializer_class = AlbumTracksGroupedSerializer
+    pagination_class = AlbumGroupCursorPagination
+    cache_models = (AlbumTrack, Album, Artist, Music)
+    timestamp_fields = (
+        "updated_at",
+        "album__updated_at",
+        "album__artist__updated_at",
+        "track__updated_at",
+    )
 
     @swagger_auto_schema(
         operation_summary="Получить все треки, сгруппированные по альбомам",
-        operation_description="Возвращает все треки в системе, сгруппированные по альбомам с информацией об исполнителях",
+        operation_description=(
+            "Возвращает треки, сгруппированные по альбомам с информацией об исполнителях. "
+            "Страница содержит `limit` альбомов целиком, для перехода используются "
+            "ссылки `next` и `previous`"
+        ),
         tags=[TAGS['tracks']['name']],
         manual_parameters=[
-            QUERY_PARAMETERS['search'],
-            QUERY_PARAMETERS['ordering'],
+            QUERY_PARAMETERS['cursor'],
             QUERY_PARAMETERS['limit'],
-            QUERY_PARAMETERS['offset']
+            QUERY_PARAMETERS['fields'],
+            QUERY_PARAMETERS['exclude'],
         ],
         responses={
             200: openapi.Response(
@@ -428,31 +619,75 @@ class TracksInAlbumViewSet(mixins.ListModelMixin,
         }
     )
     def list(self, request, *args, **kwargs):
-        tracks = self.get_queryset().order_by("album_id", "track_number")
-        grouped = []
-        current_album_id = None
-        current_group = None
-        
-        for at in tracks:
-            if at.album_id != current_album_id:
-                if current_group is not None:
-                    grouped.append(current_group)
-
-                current_group = {
-                    "album": at.album,
-                    "tracks": [],
-                }
-
-                current_album_id = at.album_id
-
-            current_group["tracks"].append({
-                "title": at.track.title,
-                "number": at.track_number,
-            })
+        return super().list(request, *args, **kwargs)
 
-        if current_group is not None:
-            grouped.append(current_group)
 
-        serializer = AlbumTracksGroupedSerializer(grouped, many=True)
-        return Response(serializer.data)
+class CatalogExportView(APIView):
+    content_types = {
+        "ndjson": "application/x-ndjson; charset=utf-8",
+        "json": "application/json; charset=utf-8",
+    }
 
+    @swagger_auto_schema(
+        operation_summary="Выгрузить весь каталог",
+        operation_description=(
+            "Потоково выгружает исполнителей, альбомы с треками и песни. "
+            "В формате ndjson каждая строка — отдельная запись с полем `type`. "
+            "Чтобы продолжить прерванную выгрузку, передайте в `entities` сущность, "
+            "на которой она оборвалась, и следующие за ней, а в `since_id` — последний полученный id"
+        ),
+        tags=[TAGS['export']['name']],
+        query_serializer=CatalogExportQuerySerializer,
+        responses={
+            200: openapi.Response(
+                description="Поток записей каталога",
+                examples=RESPONSE_EXAMPLES["catalog_export"]
+            ),
+            400: openapi.Response(
+                description="Некорректные параметры",
+                examples=ERROR_EXAMPLES["validation_error"]
+            )
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        query = CatalogExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        chunks = iter_export(
+            entities=params["entities"],
+            since_id=params["since_id"],
+            output_format=params["output"],
+            compress=params["compress"],
+        )
+        response = StreamingHttpResponse(
+            streaming_content(request, chunks),
+            content_type=self.content_types[params["output"]],
+        )
+        if params["compress"]:
+            response["Content-Encoding"] = "gzip"
+
+        return response
+
+
+class EndpointTimingsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary="Статистика времени ответа по действиям API",
+        operation_description=(
+            "Для каждого действия по последним запросам (скользящее окно "
+            "CATALOG_TIMING_WINDOW): число запросов, перцентили общего времени, "
+            "среднее число SQL-запросов и среднее время фаз db, serialize и render. "
+            "Доступно только администраторам"
+        ),
+        tags=[TAGS['monitoring']['name']],
+        responses={
+            200: openapi.Response(
+                description="Статистика по действиям",
+                examples=RESPONSE_EXAMPLES["endpoint_timings"]
+            )
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(endpoint_timings.summary())
@@ -0,0 +1,68 @@
+"""
+Конфигурация gunicorn для production (``gunicorn`` из каталога ``api``).
+
+SERVER_INTERFACE=wsgi (по умолчанию) запускает ``api.wsgi`` в потоковых
+воркерах, SERVER_INTERFACE=asgi — ``api.asgi`` в воркерах uvicorn
+с асинхронными list/retrieve. Приложение загружается в главном процессе
+до fork (``preload_app``), поэтому воркеры стартуют быстро и делят память
+импортированного кода.
+"""
+import multiprocessing
+import os
+
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings_production')
+
+SERVER_INTERFACE = os.getenv('SERVER_INTERFACE', 'wsgi').lower()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+if SERVER_INTERFACE == 'asgi':
+    wsgi_app = 'api.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'api.wsgi:application'
+    worker_class = 'gthread'
+    # Потоков на воркер не должно быть больше DB_POOL_MAX_SIZE.
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Периодический перезапуск воркеров ограничивает рост памяти.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Снимки метрик прошлого запуска сервиса (artist_catalog.metrics).
+    metrics_dir = os.getenv('CATALOG_METRICS_DIR')
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for filename in os.listdir(metrics_dir):
+            if filename.startswith('metrics-'):
+                os.remove(os.path.join(metrics_dir, filename))
+
+
+def pre_fork(server, worker):
+    # Подключения и пулы, открытые главным процессом при загрузке приложения,
+    # не должны наследоваться воркерами.
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        close_pool = getattr(connection, 'close_pool', None)
+        if close_pool is not None:
+            close_pool()
+
+
+def child_exit(server, worker):
+    # Счётчики завершившегося воркера переносятся в общий снимок.
+    from artist_catalog.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)